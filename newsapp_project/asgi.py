@@ -2,6 +2,8 @@
 ASGI config for newsapp_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server, e.g. ``uvicorn newsapp_project.asgi:application``
+(see README, "Running under ASGI").
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -37,6 +37,8 @@ INSTALLED_APPS = [
 # ============================================================
 
 MIDDLEWARE = [
+    'sabuzz.metrics.MetricsMiddleware',   # first, so it times the whole stack
+    'sabuzz.db_router.ReplicaMiddleware',  # marks safe requests as replica-readable
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',   # required
     'django.middleware.common.CommonMiddleware',
@@ -84,7 +86,75 @@ WSGI_APPLICATION = 'newsapp_project.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.getenv('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+    }
+}
+
+# SQLITE_PROFILE=production (default) tunes SQLite for concurrent traffic:
+#   - WAL, so readers never wait for the writer, with synchronous=NORMAL
+#     (durable across application crashes; a power loss can drop the last commits)
+#   - 64 MiB page cache and 256 MiB memory-mapped I/O per connection
+#   - transactions start with BEGIN IMMEDIATE and take the write lock up
+#     front instead of failing when they upgrade from a read lock
+#   - a 20 s busy timeout, and writes queued on a per-process lock
+#     (sabuzz/sqlite_backend) rather than spinning in SQLite's busy handler
+# SQLITE_PROFILE=stock keeps Django's defaults (for comparison, see
+# `manage.py benchmark_concurrency`).
+SQLITE_PROFILE = os.getenv('SQLITE_PROFILE', 'production')
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64 * 1024,        # KiB when negative
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+if SQLITE_PROFILE == 'production':
+    DATABASES['default'].update({
+        'ENGINE': 'sabuzz.sqlite_backend',
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {name} = {value}' for name, value in SQLITE_PRAGMAS.items()),
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+    })
+
+# Read replicas (sabuzz/db_router.py): SQLITE_REPLICAS=/path/a.sqlite3,/path/b.sqlite3
+# adds read-only copies of the primary, refreshed by `manage.py sync_replicas`.
+# Safe-method requests read from a replica unless the client wrote within the
+# last REPLICA_PIN_SECONDS; writes always go to `default`. Keep
+# REPLICA_PIN_SECONDS >= the sync interval (`sync_replicas --loop` enforces it
+# for its own loop; a cron schedule must respect it too). In tests the
+# replicas mirror the test database.
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '5'))
+DATABASE_REPLICAS = []
+for index, path in enumerate(filter(None, os.getenv('SQLITE_REPLICAS', '').split(',')), start=1):
+    alias = f'replica{index}'
+    replica = {**DATABASES['default'], 'NAME': path.strip(), 'TEST': {'MIRROR': 'default'}}
+    replica['OPTIONS'] = {
+        **replica.get('OPTIONS', {}),
+        'init_command': ';'.join(
+            ['PRAGMA query_only = ON']
+            + [f'PRAGMA {name} = {SQLITE_PRAGMAS[name]}' for name in ('cache_size', 'mmap_size', 'temp_store')]
+        ),
+    }
+    replica['OPTIONS'].pop('transaction_mode', None)  # never writes, so never needs BEGIN IMMEDIATE
+    DATABASES[alias] = replica
+    DATABASE_REPLICAS.append(alias)
+if DATABASE_REPLICAS:
+    DATABASE_ROUTERS = ['sabuzz.db_router.ReplicaRouter']
+
+# ============================================================
+# CACHE
+# ============================================================
+# Local memory is per process. In production point this at a shared backend
+# (e.g. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache,
+# CACHE_LOCATION=redis://127.0.0.1:6379) so snapshots written by management
+# commands are visible to every worker.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'sabuzz'),
     }
 }
 
@@ -121,6 +191,27 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# `collectstatic` target; in production the front web server serves it
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# With DEBUG off, collectstatic writes content-hashed files plus .gz/.br
+# variants (sabuzz/staticfiles.py) that can be cached as immutable
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+            else 'sabuzz.staticfiles.CompressedManifestStaticFilesStorage'
+        ),
+    },
+}
+
+# How /media/ responses hand the bytes to the front web server (sabuzz/media.py):
+# '' streams from Python, 'x-accel-redirect' (nginx) or 'x-sendfile' (Apache).
+# For nginx, MEDIA_ACCEL_PREFIX must be an `internal` location aliased to MEDIA_ROOT.
+MEDIA_ACCEL = os.getenv('MEDIA_ACCEL', '')
+MEDIA_ACCEL_PREFIX = os.getenv('MEDIA_ACCEL_PREFIX', '/protected-media/')
+
 # ============================================================
 # DJANGO REST FRAMEWORK (IMPORTANT)
 # ============================================================
@@ -140,4 +231,73 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # ============================================================
 # WEATHER API CONFIGURATION
 # ============================================================
-OPENWEATHER_API_KEY=os.getenv('OPENWEATHER_API_KEY')
\ No newline at end of file
+OPENWEATHER_API_KEY=os.getenv('OPENWEATHER_API_KEY')
+
+# Seconds between refreshes of the navbar weather snapshot (sabuzz/weather.py)
+WEATHER_SNAPSHOT_INTERVAL = 600
+
+# weather_widget proxy: coordinates are snapped to a grid of this many degrees
+# and each cell is cached for WEATHER_CELL_TTL seconds
+WEATHER_GRID_DEGREES = 0.1
+WEATHER_CELL_TTL = 600
+
+# ============================================================
+# NEWS API CONFIGURATION (newsdata.io)
+# ============================================================
+NEWSDATA_API_KEY = os.getenv('NEWSDATA_API_KEY', 'pub_5741e9332f0f408186a23f2be286c5f5')
+NEWSDATA_COUNTRY = 'za'
+
+# Categories pulled into ExternalArticle by `manage.py fetch_news`
+NEWSDATA_CATEGORIES = ['top', 'sports', 'technology', 'entertainment', 'business', 'politics']
+
+# In-process response cache in front of newsdata.io (see sabuzz/news.py),
+# the fallback for the latest feed and NEWSDATA_CATEGORIES while the store is
+# empty. Views never wait on it: a miss is fetched in the background. TTLs are
+# in seconds, per kind of request; stale entries are served for
+# NEWSDATA_CACHE_STALE more seconds while a single refresh runs.
+NEWSDATA_CACHE_TTLS = {
+    'latest': 300,
+    'category': 600,
+}
+NEWSDATA_CACHE_STALE = 600
+NEWSDATA_CACHE_MAXSIZE = 512
+
+# ============================================================
+# OUTBOUND HTTP CLIENT (sabuzz/http_client.py)
+# ============================================================
+EXTERNAL_API_CLIENT = {
+    'pool_maxsize': 20,         # keep-alive connections per host
+    'retries': 2,               # retries for idempotent GETs
+    'backoff_factor': 0.3,      # exponential backoff base (seconds) ...
+    'backoff_jitter': 0.3,      # ... plus up to this much random jitter
+    'failure_threshold': 5,     # consecutive failures before a host's circuit opens
+    'reset_timeout': 30,        # seconds before a trial call is let through again
+    'timeouts': {               # (connect, read) seconds per host
+        'newsdata.io': (3.05, 5),
+        'api.open-meteo.com': (2, 3),
+        'api.openweathermap.org': (2, 3),
+    },
+}
+
+# ============================================================
+# ROLES (sabuzz/roles.py)
+# ============================================================
+# Seconds a user's group names / profile role stay cached between requests;
+# group, profile and journalist-request changes drop the entry immediately
+ROLE_CACHE_TTL = 300
+
+# ============================================================
+# PAGE CACHE (sabuzz/page_cache.py)
+# ============================================================
+# Seconds an anonymous full page / logged-in template fragment is kept.
+# Post changes purge the affected pages straight away through tag
+# invalidation; pages built only from newsdata.io articles just expire.
+PAGE_CACHE_TTL = 300
+
+# ============================================================
+# METRICS (sabuzz/metrics.py)
+# ============================================================
+# Per-view latency, SQL, template and outbound-HTTP totals, scraped from
+# /metrics/ by a staff session or with `Authorization: Bearer <METRICS_TOKEN>`
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1') == '1'
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
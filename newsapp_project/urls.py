@@ -1,15 +1,15 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+
+from sabuzz.media import serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path("", include("sabuzz.urls")),
     path('api/', include('sabuzz.api.urls')),
 
+    # uploaded media: ETag/Range/immutable caching, offloaded to the web
+    # server when MEDIA_ACCEL is set (sabuzz/media.py)
+    re_path(r'^%s(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'), serve_media),
 ]
-
-if settings.DEBUG:
-    
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
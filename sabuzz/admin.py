@@ -1,7 +1,10 @@
 from django.contrib import admin
+from django.db import transaction
+from django.db.models import Count
+from . import counters, page_cache, search
 from .models import (
     Post, Category, Comment, Profile, Like, Subscriber,
-    Notification, JournalistRequest
+    Notification, JournalistRequest, ExternalArticle, DashboardStats
 )
 
 # ============================================================
@@ -43,13 +46,24 @@ class CategoryAdmin(admin.ModelAdmin):
 # ============================================================
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
-    list_display = ('title', 'author', 'status', 'created_at')
+    list_display = ('title', 'author', 'status', 'created_at', 'like_count', 'approved_comment_count')
     list_filter = ('status', 'created_at', 'author', 'category')
     search_fields = ('title', 'content')
     date_hierarchy = 'created_at'
     ordering = ('status', 'created_at')
     list_per_page = 10
 
+    def get_search_results(self, request, queryset, search_term):
+        # Published posts come from the full-text index; only the (few)
+        # unpublished ones still need a LIKE scan.
+        if not search_term:
+            return super().get_search_results(request, queryset, search_term)
+        ids = search.matching_post_ids(search_term)
+        unpublished, may_have_duplicates = super().get_search_results(
+            request, queryset.exclude(status='published'), search_term
+        )
+        return queryset.filter(id__in=ids) | unpublished, may_have_duplicates
+
 
 # ============================================================
 # COMMENTS
@@ -62,7 +76,16 @@ class CommentAdmin(admin.ModelAdmin):
     actions = ['approve_comments']
 
     def approve_comments(self, request, queryset):
-        queryset.update(approved=True)
+        # bulk update skips the signals, so adjust the Post counters here
+        with transaction.atomic():
+            per_post = list(
+                queryset.filter(approved=False).order_by()
+                .values_list('post').annotate(n=Count('id'))
+            )
+            queryset.update(approved=True)
+            for post_id, n in per_post:
+                counters.adjust(post_id, approved_comment_count=n)
+        page_cache.invalidate(*[page_cache.post_tag(post_id) for post_id, _ in per_post])
     approve_comments.short_description = "Approve selected comments"
 
 
@@ -108,3 +131,28 @@ class JournalistRequestAdmin(admin.ModelAdmin):
     def reject_requests(self, request, queryset):
         queryset.update(status='rejected')
     reject_requests.short_description = "Reject selected journalist requests"
+
+
+# ============================================================
+# EXTERNAL ARTICLES (newsdata.io store)
+# ============================================================
+@admin.register(ExternalArticle)
+class ExternalArticleAdmin(admin.ModelAdmin):
+    list_display = ('title', 'category', 'source_id', 'published_at', 'fetched_at')
+    list_filter = ('category',)
+    search_fields = ('title',)
+    date_hierarchy = 'published_at'
+    ordering = ('-published_at',)
+
+
+# ============================================================
+# DASHBOARD STATISTICS (read-only; fixed by `manage.py reconcile_counters`)
+# ============================================================
+@admin.register(DashboardStats)
+class DashboardStatsAdmin(admin.ModelAdmin):
+    list_display = ('key', 'posts_draft', 'posts_pending', 'posts_published',
+                    'comments', 'likes', 'subscribers', 'categories', 'updated_at')
+    readonly_fields = [f.name for f in DashboardStats._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
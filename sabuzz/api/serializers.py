@@ -1,7 +1,30 @@
 from rest_framework import serializers
 from sabuzz.models import Post
 
-class PostSerializer(serializers.ModelSerializer):
+
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """
+    ModelSerializer that can be cut down to a subset of its fields,
+    either with a `fields=` kwarg or a `?fields=id,title` query parameter.
+    """
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+
+        if fields is None:
+            request = self.context.get('request')
+            param = None
+            if request is not None and request.method in ('GET', 'HEAD'):
+                param = request.query_params.get('fields')
+            if param:
+                fields = [f.strip() for f in param.split(',') if f.strip()]
+
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class PostSerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = Post
         fields = [
@@ -10,6 +33,7 @@ class PostSerializer(serializers.ModelSerializer):
             'content',
             'author',
             'created_at',
+            'updated_at',
             'category',
             'status',
         ]
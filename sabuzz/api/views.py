@@ -1,7 +1,11 @@
 from rest_framework import viewsets, permissions # pyright: ignore[reportMissingImports]
 from rest_framework.permissions import IsAuthenticatedOrReadOnly # pyright: ignore[reportMissingImports]
 from rest_framework.exceptions import PermissionDenied # pyright: ignore[reportMissingImports]
-from sabuzz.models import Post
+from django.db.models import Q
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from sabuzz.services import posts_queryset, posts_validators
+from .pagination import PostCursorPagination
 from .serializers import PostSerializer
 
 class IsOwnerOrReadOnly(permissions.BasePermission):
@@ -16,9 +20,73 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
         return obj.author == request.user
 
 class PostViewSet(viewsets.ModelViewSet):
-    queryset = Post.objects.all().order_by('-created_at')
+    """
+    Posts API.
+
+    GET /api/posts/                    published posts, newest first, cursor paginated
+    GET /api/posts/?status=draft       your own drafts (all drafts for superusers)
+    GET /api/posts/?fields=id,title    only return these fields (e.g. skip `content`)
+
+    GET responses carry ETag / Last-Modified and answer 304 when nothing changed.
+    """
     serializer_class = PostSerializer
     permission_classes = [IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
+    pagination_class = PostCursorPagination
+
+    def get_queryset(self):
+        # same queryset the server-rendered posts page uses (sabuzz/services.py)
+        fields = None
+        param = self.request.query_params.get('fields')
+        if param and self.request.method in ('GET', 'HEAD'):
+            fields = [f.strip() for f in param.split(',') if f.strip()]
+        qs = posts_queryset(fields=fields)
+        user = self.request.user
+
+        if self.action == 'list':
+            status = self.request.query_params.get('status', 'published')
+            if status not in dict(qs.model.STATUS_CHOICES):
+                status = 'published'
+            qs = qs.filter(status=status)
+            if status != 'published' and not user.is_superuser:
+                if not user.is_authenticated:
+                    raise PermissionDenied("Log in to list unpublished posts.")
+                qs = qs.filter(author=user)
+            return qs
+
+        # detail routes: published posts, plus your own (everything for superusers)
+        if user.is_superuser:
+            return qs
+        if user.is_authenticated:
+            return qs.filter(Q(status='published') | Q(author=user))
+        return qs.filter(status='published')
+
+    def _conditional(self, request, handler, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return handler(request, *args, **kwargs)
+
+        qs = self.filter_queryset(self.get_queryset())
+        if self.action == 'retrieve':
+            qs = qs.filter(pk=kwargs.get(self.lookup_url_kwarg or self.lookup_field))
+        etag, last_modified = posts_validators(qs, request.get_full_path(), request.user)
+
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified)
+            response['Cache-Control'] = 'private, no-cache'
+            patch_vary_headers(response, ['Cookie'])
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(request, super().retrieve, *args, **kwargs)
 
     def perform_create(self, serializer):
         # set the author to the logged-in user, force pending status
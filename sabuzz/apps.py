@@ -6,4 +6,6 @@ class SabuzzConfig(AppConfig):
     name = 'sabuzz'
 
     def ready(self):
-        import sabuzz.signals
\ No newline at end of file
+        import sabuzz.signals
+        from sabuzz import metrics
+        metrics.install()
\ No newline at end of file
@@ -0,0 +1,360 @@
+# sabuzz/benchmark.py
+"""
+Per-view latency benchmarks (`manage.py benchmark`).
+
+Each scenario requests one page through the Django test client, the whole
+middleware stack included, as a given user. For every scenario we report
+p50/p95/p99 latency, the SQL query count and the peak Python memory
+allocated while handling a request. Memory is sampled in a separate, shorter
+pass because tracemalloc slows everything down and would skew the timings.
+
+run_concurrency() is the database side: worker threads issue a mix of
+listing/detail reads and comment/like/save writes (signals included) for a
+fixed time, for increasing thread counts, and we report read and write
+throughput, p95 latencies and "database is locked" failures per level.
+
+Outbound APIs never leave the process: fake_upstreams() swaps the pooled
+sessions in sabuzz/http_client.py for canned newsdata.io / open-meteo /
+openweathermap responses, so the client's timeouts, circuit breakers and
+metrics still run, with an optional simulated upstream latency.
+"""
+import json
+import math
+import platform
+import random
+import statistics
+import subprocess
+import time
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from unittest import mock
+
+import django
+import requests
+from django.contrib.auth.models import User
+from django.db import OperationalError, connection, connections
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import http_client, news
+from .models import Comment, Favorite, Like, Post, SavedPost
+
+# (name, who, path); paths are formatted with the targets picked by prepare()
+SCENARIOS = [
+    ("home_anonymous", None, "/"),
+    ("home", "reader", "/"),
+    ("post_detail", "reader", "/post/{hot_post}/"),
+    ("dashboard_admin", "admin", "/dashboard/"),
+    ("dashboard_journalist", "journalist", "/dashboard/"),
+    ("dashboard_posts", "admin", "/dashboard/posts/"),
+    ("favorites", "reader", "/favorites/"),
+    ("api_posts_list", None, "/api/posts/"),
+    ("api_posts_detail", None, "/api/posts/{hot_post}/"),
+]
+
+FAKE_ARTICLES = 30
+
+
+# -------------------------
+# Fake upstream APIs
+# -------------------------
+def fake_articles(count=FAKE_ARTICLES):
+    return [
+        {
+            "title": f"Benchmark headline {i}",
+            "link": f"https://news.example.com/articles/bench-{i}",
+            "description": "Synthetic article served by the benchmark fake of newsdata.io.",
+            "image_url": f"https://news.example.com/images/bench-{i}.jpg",
+            "source_id": "example_news",
+            "pubDate": "2025-01-01 12:00:00",
+        }
+        for i in range(count)
+    ]
+
+
+class FakeSession:
+    """Stands in for the requests.Session of one upstream host."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def body(self, url):
+        if "newsdata.io" in url:
+            return {"status": "success", "results": fake_articles()}
+        if "open-meteo" in url:
+            return {"current_weather": {"temperature": 21.5, "windspeed": 9.0}}
+        if "openweathermap" in url:
+            return {"name": "Benchmark", "main": {"temp": 21.5}, "weather": [{"description": "clear sky"}]}
+        return {}
+
+    def get(self, url, params=None, timeout=None, **kwargs):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.headers["Content-Type"] = "application/json"
+        response._content = json.dumps(self.body(url)).encode()
+        return response
+
+
+@contextmanager
+def fake_upstreams(latency=0.0):
+    session = FakeSession(latency)
+    with mock.patch.object(http_client, "get_session", lambda host: session):
+        yield session
+
+
+# -------------------------
+# Running
+# -------------------------
+def prepare(existing=False):
+    """
+    Pick the users and objects the scenarios run against: the busiest
+    journalist, the reader with the most favorites and the most commented
+    published post.
+
+    In a throwaway benchmark database a superuser is created when there is
+    none and the article store is filled from the faked upstream. With
+    existing=True nothing is written: the admin scenarios run as the first
+    superuser, if any, and the feed reads whatever the store holds.
+    """
+    admin = User.objects.filter(is_superuser=True).order_by("pk").first()
+    if admin is None and not existing:
+        admin = User.objects.create_superuser("bench_admin", "bench_admin@example.com", None)
+    top_author = (
+        Post.objects.order_by().values("author_id").annotate(n=Count("id")).order_by("-n").first()
+    )
+    top_reader = (
+        Favorite.objects.order_by().values("user_id").annotate(n=Count("id")).order_by("-n").first()
+    )
+    hot_post = Post.objects.filter(status="published").order_by("-comment_count", "-pk").first()
+    if top_author is None or hot_post is None:
+        raise ValueError("No published posts to benchmark; seed the database first.")
+
+    if not existing:
+        # the home feed reads the local article store, as it does in production
+        with fake_upstreams():
+            news.store_articles(news.fetch_articles())
+
+    return {
+        "users": {
+            "admin": admin,
+            "journalist": User.objects.get(pk=top_author["author_id"]),
+            "reader": User.objects.get(pk=top_reader["user_id"]) if top_reader else admin,
+        },
+        "targets": {"hot_post": hot_post.pk},
+    }
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+def _client(user):
+    client = Client()
+    if user is not None:
+        client.force_login(user)
+    return client
+
+
+def run_scenario(client, path, rounds=50, warmup=5, memory_samples=5):
+    for _ in range(warmup):
+        client.get(path)
+
+    timings, queries, statuses = [], [], set()
+    for _ in range(rounds):
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = client.get(path)
+            timings.append(time.perf_counter() - start)
+        queries.append(len(captured.captured_queries))
+        statuses.add(response.status_code)
+
+    peak = 0
+    if memory_samples:
+        tracemalloc.start()
+        try:
+            for _ in range(memory_samples):
+                tracemalloc.reset_peak()
+                client.get(path)
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+
+    timings.sort()
+    return {
+        "path": path,
+        "status": sorted(statuses),
+        "requests": rounds,
+        "p50_ms": _ms(percentile(timings, 50)),
+        "p95_ms": _ms(percentile(timings, 95)),
+        "p99_ms": _ms(percentile(timings, 99)),
+        "mean_ms": _ms(statistics.fmean(timings)),
+        "max_ms": _ms(timings[-1]),
+        "queries": max(queries),
+        "queries_min": min(queries),
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def run(scenarios=SCENARIOS, rounds=50, warmup=5, memory_samples=5, upstream_latency=0.0, log=None,
+        existing=False):
+    """Benchmark every scenario; returns {name: result}."""
+    log = log or (lambda message: None)
+    context = prepare(existing=existing)
+    results = {}
+    with fake_upstreams(upstream_latency):
+        for name, who, path in scenarios:
+            path = path.format(**context["targets"])
+            user = context["users"].get(who) if who else None
+            results[name] = {
+                "user": who or "anonymous",
+                **run_scenario(_client(user), path, rounds, warmup, memory_samples),
+            }
+            result = results[name]
+            log(f"{name:<22} p50 {result['p50_ms']:>8} ms  p95 {result['p95_ms']:>8} ms  "
+                f"p99 {result['p99_ms']:>8} ms  {result['queries']:>3} queries  "
+                f"{result['peak_memory_kb']:>8} KiB")
+    return results
+
+
+# -------------------------
+# Database concurrency
+# -------------------------
+def _read(rng, post_ids):
+    if rng.random() < 0.5:
+        list(Post.objects.filter(status="published").order_by("-created_at", "-id").values("id", "title")[:20])
+    else:
+        post = Post.objects.select_related("author", "category").get(pk=rng.choice(post_ids))
+        list(Comment.objects.filter(post=post, approved=True).order_by("-date_posted", "-id")[:50])
+
+
+def _write(rng, post_ids, user_ids):
+    roll, post_id, user_id = rng.random(), rng.choice(post_ids), rng.choice(user_ids)
+    if roll < 0.5:
+        Comment.objects.create(post_id=post_id, user_id=user_id, text="Concurrent comment")
+    elif roll < 0.8:
+        Like.objects.create(post_id=post_id, user_id=user_id)
+    else:
+        SavedPost.objects.get_or_create(post_id=post_id, user_id=user_id)
+
+
+def _worker(seed, stop, write_share, post_ids, user_ids, results):
+    rng = random.Random(seed)
+    reads, writes, errors = [], [], 0
+    try:
+        while not stop.is_set():
+            is_write = rng.random() < write_share
+            start = time.perf_counter()
+            try:
+                if is_write:
+                    _write(rng, post_ids, user_ids)
+                else:
+                    _read(rng, post_ids)
+            except OperationalError:  # "database is locked"
+                errors += 1
+                continue
+            (writes if is_write else reads).append(time.perf_counter() - start)
+    finally:
+        connections.close_all()
+        results.append((reads, writes, errors))
+
+
+def run_concurrency(threads=(1, 2, 4, 8, 16), duration=5.0, write_share=0.2, log=None):
+    """Mixed read/write load at each thread count; returns one result per level."""
+    log = log or (lambda message: None)
+    post_ids = list(Post.objects.filter(status="published").values_list("pk", flat=True))
+    user_ids = list(User.objects.values_list("pk", flat=True))
+    if not post_ids:
+        raise ValueError("No published posts to benchmark; seed the database first.")
+
+    levels = []
+    for count in threads:
+        stop, results = threading.Event(), []
+        workers = [
+            threading.Thread(target=_worker, args=(i, stop, write_share, post_ids, user_ids, results))
+            for i in range(count)
+        ]
+        for worker in workers:
+            worker.start()
+        time.sleep(duration)
+        stop.set()
+        for worker in workers:
+            worker.join()
+
+        reads = sorted(t for r, _, _ in results for t in r)
+        writes = sorted(t for _, w, _ in results for t in w)
+        level = {
+            "threads": count,
+            "reads_per_s": round(len(reads) / duration, 1),
+            "writes_per_s": round(len(writes) / duration, 1),
+            "read_p95_ms": _ms(percentile(reads, 95)) if reads else None,
+            "write_p95_ms": _ms(percentile(writes, 95)) if writes else None,
+            "write_max_ms": _ms(writes[-1]) if writes else None,
+            "locked_errors": sum(e for _, _, e in results),
+        }
+        levels.append(level)
+        log(f"{count:>3} threads  {level['reads_per_s']:>8} reads/s  {level['writes_per_s']:>7} writes/s  "
+            f"read p95 {level['read_p95_ms']} ms  write p95 {level['write_p95_ms']} ms  "
+            f"{level['locked_errors']} locked")
+    return levels
+
+
+def sqlite_settings():
+    """The pragmas in effect on this connection (SQLite only)."""
+    if connection.vendor != "sqlite":
+        return None
+    values = {}
+    with connection.cursor() as cursor:
+        for name in ("journal_mode", "synchronous", "cache_size", "mmap_size", "busy_timeout"):
+            cursor.execute(f"PRAGMA {name}")
+            values[name] = cursor.fetchone()[0]
+    return values
+
+
+def environment():
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except Exception:
+        revision = None
+    return {
+        "timestamp": timezone.now().isoformat(),
+        "revision": revision,
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+        "database_version": ".".join(map(str, connection.Database.sqlite_version_info))
+        if connection.vendor == "sqlite" else None,
+        "machine": platform.machine(),
+    }
+
+
+def compare(current, previous):
+    """Lines comparing p95 latency and queries with an earlier results file."""
+    lines = []
+    for name, result in current["views"].items():
+        before = previous.get("views", {}).get(name)
+        if not before:
+            continue
+        change = (result["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100 if before["p95_ms"] else 0.0
+        lines.append(
+            f"{name:<22} p95 {before['p95_ms']:>8} -> {result['p95_ms']:>8} ms ({change:+.1f}%)  "
+            f"queries {before['queries']} -> {result['queries']}"
+        )
+    return lines
@@ -0,0 +1,156 @@
+# sabuzz/cache.py
+"""
+Small in-process caches used in front of outbound API calls.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key into one.
+    The first caller runs fn(); everyone else arriving while it runs waits and gets the same result.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {"event": threading.Event(), "result": None, "error": None}
+
+        if not leader:
+            call["event"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+
+        try:
+            call["result"] = fn()
+            return call["result"]
+        except Exception as exc:
+            call["error"] = exc
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call["event"].set()
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+
+class TTLCache:
+    """
+    Bounded LRU cache with a per-entry TTL and stale-while-revalidate.
+
+    - fresh entry      -> returned straight away (hit)
+    - stale entry      -> returned straight away, one background refresh is started (stale hit)
+    - missing / too old -> fetched in the caller's thread; concurrent callers share that fetch (miss)
+
+    get_nowait() is the same lookup for callers that must never wait on the
+    fetch: a miss starts a background load and returns None.
+    """
+
+    def __init__(self, maxsize=256, stale_ttl=0):
+        self.maxsize = maxsize
+        self.stale_ttl = stale_ttl
+        self._data = OrderedDict()  # key -> (value, fresh_until)
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._refreshing = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.errors = 0
+
+    def _lookup(self, key, fetch, ttl):
+        # called with self._lock held; (True, value) on a fresh or stale hit
+        entry = self._data.get(key)
+        if entry is not None:
+            value, fresh_until = entry
+            now = time.monotonic()
+            if now < fresh_until:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return True, value
+            if now < fresh_until + self.stale_ttl:
+                self._data.move_to_end(key)
+                self.stale_hits += 1
+                self._refresh_in_background(key, fetch, ttl)
+                return True, value
+        self.misses += 1
+        return False, None
+
+    def get_or_fetch(self, key, fetch, ttl):
+        with self._lock:
+            found, value = self._lookup(key, fetch, ttl)
+        if found:
+            return value
+        return self._flight.do(key, lambda: self._load(key, fetch, ttl))
+
+    def get_nowait(self, key, fetch, ttl):
+        """The cached value (fresh or stale), or None after starting a background load."""
+        with self._lock:
+            found, value = self._lookup(key, fetch, ttl)
+            if not found:
+                self._refresh_in_background(key, fetch, ttl)
+        return value
+
+    def _load(self, key, fetch, ttl):
+        try:
+            value = fetch()
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        self.set(key, value, ttl)
+        return value
+
+    def _refresh_in_background(self, key, fetch, ttl):
+        # called with self._lock held
+        if key in self._refreshing or self._flight.in_flight(key):
+            return
+        self._refreshing.add(key)
+        self.refreshes += 1
+
+        def run():
+            try:
+                self._flight.do(key, lambda: self._load(key, fetch, ttl))
+            except Exception:
+                pass  # keep serving the stale value until the next attempt
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+                "errors": self.errors,
+            }
@@ -1,19 +1,15 @@
 # sabuzz/context_processors.py
-import requests
-from django.conf import settings
+from . import roles
+from .weather import get_snapshot
 
 def user_roles(request):
     """
     Adds is_journalist boolean to all templates.
-    Avoids importing views to prevent circular imports.
+    Resolved once per request and cached across requests by sabuzz/roles.py.
     """
     user = getattr(request, "user", None)
     try:
-        is_journalist = bool(
-            user and user.is_authenticated and (
-                user.is_superuser or user.groups.filter(name="Journalists").exists()
-            )
-        )
+        is_journalist = roles.is_journalist(user)
     except Exception:
         is_journalist = False
 
@@ -23,6 +19,7 @@ def user_roles(request):
 def global_weather(request):
     """
     Minimal, defensive weather context processor.
-    Returns 'global_weather' dict used by navbar (or None on failure).
+    Returns 'global_weather' dict used by navbar (or None until the first snapshot exists).
+    The snapshot is read from the cache, so this never makes a network call.
     """
-    return {"OPENWEATHER_API_KEY": settings.OPENWEATHER_API_KEY}
+    return {"global_weather": get_snapshot()}
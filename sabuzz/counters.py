@@ -0,0 +1,76 @@
+# sabuzz/counters.py
+"""
+Denormalized like/comment counters on Post.
+
+Every change is a single atomic `UPDATE ... SET x = x + n` (F() expression),
+so concurrent likes/comments never lose updates. Anything that bypasses the
+signals (queryset.update(), raw SQL) can make them drift; reconcile() repairs
+them from the real rows.
+"""
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Post, Comment, Like
+
+
+def adjust(post_id, **deltas):
+    """adjust(post.id, like_count=1, comment_count=-1) in one UPDATE."""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    Post.objects.filter(pk=post_id).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+
+
+def comment_added(comment):
+    adjust(comment.post_id, comment_count=1, approved_comment_count=1 if comment.approved else 0)
+
+
+def comment_removed(comment):
+    adjust(comment.post_id, comment_count=-1, approved_comment_count=-1 if comment.approved else 0)
+
+
+def comment_approval_changed(comment, was_approved):
+    if comment.approved != was_approved:
+        adjust(comment.post_id, approved_comment_count=1 if comment.approved else -1)
+
+
+def like_added(like):
+    adjust(like.post_id, like_count=1)
+
+
+def like_removed(like):
+    adjust(like.post_id, like_count=-1)
+
+
+def _count_subquery(model, **filters):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(post=OuterRef("pk"), **filters)
+            .order_by().values("post").annotate(n=Count("id")).values("n"),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+def reconcile():
+    """Recompute every post's counters from the Like/Comment tables. Returns posts fixed."""
+    drifted = Post.objects.annotate(
+        real_likes=_count_subquery(Like),
+        real_comments=_count_subquery(Comment),
+        real_approved=_count_subquery(Comment, approved=True),
+    ).filter(
+        ~Q(like_count=F("real_likes"))
+        | ~Q(comment_count=F("real_comments"))
+        | ~Q(approved_comment_count=F("real_approved"))
+    ).values_list("pk", "real_likes", "real_comments", "real_approved")
+
+    fixed = 0
+    for pk, likes, comments, approved in list(drifted):
+        Post.objects.filter(pk=pk).update(
+            like_count=likes, comment_count=comments, approved_comment_count=approved
+        )
+        fixed += 1
+    return fixed
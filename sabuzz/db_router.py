@@ -0,0 +1,196 @@
+# sabuzz/db_router.py
+"""
+Read replicas (settings.DATABASE_REPLICAS, filled from SQLITE_REPLICAS).
+
+ReplicaRouter sends ORM reads to a random replica and every write to the
+primary ("default"), but only for the reads of a safe request (GET/HEAD:
+the feed, post_detail, category pages, API GETs) that ReplicaMiddleware has
+marked as replica-safe. Everything else reads from the primary: unsafe
+requests, reads inside a transaction, management commands and background
+threads.
+
+Read-your-writes: once a request writes (a POST, or a GET that saves
+something), the browser gets a short-lived cookie, and for
+REPLICA_PIN_SECONDS its requests read from the primary, long enough for the
+replicas to catch up. A later read in that same request also goes to the
+primary. Sessions and users are always read from the primary, so a fresh
+login or sign-up never looks logged out on a lagging replica.
+REPLICA_PIN_SECONDS must be at least the replicas' refresh interval
+(`sync_replicas --loop` refuses a longer one).
+
+Shared caches that signals invalidate (the page cache, the posts service,
+roles) are filled inside `with primary():`. A miss rendered from a lagging
+replica would otherwise store the old content under the new version for the
+whole TTL. Template fragments use cache_ttl(), which is 0 (read but don't
+store) while a request reads from replicas.
+
+With SQLite, a replica is a copy of the primary file refreshed by
+`manage.py sync_replicas`. Another database's streaming replicas plug in the
+same way, as extra DATABASES aliases.
+"""
+import contextvars
+import random
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.decorators import sync_and_async_middleware
+
+PRIMARY = DEFAULT_DB_ALIAS
+PIN_COOKIE = "sabuzz_primary"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+PRIMARY_ONLY_APPS = {"sessions", "auth"}
+
+_state = contextvars.ContextVar("sabuzz_db_routing", default=None)
+
+
+class RoutingState:
+    __slots__ = ("use_replicas", "wrote", "forced")
+
+    def __init__(self, use_replicas):
+        self.use_replicas = use_replicas
+        self.wrote = False
+        self.forced = 0  # depth of primary() blocks
+
+
+def replicas():
+    return list(getattr(settings, "DATABASE_REPLICAS", []))
+
+
+def pin_seconds():
+    return getattr(settings, "REPLICA_PIN_SECONDS", 5)
+
+
+def reading_replicas():
+    """True when reads made right now would go to a replica."""
+    state = _state.get()
+    return bool(state and state.use_replicas and not state.wrote and not state.forced and replicas())
+
+
+@contextmanager
+def primary():
+    """Read from the primary inside this block, e.g. to fill a shared cache."""
+    state = _state.get()
+    if state is None:
+        yield
+        return
+    state.forced += 1
+    try:
+        yield
+    finally:
+        state.forced -= 1
+
+
+def cache_ttl(ttl):
+    """`ttl` for a cache filled by the current request, or 0 (don't store) if it reads from replicas."""
+    return 0 if reading_replicas() else ttl
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.use_replicas or state.wrote or state.forced:
+            return PRIMARY
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return PRIMARY
+        if connections[PRIMARY].in_atomic_block:
+            return PRIMARY  # read inside a write transaction: see its own rows
+        aliases = replicas()
+        return random.choice(aliases) if aliases else PRIMARY
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the primary
+        same_data = {PRIMARY, *replicas()}
+        if obj1._state.db in same_data and obj2._state.db in same_data:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return False if db in replicas() else None
+
+
+# -------------------------
+# Middleware
+# -------------------------
+def _pinned(request):
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def _begin(request):
+    use = bool(replicas()) and request.method in SAFE_METHODS and not _pinned(request)
+    state = RoutingState(use_replicas=use)
+    return state, _state.set(state)
+
+
+def _finish(request, response, state):
+    if state.wrote or request.method not in SAFE_METHODS:
+        seconds = pin_seconds()
+        response.set_cookie(
+            PIN_COOKIE, str(int(time.time() + seconds)), max_age=seconds, httponly=True, samesite="Lax",
+        )
+    return response
+
+
+@sync_and_async_middleware
+def ReplicaMiddleware(get_response):
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            state, token = _begin(request)
+            try:
+                response = await get_response(request)
+            finally:
+                _state.reset(token)
+            return _finish(request, response, state)
+        markcoroutinefunction(middleware)
+    else:
+        def middleware(request):
+            state, token = _begin(request)
+            try:
+                response = get_response(request)
+            finally:
+                _state.reset(token)
+            return _finish(request, response, state)
+    return middleware
+
+
+# -------------------------
+# SQLite replicas
+# -------------------------
+def copy_database(source, target_path):
+    """
+    Copy an open sqlite3 connection's database to target_path with SQLite's
+    online backup API: a consistent snapshot, even while others write.
+    """
+    target = sqlite3.connect(target_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+
+
+def sync_replicas():
+    """Refresh every SQLite replica from the primary; returns the aliases copied."""
+    primary = connections[PRIMARY]
+    primary.ensure_connection()
+    copied = []
+    for alias in replicas():
+        replica = connections[alias]
+        if replica.vendor != "sqlite" or primary.vendor != "sqlite":
+            continue
+        replica.close()  # drop our own handle so the copy isn't read half-written
+        copy_database(primary.connection, replica.settings_dict["NAME"])
+        copied.append(alias)
+    return copied
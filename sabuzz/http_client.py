@@ -0,0 +1,171 @@
+# sabuzz/http_client.py
+"""
+Shared HTTP client for outbound API calls (newsdata.io, open-meteo, openweathermap).
+
+- one pooled keep-alive requests.Session per host
+- per-host (connect, read) timeouts
+- bounded retries with jittered exponential backoff for idempotent GETs
+- a per-host circuit breaker that fails fast while an upstream is down
+"""
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from . import metrics
+
+DEFAULT_TIMEOUT = (3.05, 5)
+
+DEFAULT_HOST_TIMEOUTS = {
+    "newsdata.io": (3.05, 5),
+    "api.open-meteo.com": (2, 3),
+    "api.openweathermap.org": (2, 3),
+}
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised instead of calling a host whose circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    closed    -> calls go through; `failure_threshold` consecutive failures open the circuit
+    open      -> calls fail immediately until `reset_timeout` seconds have passed
+    half-open -> one trial call is let through; success closes, failure re-opens
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+
+_lock = threading.Lock()
+_sessions = {}
+_breakers = {}
+
+
+def _client_setting(name, default):
+    return getattr(settings, "EXTERNAL_API_CLIENT", {}).get(name, default)
+
+
+def _make_session():
+    retry = Retry(
+        total=_client_setting("retries", 2),
+        connect=_client_setting("retries", 2),
+        read=1,
+        backoff_factor=_client_setting("backoff_factor", 0.3),
+        backoff_jitter=_client_setting("backoff_jitter", 0.3),
+        status_forcelist=(429, 502, 503, 504),
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=_client_setting("pool_maxsize", 20),
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session(host):
+    with _lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = _sessions[host] = _make_session()
+        return session
+
+
+def get_breaker(host):
+    with _lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = _breakers[host] = CircuitBreaker(
+                failure_threshold=_client_setting("failure_threshold", 5),
+                reset_timeout=_client_setting("reset_timeout", 30),
+            )
+        return breaker
+
+
+def get_timeout(host):
+    timeouts = {**DEFAULT_HOST_TIMEOUTS, **_client_setting("timeouts", {})}
+    return timeouts.get(host, DEFAULT_TIMEOUT)
+
+
+def get(url, params=None, timeout=None, **kwargs):
+    """
+    GET through the pooled session for the url's host.
+    Raises CircuitOpenError (a requests.ConnectionError) without touching the network
+    while that host's circuit is open.
+    """
+    host = urlsplit(url).hostname or ""
+    breaker = get_breaker(host)
+    if not breaker.allow():
+        raise CircuitOpenError(f"Circuit open for {host}")
+
+    start = time.perf_counter()
+    try:
+        response = get_session(host).get(url, params=params, timeout=timeout or get_timeout(host), **kwargs)
+    except requests.RequestException:
+        breaker.record_failure()
+        raise
+    finally:
+        metrics.record_external(host, time.perf_counter() - start)
+
+    if response.status_code >= 500:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    return response
+
+
+def breaker_states():
+    with _lock:
+        breakers = dict(_breakers)
+    return {host: breaker.state for host, breaker in breakers.items()}
@@ -0,0 +1,171 @@
+# sabuzz/images.py
+"""
+Resized WebP derivatives of uploaded post and profile images.
+
+Each spec names a display slot (card grid, avatar) and the widths rendered
+for it. Derivatives are written next to the media under derivatives/,
+re-encoded as WebP with EXIF/ICC metadata dropped and the orientation baked
+in. Only the spec an image is shown with is built: after an upload (signals
+in sabuzz/signals.py), by `manage.py build_image_derivatives`, or lazily when
+the {% responsive_image %} tag finds it missing; until then the tag falls
+back to the original file. Images are never upscaled, so a small original
+gets fewer, smaller files, named after the width they really have.
+"""
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# name: (widths, aspect ratio height/width or None to keep the original's)
+SPECS = {
+    "avatar": ((48, 96, 192), 1.0),
+    "card": ((320, 640, 960), 0.6),
+}
+
+WEBP_QUALITY = 80
+DERIVATIVE_DIR = "derivatives"
+READY_KEY = "sabuzz:img:{name}:{spec}"
+READY_TTL = 60 * 60 * 24
+FAILED_TTL = 60 * 5  # a build that failed is not retried on every render
+
+_FILE_RE = re.compile(r"^(?P<spec>[a-z]+)-(?P<width>\d+)\.webp$")
+
+_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="images")
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def _directory(name):
+    return f"{DERIVATIVE_DIR}/{os.path.splitext(name)[0]}"
+
+
+def derivative_name(name, spec, width):
+    return f"{_directory(name)}/{spec}-{width}.webp"
+
+
+def built_widths(name, spec, storage=default_storage):
+    """Sorted widths of the spec's derivatives that exist for name."""
+    try:
+        _, files = storage.listdir(_directory(name))
+    except (FileNotFoundError, NotImplementedError):
+        return []
+    widths = []
+    for filename in files:
+        match = _FILE_RE.match(filename)
+        if match and match["spec"] == spec:
+            widths.append(int(match["width"]))
+    return sorted(widths)
+
+
+def _size(image, width, ratio):
+    """(width, height) of the derivative for a nominal width: never larger than the original."""
+    if ratio is None:
+        width = min(width, image.width)
+        return width, round(image.height * width / image.width)
+    # cropped to the slot's shape around the centre
+    width = min(width, image.width, round(image.height / ratio))
+    return width, round(width * ratio)
+
+
+def _render(image, size, ratio):
+    if size == (image.width, image.height):
+        return image.copy()
+    if ratio is None:
+        return image.resize(size, Image.LANCZOS)
+    return ImageOps.fit(image, size, Image.LANCZOS)
+
+
+def _encode(image):
+    buffer = BytesIO()
+    # no exif= / icc_profile= arguments, so no metadata is written
+    image.save(buffer, "WEBP", quality=WEBP_QUALITY, method=6)
+    return buffer.getvalue()
+
+
+def _delete(name, spec, storage):
+    for width in built_widths(name, spec, storage):
+        storage.delete(derivative_name(name, spec, width))
+    cache.delete(READY_KEY.format(name=name, spec=spec))
+
+
+def generate(name, spec, storage=default_storage):
+    """Build one spec's derivatives of a stored image. Returns the widths written."""
+    with storage.open(name, "rb") as source:
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+
+    nominal, ratio = SPECS[spec]
+    sizes = {}
+    for width in nominal:
+        size = _size(image, width, ratio)
+        sizes[size[0]] = size  # nominal widths above the original collapse into one file
+
+    _delete(name, spec, storage)
+    for width, size in sorted(sizes.items()):
+        storage.save(derivative_name(name, spec, width), ContentFile(_encode(_render(image, size, ratio))))
+    widths = sorted(sizes)
+    cache.set(READY_KEY.format(name=name, spec=spec), widths, timeout=READY_TTL)
+    return widths
+
+
+def delete_derivatives(name, storage=default_storage):
+    for spec in SPECS:
+        _delete(name, spec, storage)
+
+
+def _generate_logged(name, spec):
+    try:
+        generate(name, spec)
+    except Exception:
+        logger.exception("Could not build %s derivatives for %s", spec, name)
+        cache.set(READY_KEY.format(name=name, spec=spec), [], timeout=FAILED_TTL)
+    finally:
+        with _pending_lock:
+            _pending.discard((name, spec))
+
+
+def schedule(name, spec):
+    """Build one spec of name in the background (once, however often it is asked)."""
+    if not name:
+        return
+    with _pending_lock:
+        if (name, spec) in _pending:
+            return
+        _pending.add((name, spec))
+    _pool.submit(_generate_logged, name, spec)
+
+
+def ready(name, spec):
+    """
+    The built widths of the spec (truthy), or [] after scheduling a build.
+    Cached widths are checked against the files, so a pruned derivative is
+    rebuilt; a build that failed is only retried after FAILED_TTL.
+    """
+    key = READY_KEY.format(name=name, spec=spec)
+    widths = cache.get(key)
+    if widths == []:
+        return widths
+    if widths and all(default_storage.exists(derivative_name(name, spec, w)) for w in widths):
+        return widths
+    pruned = bool(widths)
+    widths = built_widths(name, spec)
+    if widths and not pruned:
+        cache.set(key, widths, timeout=READY_TTL)
+        return widths
+    schedule(name, spec)  # meanwhile whatever is left on disk is served
+    return widths
+
+
+def srcset(name, spec):
+    """[(url, real width)] for the spec, or [] if the derivatives are not built yet."""
+    return [(default_storage.url(derivative_name(name, spec, w)), w) for w in ready(name, spec)]
@@ -0,0 +1,114 @@
+# sabuzz/management/commands/benchmark.py
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from sabuzz import benchmark
+from sabuzz.seeding import SCALES, TABLES, scale_counts, seed
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database at the given scale and report p50/p95/p99 "
+        "latency, query count and peak memory per view as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scale", default="10k",
+            help=f"Rows per table: one of {', '.join(SCALES)} or a number (default 10k).",
+        )
+        for table in TABLES:
+            parser.add_argument(f"--{table.replace('_', '-')}", type=int, help=f"Override the number of {table}.")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic data.")
+        parser.add_argument("--requests", type=int, default=50, help="Timed requests per view.")
+        parser.add_argument("--warmup", type=int, default=5, help="Untimed requests per view first.")
+        parser.add_argument("--memory-samples", type=int, default=5, help="Requests per view traced for peak memory.")
+        parser.add_argument(
+            "--upstream-latency", type=float, default=0.0,
+            help="Seconds each faked newsdata.io / weather call takes.",
+        )
+        parser.add_argument(
+            "--only", action="append", default=[],
+            help="Only run this scenario (repeatable): " + ", ".join(name for name, _, _ in benchmark.SCENARIOS),
+        )
+        parser.add_argument(
+            "--existing", action="store_true",
+            help="Benchmark the configured database as it is instead of seeding a test database.",
+        )
+        parser.add_argument("--output", help="Write the JSON results here (default: benchmark-results/<scale>-<time>.json).")
+        parser.add_argument("--compare", help="Earlier results file to compare p95 latency and queries with.")
+
+    def handle(self, *args, **options):
+        scenarios = benchmark.SCENARIOS
+        if options["only"]:
+            unknown = set(options["only"]) - {name for name, _, _ in scenarios}
+            if unknown:
+                raise CommandError(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+            scenarios = [s for s in scenarios if s[0] in options["only"]]
+
+        previous = None
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                previous = json.load(f)
+
+        counts = None
+        if not options["existing"]:
+            try:
+                counts = scale_counts(options["scale"])
+            except ValueError:
+                raise CommandError(f"Unknown scale {options['scale']!r}")
+            for table in TABLES:
+                if options[table] is not None:
+                    counts[table] = options[table]
+
+        setup_test_environment()
+        old_name = None
+        try:
+            if counts is not None:
+                old_name = connection.settings_dict["NAME"]
+                connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+                self.stdout.write(f"Seeding {', '.join(f'{n} {t}' for t, n in counts.items())}")
+                counts = seed(counts, seed=options["seed"], log=lambda m: self.stdout.write(f"  {m}"))
+
+            views = benchmark.run(
+                scenarios,
+                rounds=options["requests"],
+                warmup=options["warmup"],
+                memory_samples=options["memory_samples"],
+                upstream_latency=options["upstream_latency"],
+                log=self.stdout.write,
+                existing=options["existing"],
+            )
+        finally:
+            if old_name is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        results = {
+            "environment": benchmark.environment(),
+            "scale": "existing" if options["existing"] else options["scale"],
+            "seed": options["seed"],
+            "rows": counts,
+            "upstream_latency": options["upstream_latency"],
+            "views": views,
+        }
+
+        output = options["output"]
+        if not output:
+            stamp = results["environment"]["timestamp"][:19].replace(":", "").replace("-", "")
+            output = os.path.join("benchmark-results", f"{results['scale']}-{stamp}.json")
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {output}"))
+
+        for name, result in views.items():
+            if result["status"] != [200]:
+                self.stderr.write(f"{name} answered {result['status']}; its numbers are not comparable.")
+        if previous is not None:
+            for line in benchmark.compare(results, previous):
+                self.stdout.write(line)
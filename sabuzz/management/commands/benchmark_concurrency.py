@@ -0,0 +1,70 @@
+# sabuzz/management/commands/benchmark_concurrency.py
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from sabuzz import benchmark
+from sabuzz.seeding import scale_counts, seed
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure read/write throughput and 'database is locked' errors as worker "
+        "threads increase, on a seeded throwaway copy of the database. Run it once "
+        "per SQLITE_PROFILE to compare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", default="1,2,4,8,16", help="Comma-separated thread counts.")
+        parser.add_argument("--duration", type=float, default=5.0, help="Seconds per thread count.")
+        parser.add_argument("--write-share", type=float, default=0.2, help="Fraction of operations that write.")
+        parser.add_argument("--scale", default="1k", help="Seed size (see `manage.py seed`).")
+        parser.add_argument("--output", help="Write the JSON results here (default: benchmark-results/).")
+
+    def handle(self, *args, **options):
+        try:
+            threads = [int(n) for n in options["threads"].split(",") if n.strip()]
+        except ValueError:
+            raise CommandError("--threads takes numbers, e.g. 1,2,4,8")
+        if not threads or min(threads) < 1:
+            raise CommandError("--threads needs at least one positive count")
+
+        profile = getattr(settings, "SQLITE_PROFILE", "stock")
+        old_name = connection.settings_dict["NAME"]
+        with tempfile.TemporaryDirectory() as tmp:
+            if connection.vendor == "sqlite":
+                # WAL and file locking only exist for an on-disk database
+                connection.settings_dict["TEST"]["NAME"] = os.path.join(tmp, "concurrency.sqlite3")
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                seed(scale_counts(options["scale"]))
+                pragmas = benchmark.sqlite_settings()
+                self.stdout.write(f"Profile {profile}: {pragmas}")
+                levels = benchmark.run_concurrency(
+                    threads, duration=options["duration"], write_share=options["write_share"],
+                    log=self.stdout.write,
+                )
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        results = {
+            "environment": benchmark.environment(),
+            "profile": profile,
+            "engine": connection.settings_dict["ENGINE"],
+            "pragmas": pragmas,
+            "write_share": options["write_share"],
+            "duration": options["duration"],
+            "levels": levels,
+        }
+        output = options["output"]
+        if not output:
+            stamp = results["environment"]["timestamp"][:19].replace(":", "").replace("-", "")
+            output = os.path.join("benchmark-results", f"concurrency-{profile}-{stamp}.json")
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {output}"))
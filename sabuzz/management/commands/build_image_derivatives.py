@@ -0,0 +1,42 @@
+# sabuzz/management/commands/build_image_derivatives.py
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from sabuzz import images
+from sabuzz.models import Post, Profile
+
+
+class Command(BaseCommand):
+    help = (
+        "Build resized WebP derivatives: the card spec for post images, the avatar spec for "
+        "profile images (only missing ones unless --force)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Rebuild derivatives that already exist.")
+
+    def handle(self, *args, **options):
+        # identical uploads share one file, so one name can need both specs
+        wanted = {}
+        for name in Post.objects.exclude(image="").exclude(image=None).values_list("image", flat=True):
+            wanted.setdefault(name, set()).add("card")
+        for name in (
+            Profile.objects.exclude(profile_image="").exclude(profile_image=None)
+            .values_list("profile_image", flat=True)
+        ):
+            wanted.setdefault(name, set()).add("avatar")
+
+        built = 0
+        for name, specs in sorted(wanted.items()):
+            if not default_storage.exists(name):
+                self.stderr.write(f"Missing original: {name}")
+                continue
+            for spec in sorted(specs):
+                if images.built_widths(name, spec) and not options["force"]:
+                    continue
+                try:
+                    images.generate(name, spec)
+                    built += 1
+                except Exception as exc:
+                    self.stderr.write(f"Failed on {name} ({spec}): {exc}")
+        self.stdout.write(self.style.SUCCESS(f"Built {built} derivative sets for {len(wanted)} images."))
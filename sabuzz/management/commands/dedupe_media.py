@@ -0,0 +1,88 @@
+# sabuzz/management/commands/dedupe_media.py
+import os
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from sabuzz import page_cache
+from sabuzz.models import Post
+from sabuzz.storage import IMAGE_FIELDS, image_storage, references, release
+
+
+class Command(BaseCommand):
+    help = (
+        "Move existing post/profile images to content-addressed names, point the "
+        "rows at them and delete files no row references any more."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would change.")
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        renamed = 0
+        old_names = set()
+        post_ids = set()
+
+        for label, field in IMAGE_FIELDS:
+            model = apps.get_model(label)
+            names = (
+                model.objects.exclude(**{field: ""}).exclude(**{f"{field}__isnull": True})
+                .order_by().values_list(field, flat=True).distinct()
+            )
+            for name in names:
+                if not image_storage.exists(name):
+                    self.stderr.write(f"Missing file: {name}")
+                    continue
+                with image_storage.open(name, "rb") as content:
+                    new_name = image_storage.content_name(name, content)
+                    if new_name == name:
+                        continue
+                    self.stdout.write(f"{name} -> {new_name}")
+                    renamed += 1
+                    if dry_run:
+                        continue
+                    image_storage.save(name, content)
+                # queryset update: no signals, so the old file is released and
+                # the cached pages showing it are purged below
+                rows = model.objects.filter(**{field: name})
+                post_ids.update(self._affected_posts(model, rows))
+                rows.update(**{field: new_name})
+                old_names.add(name)
+
+        if post_ids:
+            page_cache.invalidate(page_cache.FEED_TAG, *map(page_cache.post_tag, sorted(post_ids)))
+
+        deleted = 0
+        if not dry_run:
+            for name in sorted(old_names):
+                deleted += release(name)
+        for directory in ("posts", "profiles"):
+            deleted += self._delete_unreferenced(directory, dry_run)
+
+        prefix = "Would have: " if dry_run else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}renamed {renamed} file(s), deleted {deleted} unreferenced file(s)."
+        ))
+
+    def _affected_posts(self, model, rows):
+        """Posts whose cached pages show these rows' image: the posts themselves, or the profiles' posts."""
+        if model is Post:
+            return rows.values_list("pk", flat=True)
+        return Post.objects.filter(author__in=rows.values("user_id")).values_list("pk", flat=True)
+
+    def _delete_unreferenced(self, directory, dry_run):
+        if not image_storage.exists(directory):
+            return 0
+        count = 0
+        _, files = image_storage.listdir(directory)
+        for filename in files:
+            name = os.path.join(directory, filename).replace("\\", "/")
+            if dry_run:
+                if not references(name):
+                    self.stdout.write(f"unreferenced: {name}")
+                    count += 1
+            elif release(name):
+                self.stdout.write(f"deleted: {name}")
+                count += 1
+        return count
@@ -0,0 +1,45 @@
+# sabuzz/management/commands/fetch_news.py
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from sabuzz.news import fetch_articles, store_articles, prune_articles
+
+
+class Command(BaseCommand):
+    help = (
+        "Pull the latest newsdata.io articles into the local ExternalArticle table. "
+        "Run this from cron / a scheduler, e.g. every 15 minutes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--category", action="append", dest="categories",
+            help="Category to fetch (repeatable). Defaults to settings.NEWSDATA_CATEGORIES.",
+        )
+        parser.add_argument(
+            "--keep-days", type=int, default=7,
+            help="Delete stored articles older than this many days (0 disables pruning).",
+        )
+
+    def handle(self, *args, **options):
+        categories = options["categories"] or settings.NEWSDATA_CATEGORIES
+        failures = 0
+
+        for category in categories:
+            try:
+                results = fetch_articles(category=category)
+            except Exception as exc:
+                failures += 1
+                self.stderr.write(f"{category}: fetch failed ({exc})")
+                continue
+            stored = store_articles(results, category=category)
+            self.stdout.write(f"{category}: stored {stored} articles")
+
+        if options["keep_days"]:
+            pruned = prune_articles(options["keep_days"])
+            self.stdout.write(f"Pruned {pruned} old articles")
+
+        if failures == len(categories):
+            self.stderr.write(self.style.ERROR("All fetches failed."))
+        else:
+            self.stdout.write(self.style.SUCCESS("News store updated."))
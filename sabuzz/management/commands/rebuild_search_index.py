@@ -0,0 +1,15 @@
+# sabuzz/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand
+
+from sabuzz.search import fts_available, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index over published posts."
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            self.stdout.write("Full-text index is SQLite-only; search uses the LIKE fallback here.")
+            return
+        count = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} published posts."))
@@ -0,0 +1,18 @@
+# sabuzz/management/commands/reconcile_counters.py
+from django.core.management.base import BaseCommand
+
+from sabuzz.counters import reconcile
+from sabuzz.stats import rebuild_all
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute Post like/comment counters and the dashboard statistics "
+        "from the real tables and fix any drift."
+    )
+
+    def handle(self, *args, **options):
+        fixed = reconcile()
+        self.stdout.write(self.style.SUCCESS(f"Reconciled counters on {fixed} posts."))
+        rebuild_all()
+        self.stdout.write(self.style.SUCCESS("Rebuilt dashboard statistics."))
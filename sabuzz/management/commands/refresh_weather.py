@@ -0,0 +1,28 @@
+# sabuzz/management/commands/refresh_weather.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from sabuzz.weather import refresh_snapshot, refresh_interval
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresh the cached navbar weather snapshot. Run from cron, or with --loop "
+        "as a small long-lived worker that refreshes every WEATHER_SNAPSHOT_INTERVAL seconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Keep running and refresh on a fixed interval.")
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                snapshot = refresh_snapshot()
+                self.stdout.write(f"Weather snapshot: {snapshot}")
+            except Exception as exc:
+                self.stderr.write(f"Weather refresh failed ({exc})")
+
+            if not options["loop"]:
+                break
+            time.sleep(refresh_interval())
@@ -0,0 +1,37 @@
+# sabuzz/management/commands/sync_replicas.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sabuzz.db_router import pin_seconds, replicas, sync_replicas
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database over every replica in SQLITE_REPLICAS "
+        "(online backup, safe while the site is writing). Run it from cron, or with --loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop", type=float, metavar="SECONDS",
+            help="Keep syncing every SECONDS (at most REPLICA_PIN_SECONDS).",
+        )
+
+    def handle(self, *args, **options):
+        if not replicas():
+            self.stdout.write("No replicas configured (set SQLITE_REPLICAS).")
+            return
+        if options["loop"] and options["loop"] > pin_seconds():
+            # a client that just wrote would be unpinned before the replicas have its write
+            raise CommandError(
+                f"--loop {options['loop']:g} is longer than REPLICA_PIN_SECONDS ({pin_seconds()}); "
+                "raise REPLICA_PIN_SECONDS or sync more often."
+            )
+        while True:
+            start = time.monotonic()
+            copied = sync_replicas()
+            self.stdout.write(f"Synced {', '.join(copied) or 'nothing'} in {time.monotonic() - start:.2f}s")
+            if not options["loop"]:
+                return
+            time.sleep(options["loop"])
@@ -0,0 +1,128 @@
+# sabuzz/media.py
+"""
+Serving uploaded media (MEDIA_URL).
+
+Every response carries an ETag / Last-Modified (304 on revalidation) and a
+Cache-Control that is `immutable` for content-addressed files and their
+derivatives (sabuzz/storage.py), whose names change whenever the bytes do.
+
+With MEDIA_ACCEL set, the bytes are handed to the front web server:
+  "x-accel-redirect"  nginx, internal location MEDIA_ACCEL_PREFIX -> MEDIA_ROOT
+  "x-sendfile"        Apache mod_xsendfile / lighttpd
+and the worker only returns headers. Without it (runserver, tests) the file
+is streamed here, with single-range Range requests answered with 206.
+"""
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+DEFAULT_MAX_AGE = 60 * 60
+
+_HASHED_NAME_RE = re.compile(r"(^|/)[0-9a-f]{64}(\.[A-Za-z0-9]+|/)")
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def is_immutable(path):
+    """Content-addressed originals (<sha256>.<ext>) and their derivatives."""
+    return bool(_HASHED_NAME_RE.search(path))
+
+
+def _etag(stat):
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def _parse_range(header, size):
+    """(start, end) inclusive for a single satisfiable range, "unsatisfiable", or None to ignore."""
+    match = _RANGE_RE.match(header.strip())
+    if not match or size == 0:
+        return None  # multi-range or malformed: answer with the whole file
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:  # suffix range: the last N bytes
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return "unsatisfiable"
+    return start, end
+
+
+def _cache_headers(response, path, etag, last_modified):
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Accept-Ranges"] = "bytes"
+    if is_immutable(path):
+        response["Cache-Control"] = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    else:
+        response["Cache-Control"] = f"public, max-age={DEFAULT_MAX_AGE}"
+    return response
+
+
+def serve_media(request, path):
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except (SuspiciousFileOperation, ValueError):
+        raise Http404("Not found")
+    if not os.path.isfile(full_path):
+        raise Http404("Not found")
+
+    stat = os.stat(full_path)
+    etag, last_modified = _etag(stat), int(stat.st_mtime)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return _cache_headers(not_modified, path, etag, last_modified)
+
+    content_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+    accel = getattr(settings, "MEDIA_ACCEL", "")
+
+    if accel == "x-accel-redirect":
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_PREFIX.rstrip("/") + "/" + path.lstrip("/")
+        return _cache_headers(response, path, etag, last_modified)
+    if accel == "x-sendfile":
+        response = HttpResponse(content_type=content_type)
+        response["X-Sendfile"] = full_path
+        return _cache_headers(response, path, etag, last_modified)
+
+    size = stat.st_size
+    byte_range = None
+    range_header = request.headers.get("Range")
+    if range_header and request.headers.get("If-Range", etag) == etag:
+        byte_range = _parse_range(range_header, size)
+
+    if byte_range == "unsatisfiable":
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return _cache_headers(response, path, etag, last_modified)
+
+    f = open(full_path, "rb")
+    if byte_range is None:
+        response = FileResponse(f, content_type=content_type)
+    else:
+        start, end = byte_range
+        f.seek(start)
+        length = end - start + 1
+        response = FileResponse(_read_span(f, length), content_type=content_type, status=206)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = str(length)
+    return _cache_headers(response, path, etag, last_modified)
+
+
+def _read_span(f, length, block_size=64 * 1024):
+    with f:
+        while length > 0:
+            chunk = f.read(min(block_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
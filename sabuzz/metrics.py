@@ -0,0 +1,312 @@
+# sabuzz/metrics.py
+"""
+Per-view request metrics in Prometheus text format.
+
+MetricsMiddleware times every request and files it under the resolved URL
+name, together with what the request spent on:
+  - SQL (count and time; a wrapper installed on every DB connection),
+  - template rendering (the Django template backend's render()),
+  - outbound HTTP per host (sabuzz/http_client.py calls record_external()).
+In-process caches registered with register_cache() (sabuzz/cache.py) are
+exported too, from their own stats() counters.
+The per-request numbers live in a contextvar, so work done in
+sync_to_async threads of the async views is attributed to the right view;
+calls made outside a request (cron, background refreshes) are filed under
+view="-". Totals are kept in process memory and served by the staff-only
+/metrics/ endpoint; with several workers, each process is scraped on its own.
+
+Recording is a few dict updates under a lock per request, cheap enough to
+leave on in production (METRICS_ENABLED).
+"""
+import bisect
+import contextvars
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.utils.decorators import sync_and_async_middleware
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+NO_VIEW = "-"
+
+_current = contextvars.ContextVar("sabuzz_request_metrics", default=None)
+_lock = threading.Lock()
+_installed = False
+_caches = {}  # name -> object with a stats() dict (sabuzz/cache.py)
+
+
+class RequestStats:
+    __slots__ = ("sql_count", "sql_time", "template_time", "template_depth", "external", "lock")
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.external = {}  # host -> [count, seconds]
+        self.lock = threading.Lock()
+
+
+class Registry:
+    """Cumulative counters per view, since process start."""
+
+    def __init__(self):
+        self.requests = {}      # (view, method, status) -> count
+        self.latency = {}       # view -> [bucket counts..., sum, count]
+        self.sql = {}           # view -> [queries, seconds]
+        self.templates = {}     # view -> seconds
+        self.external = {}      # (view, host) -> [calls, seconds]
+
+    def observe_request(self, view, method, status, seconds, stats):
+        with _lock:
+            key = (view, method, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+            hist = self.latency.get(view)
+            if hist is None:
+                hist = self.latency[view] = [0] * len(LATENCY_BUCKETS) + [0.0, 0]
+            index = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+            if index < len(LATENCY_BUCKETS):
+                hist[index] += 1
+            hist[-2] += seconds
+            hist[-1] += 1
+
+            sql = self.sql.setdefault(view, [0, 0.0])
+            sql[0] += stats.sql_count
+            sql[1] += stats.sql_time
+            self.templates[view] = self.templates.get(view, 0.0) + stats.template_time
+            for host, (calls, spent) in stats.external.items():
+                self.observe_external(view, host, calls, spent)
+
+    def observe_external(self, view, host, calls, seconds):
+        # caller holds _lock
+        ext = self.external.setdefault((view, host), [0, 0.0])
+        ext[0] += calls
+        ext[1] += seconds
+
+    def clear(self):
+        with _lock:
+            self.__init__()
+
+
+registry = Registry()
+
+
+# -------------------------
+# Recording hooks
+# -------------------------
+def _sql_wrapper(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        with stats.lock:
+            stats.sql_count += 1
+            stats.sql_time += time.perf_counter() - start
+
+
+def _add_wrapper(sender, connection, **kwargs):
+    if _sql_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_sql_wrapper)
+
+
+def record_external(host, seconds):
+    """Called by http_client for every outbound request."""
+    stats = _current.get()
+    if stats is None:
+        with _lock:
+            registry.observe_external(NO_VIEW, host, 1, seconds)
+        return
+    with stats.lock:
+        entry = stats.external.setdefault(host, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+
+def register_cache(name, cache):
+    """Export cache.stats() hits/misses/refreshes on /metrics/ as cache=<name>."""
+    _caches[name] = cache
+
+
+def _patch_template_render():
+    from django.template.backends.django import Template
+
+    original = Template.render
+
+    def render(self, context=None, request=None):
+        stats = _current.get()
+        if stats is None:
+            return original(self, context, request)
+        stats.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            stats.template_depth -= 1
+            if stats.template_depth == 0:  # time nested render_to_string calls once
+                stats.template_time += time.perf_counter() - start
+
+    Template.render = render
+
+
+def install():
+    """Hook SQL and template timing (called from SabuzzConfig.ready)."""
+    global _installed
+    if _installed or not getattr(settings, "METRICS_ENABLED", True):
+        return
+    _installed = True
+    connection_created.connect(_add_wrapper, dispatch_uid="sabuzz.metrics.sql")
+    from django.db import connections
+    for connection in connections.all(initialized_only=True):
+        _add_wrapper(None, connection)
+    _patch_template_render()
+
+
+# -------------------------
+# Middleware
+# -------------------------
+def _view_name(request):
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match is not None else "unresolved"
+
+
+@sync_and_async_middleware
+def MetricsMiddleware(get_response):
+    enabled = getattr(settings, "METRICS_ENABLED", True)
+
+    def finish(request, response, start, stats):
+        registry.observe_request(
+            _view_name(request), request.method, response.status_code,
+            time.perf_counter() - start, stats,
+        )
+        return response
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            if not enabled:
+                return await get_response(request)
+            stats = RequestStats()
+            token, start = _current.set(stats), time.perf_counter()
+            try:
+                response = await get_response(request)
+            finally:
+                _current.reset(token)
+            return finish(request, response, start, stats)
+        markcoroutinefunction(middleware)
+    else:
+        def middleware(request):
+            if not enabled:
+                return get_response(request)
+            stats = RequestStats()
+            token, start = _current.set(stats), time.perf_counter()
+            try:
+                response = get_response(request)
+            finally:
+                _current.reset(token)
+            return finish(request, response, start, stats)
+    return middleware
+
+
+# -------------------------
+# Prometheus exposition
+# -------------------------
+def _labels(**labels):
+    parts = []
+    for name, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def render_prometheus():
+    with _lock:
+        requests = dict(registry.requests)
+        latency = {view: list(hist) for view, hist in registry.latency.items()}
+        sql = {view: list(v) for view, v in registry.sql.items()}
+        templates = dict(registry.templates)
+        external = {key: list(v) for key, v in registry.external.items()}
+
+    lines = [
+        "# HELP sabuzz_requests_total Requests handled, by view, method and status.",
+        "# TYPE sabuzz_requests_total counter",
+    ]
+    for (view, method, status), count in sorted(requests.items()):
+        lines.append(f"sabuzz_requests_total{_labels(view=view, method=method, status=status)} {count}")
+
+    lines += [
+        "# HELP sabuzz_request_duration_seconds Request latency by view.",
+        "# TYPE sabuzz_request_duration_seconds histogram",
+    ]
+    for view, hist in sorted(latency.items()):
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, hist):
+            cumulative += count
+            lines.append(f"sabuzz_request_duration_seconds_bucket{_labels(view=view, le=bound)} {cumulative}")
+        lines.append(f"sabuzz_request_duration_seconds_bucket{_labels(view=view, le='+Inf')} {hist[-1]}")
+        lines.append(f"sabuzz_request_duration_seconds_sum{_labels(view=view)} {hist[-2]:.6f}")
+        lines.append(f"sabuzz_request_duration_seconds_count{_labels(view=view)} {hist[-1]}")
+
+    lines += [
+        "# HELP sabuzz_db_queries_total SQL queries run while handling requests.",
+        "# TYPE sabuzz_db_queries_total counter",
+    ]
+    lines += [f"sabuzz_db_queries_total{_labels(view=view)} {v[0]}" for view, v in sorted(sql.items())]
+    lines += [
+        "# HELP sabuzz_db_query_seconds_total Time spent in SQL.",
+        "# TYPE sabuzz_db_query_seconds_total counter",
+    ]
+    lines += [f"sabuzz_db_query_seconds_total{_labels(view=view)} {v[1]:.6f}" for view, v in sorted(sql.items())]
+    lines += [
+        "# HELP sabuzz_template_render_seconds_total Time spent rendering templates.",
+        "# TYPE sabuzz_template_render_seconds_total counter",
+    ]
+    lines += [
+        f"sabuzz_template_render_seconds_total{_labels(view=view)} {seconds:.6f}"
+        for view, seconds in sorted(templates.items())
+    ]
+    lines += [
+        "# HELP sabuzz_external_requests_total Outbound HTTP calls, by view and host.",
+        "# TYPE sabuzz_external_requests_total counter",
+    ]
+    lines += [
+        f"sabuzz_external_requests_total{_labels(view=view, host=host)} {v[0]}"
+        for (view, host), v in sorted(external.items())
+    ]
+    lines += [
+        "# HELP sabuzz_external_request_seconds_total Time spent in outbound HTTP calls.",
+        "# TYPE sabuzz_external_request_seconds_total counter",
+    ]
+    lines += [
+        f"sabuzz_external_request_seconds_total{_labels(view=view, host=host)} {v[1]:.6f}"
+        for (view, host), v in sorted(external.items())
+    ]
+
+    caches = {name: cache.stats() for name, cache in sorted(_caches.items())}
+    lines += [
+        "# HELP sabuzz_cache_lookups_total In-process cache lookups, by result.",
+        "# TYPE sabuzz_cache_lookups_total counter",
+    ]
+    for name, stats in caches.items():
+        for result, field in (("hit", "hits"), ("stale", "stale_hits"), ("miss", "misses")):
+            lines.append(f"sabuzz_cache_lookups_total{_labels(cache=name, result=result)} {stats[field]}")
+    lines += [
+        "# HELP sabuzz_cache_refreshes_total Background loads started by in-process caches.",
+        "# TYPE sabuzz_cache_refreshes_total counter",
+    ]
+    lines += [f"sabuzz_cache_refreshes_total{_labels(cache=name)} {s['refreshes']}" for name, s in caches.items()]
+    lines += [
+        "# HELP sabuzz_cache_errors_total Failed loads of in-process caches.",
+        "# TYPE sabuzz_cache_errors_total counter",
+    ]
+    lines += [f"sabuzz_cache_errors_total{_labels(cache=name)} {s['errors']}" for name, s in caches.items()]
+    lines += [
+        "# HELP sabuzz_cache_entries Entries held by in-process caches.",
+        "# TYPE sabuzz_cache_entries gauge",
+    ]
+    lines += [f"sabuzz_cache_entries{_labels(cache=name)} {s['size']}" for name, s in caches.items()]
+    return "\n".join(lines) + "\n"
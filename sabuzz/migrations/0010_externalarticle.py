@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-17 10:29
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sabuzz', '0009_activity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExternalArticle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url_hash', models.CharField(max_length=64, unique=True)),
+                ('link', models.URLField(max_length=1000)),
+                ('title', models.CharField(max_length=500)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('image_url', models.URLField(blank=True, max_length=1000, null=True)),
+                ('source_id', models.CharField(blank=True, max_length=200, null=True)),
+                ('category', models.CharField(default='top', max_length=50)),
+                ('country', models.CharField(default='za', max_length=10)),
+                ('published_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('fetched_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ('-published_at',),
+                'indexes': [models.Index(fields=['category', '-published_at'], name='extarticle_cat_pub_idx'), models.Index(fields=['-published_at'], name='extarticle_pub_idx')],
+            },
+        ),
+    ]
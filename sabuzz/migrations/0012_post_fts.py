@@ -0,0 +1,32 @@
+from django.db import migrations
+
+
+def create_fts(apps, schema_editor):
+    # FTS5 is SQLite-only; other databases use the LIKE fallback in sabuzz/search.py
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS sabuzz_post_fts "
+        "USING fts5(title, content, tokenize='porter unicode61')"
+    )
+    schema_editor.execute(
+        "INSERT INTO sabuzz_post_fts(rowid, title, content) "
+        "SELECT id, title, content FROM sabuzz_post WHERE status = 'published'"
+    )
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS sabuzz_post_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sabuzz', '0011_post_updated_at_status_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.7 on 2026-10-17 10:36
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    Post = apps.get_model('sabuzz', 'Post')
+    Like = apps.get_model('sabuzz', 'Like')
+    Comment = apps.get_model('sabuzz', 'Comment')
+
+    def count(model, **filters):
+        return Coalesce(
+            Subquery(
+                model.objects.filter(post=OuterRef('pk'), **filters)
+                .order_by().values('post').annotate(n=Count('id')).values('n'),
+                output_field=IntegerField(),
+            ),
+            Value(0),
+        )
+
+    Post.objects.update(
+        like_count=count(Like),
+        comment_count=count(Comment),
+        approved_comment_count=count(Comment, approved=True),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sabuzz', '0012_post_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='approved_comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
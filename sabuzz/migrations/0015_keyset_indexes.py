@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-17 10:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sabuzz', '0014_dashboardstats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # auth_user belongs to django.contrib.auth, so its index is plain SQL
+        migrations.RunSQL(
+            "CREATE INDEX IF NOT EXISTS sabuzz_user_joined_idx ON auth_user (date_joined DESC, id DESC)",
+            reverse_sql="DROP INDEX IF EXISTS sabuzz_user_joined_idx",
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['-date_posted', '-id'], name='comment_posted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='journalistrequest',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='jreq_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-created_at', '-id'], name='post_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-created_at', '-id'], name='post_author_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subscriber',
+            index=models.Index(fields=['-subscribed_at', '-id'], name='subscriber_subscribed_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-17 10:46
+
+import sabuzz.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sabuzz', '0015_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=sabuzz.storage.get_image_storage, upload_to='posts/'),
+        ),
+        migrations.AlterField(
+            model_name='profile',
+            name='profile_image',
+            field=models.ImageField(blank=True, null=True, storage=sabuzz.storage.get_image_storage, upload_to='profiles/'),
+        ),
+    ]
@@ -4,6 +4,8 @@ from django.contrib.auth.models import User
 from django.conf import settings
 from django.utils import timezone
 
+from .storage import get_image_storage
+
 User = settings.AUTH_USER_MODEL
 
 # ============================================================
@@ -29,15 +31,49 @@ class Post(models.Model):
 
     title = models.CharField(max_length=200)
     content = models.TextField()
-    image = models.ImageField(upload_to="posts/", blank=True, null=True)
+    # content-addressed: identical uploads share one file (sabuzz/storage.py)
+    image = models.ImageField(upload_to="posts/", storage=get_image_storage, blank=True, null=True)
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True)
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Denormalized counters, kept up to date with F() updates (sabuzz/counters.py)
+    # and repaired by `manage.py reconcile_counters`
+    like_count = models.PositiveIntegerField(default=0, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    approved_comment_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # feed / API listing: WHERE status = ? ORDER BY created_at DESC, id DESC
+            models.Index(fields=["status", "-created_at", "-id"], name="post_status_created_idx"),
+            # keyset-paginated dashboard lists (sabuzz/pagination.py)
+            models.Index(fields=["-created_at", "-id"], name="post_created_idx"),
+            models.Index(fields=["author", "-created_at", "-id"], name="post_author_created_idx"),
+            # journalist dashboard: WHERE author_id = ? AND status = ? ORDER BY created_at DESC
+            models.Index(fields=["author", "status", "-created_at", "-id"], name="post_author_status_idx"),
+            # API ETag/Last-Modified: MAX(updated_at), COUNT(*) WHERE status = ?, from the index alone
+            models.Index(fields=["status", "updated_at"], name="post_status_updated_idx"),
+        ]
+
+    COUNTER_FIELDS = ("like_count", "comment_count", "approved_comment_count")
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        # A full save would write back this instance's (possibly stale) counters
+        # and undo concurrent F() increments: updates leave them out unless
+        # update_fields names them explicitly.
+        if not self._state.adding and kwargs.get("update_fields") is None and not kwargs.get("force_insert"):
+            skip = set(self.COUNTER_FIELDS) | self.get_deferred_fields()
+            kwargs["update_fields"] = [
+                f.attname for f in self._meta.concrete_fields if not f.primary_key and f.attname not in skip
+            ]
+        super().save(*args, **kwargs)
+
 
 # ============================================================
 # COMMENTS
@@ -49,6 +85,13 @@ class Comment(models.Model):
     date_posted = models.DateTimeField(auto_now_add=True)
     approved = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["-date_posted", "-id"], name="comment_posted_idx"),
+            # post_detail: one post's comments, newest first, keyset paginated
+            models.Index(fields=["post", "-date_posted", "-id"], name="comment_post_posted_idx"),
+        ]
+
     def __str__(self):
         return f"Comment by {self.user}"
 
@@ -61,6 +104,11 @@ class Subscriber(models.Model):
     email = models.EmailField(unique=True)
     subscribed_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["-subscribed_at", "-id"], name="subscriber_subscribed_idx"),
+        ]
+
     def __str__(self):
         return self.email
 
@@ -79,6 +127,15 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ("-created_at",)
+        indexes = [
+            # a user's notifications / unread notifications, newest first. The ORM
+            # writes read=False as `NOT "read"`, which can't seek a (user, read, ...)
+            # index, so unread ones get a partial index instead
+            models.Index(fields=["user", "-created_at"], name="notification_user_idx"),
+            models.Index(
+                fields=["user", "-created_at"], condition=models.Q(read=False), name="notification_unread_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"Notification to {self.user}: {self.verb}"
@@ -96,7 +153,7 @@ class Profile(models.Model):
 
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default="user")
-    profile_image = models.ImageField(upload_to="profiles/", blank=True, null=True)
+    profile_image = models.ImageField(upload_to="profiles/", storage=get_image_storage, blank=True, null=True)
     bio = models.TextField(blank=True, null=True)
     is_subscribed = models.BooleanField(default=False)
     subscription_date = models.DateTimeField(blank=True, null=True)
@@ -137,6 +194,11 @@ class Favorite(models.Model):
     source = models.CharField(max_length=200, blank=True, null=True)
     saved_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-saved_at"], name="favorite_user_saved_idx"),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.title}"
 
@@ -153,6 +215,38 @@ class SavedArticle(models.Model):
     source_name = models.CharField(max_length=200, blank=True, null=True)
     saved_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-saved_at"], name="savedarticle_user_saved_idx"),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+# ============================================================
+# EXTERNAL ARTICLES (newsdata.io, filled by `manage.py fetch_news`)
+# ============================================================
+class ExternalArticle(models.Model):
+    # sha256 of the article link, so the same story is stored once
+    url_hash = models.CharField(max_length=64, unique=True)
+    link = models.URLField(max_length=1000)
+    title = models.CharField(max_length=500)
+    description = models.TextField(blank=True, null=True)
+    image_url = models.URLField(max_length=1000, blank=True, null=True)
+    source_id = models.CharField(max_length=200, blank=True, null=True)
+    category = models.CharField(max_length=50, default="top")
+    country = models.CharField(max_length=10, default="za")
+    published_at = models.DateTimeField(default=timezone.now)
+    fetched_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ("-published_at",)
+        indexes = [
+            models.Index(fields=["category", "-published_at"], name="extarticle_cat_pub_idx"),
+            models.Index(fields=["-published_at"], name="extarticle_pub_idx"),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -189,6 +283,11 @@ class JournalistRequest(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "-created_at", "-id"], name="jreq_status_created_idx"),
+        ]
+
     def __str__(self):
         return f"Journalist Request - {self.user.username} ({self.status})"
 
@@ -207,6 +306,40 @@ class Activity(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     description = models.TextField(blank=True)  # Optional for custom text
 
+    class Meta:
+        indexes = [
+            # dashboard "recent activity": everyone's (admin) or one user's (journalist)
+            models.Index(fields=["-timestamp"], name="activity_timestamp_idx"),
+            models.Index(fields=["user", "-timestamp"], name="activity_user_time_idx"),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.type}"
-        
\ No newline at end of file
+
+
+# ============================================================
+# DASHBOARD STATISTICS (maintained incrementally, sabuzz/stats.py)
+# ============================================================
+class DashboardStats(models.Model):
+    GLOBAL_KEY = "global"
+
+    # "global" for the site-wide row, "author:<id>" for a journalist's row
+    key = models.CharField(max_length=50, unique=True)
+    author = models.ForeignKey(User, null=True, blank=True, on_delete=models.CASCADE)
+
+    posts_draft = models.IntegerField(default=0)
+    posts_pending = models.IntegerField(default=0)
+    posts_published = models.IntegerField(default=0)
+    comments = models.IntegerField(default=0)
+    likes = models.IntegerField(default=0)
+    subscribers = models.IntegerField(default=0)
+    categories = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def posts_total(self):
+        return self.posts_draft + self.posts_pending + self.posts_published
+
+    def __str__(self):
+        return f"Dashboard stats ({self.key})"
+
@@ -0,0 +1,158 @@
+# sabuzz/news.py
+import hashlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from . import http_client, metrics
+from .cache import TTLCache
+from .models import ExternalArticle
+
+NEWSDATA_URL = "https://newsdata.io/api/1/news"
+
+response_cache = TTLCache(
+    maxsize=getattr(settings, "NEWSDATA_CACHE_MAXSIZE", 512),
+    stale_ttl=getattr(settings, "NEWSDATA_CACHE_STALE", 0),
+)
+metrics.register_cache("newsdata", response_cache)
+
+
+def url_hash(link):
+    """Stable key for an article link."""
+    return hashlib.sha256(link.encode("utf-8")).hexdigest()
+
+
+def fetch_articles(category=None, query=None, country=None):
+    """
+    Call newsdata.io and return the raw 'results' list.
+    Raises on network / HTTP errors so callers can decide what to do.
+    """
+    params = {
+        "country": country or settings.NEWSDATA_COUNTRY,
+        "apikey": settings.NEWSDATA_API_KEY,
+    }
+    if category:
+        params["category"] = category
+    if query:
+        params["q"] = query
+
+    r = http_client.get(NEWSDATA_URL, params=params)
+    r.raise_for_status()
+    return r.json().get("results", []) or []
+
+
+def cache_key(category=None, country=None):
+    """Normalise a request so equivalent calls share one cache entry."""
+    country = (country or settings.NEWSDATA_COUNTRY).strip().lower()
+    category = (category or "").strip().lower()
+    return (country, category)
+
+
+def live_articles(category=None):
+    """
+    newsdata.io results for views, from the in-process cache only: this never
+    waits on the upstream. A miss starts one background fetch and returns []
+    for now. Only the latest feed and settings.NEWSDATA_CATEGORIES are
+    fetched; any other category (like a search term) is a user-controlled key
+    that would burn the API quota, so it is served from the local store alone.
+    """
+    if category and category not in settings.NEWSDATA_CATEGORIES:
+        return []
+    key = country, category = cache_key(category)
+    ttl = getattr(settings, "NEWSDATA_CACHE_TTLS", {}).get("category" if category else "latest", 300)
+    articles = response_cache.get_nowait(
+        key, lambda: fetch_articles(category=category or None, country=country), ttl,
+    )
+    return articles or []
+
+
+def _parse_pub_date(value):
+    # newsdata.io sends "YYYY-MM-DD HH:MM:SS" in UTC
+    try:
+        return datetime.strptime(value, "%Y-%m-%d %H:%M:%S").replace(tzinfo=dt_timezone.utc)
+    except (TypeError, ValueError):
+        return timezone.now()
+
+
+def store_articles(results, category="top", country=None):
+    """
+    Upsert newsdata.io results into ExternalArticle. Returns the number of rows written.
+    """
+    rows = {}
+    for item in results:
+        link = item.get("link")
+        title = item.get("title")
+        if not link or not title:
+            continue
+        key = url_hash(link)
+        rows[key] = ExternalArticle(
+            url_hash=key,
+            link=link[:1000],
+            title=title[:500],
+            description=item.get("description"),
+            image_url=(item.get("image_url") or None) and item["image_url"][:1000],
+            source_id=item.get("source_id"),
+            category=category,
+            country=country or settings.NEWSDATA_COUNTRY,
+            published_at=_parse_pub_date(item.get("pubDate")),
+        )
+
+    if not rows:
+        return 0
+
+    ExternalArticle.objects.bulk_create(
+        rows.values(),
+        update_conflicts=True,
+        unique_fields=["url_hash"],
+        update_fields=["title", "description", "image_url", "source_id", "category", "published_at", "fetched_at"],
+    )
+    return len(rows)
+
+
+def prune_articles(keep_days):
+    """Delete articles older than keep_days. Returns the number deleted."""
+    cutoff = timezone.now() - timedelta(days=keep_days)
+    deleted, _ = ExternalArticle.objects.filter(published_at__lt=cutoff).delete()
+    return deleted
+
+
+# -------------------------
+# Read side (used by views)
+# The local store is always tried first. Only the latest feed and the
+# configured categories fall back to the cached upstream results (store not
+# filled yet); search terms are answered from the store alone.
+# -------------------------
+def latest_articles(limit=30):
+    articles = list(ExternalArticle.objects.all()[:limit])
+    return articles or live_articles()[:limit]
+
+
+def category_articles(category, limit=30):
+    articles = list(ExternalArticle.objects.filter(category=category)[:limit])
+    return articles or live_articles(category=category)[:limit]
+
+
+def _search_filter(query):
+    return Q(title__icontains=query) | Q(description__icontains=query)
+
+
+def search_articles(query, limit=30):
+    return list(ExternalArticle.objects.filter(_search_filter(query))[:limit])
+
+
+# Async variants for the async views: the store is read with the async ORM;
+# live_articles() only touches the in-process cache, so it is called directly.
+async def alatest_articles(limit=30):
+    articles = [a async for a in ExternalArticle.objects.all()[:limit]]
+    return articles or live_articles()[:limit]
+
+
+async def acategory_articles(category, limit=30):
+    articles = [a async for a in ExternalArticle.objects.filter(category=category)[:limit]]
+    return articles or live_articles(category=category)[:limit]
+
+
+async def asearch_articles(query, limit=30):
+    return [a async for a in ExternalArticle.objects.filter(_search_filter(query))[:limit]]
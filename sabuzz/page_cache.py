@@ -0,0 +1,154 @@
+# sabuzz/page_cache.py
+"""
+Full-page cache for anonymous visitors, with tag-based invalidation.
+
+@anonymous_page(tags) caches the rendered response of a public page by URL
+for requests that carry no session or messages cookie. Each entry remembers
+the version of every tag it was rendered under; invalidate(*tags) bumps
+those versions (signals in sabuzz/signals.py do this when a post is
+published, edited or deleted), so exactly the pages carrying the tag miss on
+their next request. A hit is served from the cache alone: no session, user,
+context processor or ORM access.
+
+A miss is rendered with reads on the primary database (sabuzz/db_router.py),
+never a lagging replica, so a page stored under the new tag versions shows
+the change that bumped them.
+
+CSRF tokens in cached HTML are swapped for a placeholder on store and for the
+visitor's own token on every hit, so forms on cached pages keep working.
+
+fragment_version(*tags) gives logged-in renders a key for {% cache %}
+fragments that follows the same invalidation.
+"""
+import asyncio
+import functools
+import hashlib
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.cache import patch_vary_headers
+
+from . import db_router
+
+PAGE_KEY = "sabuzz:page:{digest}"
+TAG_KEY = "sabuzz:page-tag:{tag}"
+
+# pages listing published posts (home)
+FEED_TAG = "posts:feed"
+
+CSRF_PLACEHOLDER = "__sabuzz_csrf_token__"
+_CSRF_INPUT_RE = re.compile(r'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+
+
+def post_tag(post_id):
+    return f"post:{post_id}"
+
+
+def _ttl():
+    return getattr(settings, "PAGE_CACHE_TTL", 300)
+
+
+def _tag_keys(tags):
+    return [TAG_KEY.format(tag=tag) for tag in tags]
+
+
+def invalidate(*tags):
+    """Make every cached page/fragment carrying one of these tags stale."""
+    for key in _tag_keys(tags):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+
+def fragment_version(*tags):
+    """A string that changes whenever one of the tags is invalidated."""
+    versions = cache.get_many(_tag_keys(tags))
+    return "-".join(str(versions.get(key, 0)) for key in _tag_keys(tags))
+
+
+def _cacheable_request(request):
+    return (
+        request.method in ("GET", "HEAD")
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        and "messages" not in request.COOKIES
+    )
+
+
+def _page_key(request):
+    url = request.build_absolute_uri()
+    return PAGE_KEY.format(digest=hashlib.md5(url.encode()).hexdigest())
+
+
+def _cacheable_response(response):
+    if response.status_code != 200 or response.streaming:
+        return False
+    # only the CSRF cookie is allowed; anything else is per-visitor state
+    return all(name == settings.CSRF_COOKIE_NAME for name in response.cookies)
+
+
+def _entry(response, tags, versions):
+    content = _CSRF_INPUT_RE.sub(rf"\g<1>{CSRF_PLACEHOLDER}\g<2>", response.content.decode(response.charset))
+    return {
+        "versions": [versions.get(key, 0) for key in _tag_keys(tags)],
+        "content": content,
+        "content_type": response["Content-Type"],
+    }
+
+
+def _response(request, entry):
+    content = entry["content"]
+    if CSRF_PLACEHOLDER in content:
+        content = content.replace(CSRF_PLACEHOLDER, get_token(request))
+    response = HttpResponse(content, content_type=entry["content_type"])
+    response["X-Page-Cache"] = "hit"
+    patch_vary_headers(response, ("Cookie",))
+    return response
+
+
+def _fresh(entry, tags, versions):
+    return entry is not None and entry["versions"] == [versions.get(key, 0) for key in _tag_keys(tags)]
+
+
+def anonymous_page(tags=()):
+    """
+    Cache a public view for anonymous visitors. `tags` is a list of tag names or
+    a callable (request, **view_kwargs) -> list. Works on sync and async views.
+    """
+    def resolve(request, kwargs):
+        return list(tags(request, **kwargs) if callable(tags) else tags)
+
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            @functools.wraps(view)
+            async def wrapper(request, *args, **kwargs):
+                if not _cacheable_request(request):
+                    return await view(request, *args, **kwargs)
+                page_tags, key = resolve(request, kwargs), _page_key(request)
+                found = await cache.aget_many([key, *_tag_keys(page_tags)])
+                if _fresh(found.get(key), page_tags, found):
+                    return _response(request, found[key])
+                with db_router.primary():
+                    response = await view(request, *args, **kwargs)
+                if _cacheable_response(response):
+                    await cache.aset(key, _entry(response, page_tags, found), timeout=_ttl())
+                return response
+        else:
+            @functools.wraps(view)
+            def wrapper(request, *args, **kwargs):
+                if not _cacheable_request(request):
+                    return view(request, *args, **kwargs)
+                page_tags, key = resolve(request, kwargs), _page_key(request)
+                found = cache.get_many([key, *_tag_keys(page_tags)])
+                if _fresh(found.get(key), page_tags, found):
+                    return _response(request, found[key])
+                with db_router.primary():
+                    response = view(request, *args, **kwargs)
+                if _cacheable_response(response):
+                    cache.set(key, _entry(response, page_tags, found), timeout=_ttl())
+                return response
+        return wrapper
+    return decorator
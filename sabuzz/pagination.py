@@ -0,0 +1,108 @@
+# sabuzz/pagination.py
+"""
+Keyset (seek) pagination for the server-rendered list pages.
+
+Rows are ordered newest first on (timestamp field, id) and a page is fetched
+with "WHERE (ts, id) < (last ts, last id) ... LIMIT n + 1" instead of an
+OFFSET, so page 500 costs the same index range scan as page 1 and nothing
+beyond one page is ever loaded. Pages are addressed by opaque ?after= /
+?before= cursors; other query parameters (filters) are kept in the links.
+"""
+import base64
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.http import urlencode
+
+DEFAULT_PER_PAGE = 25
+
+
+def encode_cursor(value, pk):
+    raw = f"{value.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """(datetime, id) from a cursor, or None if it is missing or malformed."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        value, pk = raw.rsplit("|", 1)
+        value = parse_datetime(value)
+        return (value, int(pk)) if value is not None else None
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+class KeysetPage:
+    """One page of rows plus the links to its neighbours."""
+
+    def __init__(self, object_list, next_url=None, previous_url=None):
+        self.object_list = object_list
+        self.next_url = next_url
+        self.previous_url = previous_url
+
+    def has_next(self):
+        return self.next_url is not None
+
+    def has_previous(self):
+        return self.previous_url is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def _page_url(request, name, cursor):
+    params = request.GET.copy()
+    params.pop("after", None)
+    params.pop("before", None)
+    if cursor:
+        params[name] = cursor
+    return "?" + urlencode(sorted(params.lists()), doseq=True)
+
+
+def keyset_paginate(request, queryset, field, per_page=DEFAULT_PER_PAGE):
+    """
+    Newest-first page of queryset ordered on (field, id), positioned by the
+    request's ?after= / ?before= cursor. Needs an index on (field, id), after
+    any equality filters the queryset applies.
+    """
+    after = decode_cursor(request.GET.get("after"))
+    before = decode_cursor(request.GET.get("before")) if after is None else None
+
+    if before is not None:
+        value, pk = before
+        rows = list(
+            queryset.filter(**{f"{field}__gte": value})
+            .filter(Q(**{f"{field}__gt": value}) | Q(pk__gt=pk))
+            .order_by(field, "pk")[:per_page + 1]
+        )
+        more_newer = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        has_newer, has_older = more_newer, True
+    else:
+        qs = queryset.order_by(f"-{field}", "-pk")
+        if after is not None:
+            value, pk = after
+            # the plain range term lets the database seek the index; the OR breaks ties
+            qs = qs.filter(**{f"{field}__lte": value}).filter(Q(**{f"{field}__lt": value}) | Q(pk__lt=pk))
+        rows = list(qs[:per_page + 1])
+        has_older = len(rows) > per_page
+        rows = rows[:per_page]
+        has_newer = after is not None
+
+    next_url = previous_url = None
+    if rows and has_older:
+        last = rows[-1]
+        next_url = _page_url(request, "after", encode_cursor(getattr(last, field), last.pk))
+    if rows and has_newer:
+        first = rows[0]
+        previous_url = _page_url(request, "before", encode_cursor(getattr(first, field), first.pk))
+    elif not rows and (after or before):
+        # ran off the end (rows deleted since the link was made): back to the start
+        previous_url = _page_url(request, "after", None)
+    return KeysetPage(rows, next_url=next_url, previous_url=previous_url)
@@ -0,0 +1,60 @@
+# sabuzz/query_budget.py
+"""
+Per-view SQL query budgets.
+
+@query_budget(n) counts the queries a view runs (including its template
+render) on every database alias, read replicas included. Over budget, it
+logs a warning, or raises QueryBudgetExceeded when
+settings.QUERY_BUDGET_STRICT is on, which is how the tests in
+sabuzz/tests.py keep views from growing N+1 patterns: the count must not
+depend on how many rows the page shows.
+"""
+import functools
+import logging
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        self.statements.append(sql)
+        return execute(sql, params, many, context)
+
+
+def query_budget(limit):
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            counter = QueryCounter()
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(counter))
+                response = view(request, *args, **kwargs)
+                if hasattr(response, "render") and not getattr(response, "is_rendered", True):
+                    response.render()
+            if counter.count > limit:
+                message = (
+                    f"{view.__name__} ran {counter.count} queries (budget {limit}):\n"
+                    + "\n".join(counter.statements)
+                )
+                if getattr(settings, "QUERY_BUDGET_STRICT", False):
+                    raise QueryBudgetExceeded(message)
+                logger.warning(message)
+            response.query_count = counter.count
+            return response
+        wrapper.query_budget = limit
+        return wrapper
+    return decorator
@@ -0,0 +1,67 @@
+# sabuzz/roles.py
+"""
+Role resolution: "is this user a journalist?" in one place.
+
+A user's group names and Profile.role are loaded together once, kept on the
+user object for the rest of the request (request.user is the same object in
+views, context processors and template filters) and in the Django cache for
+ROLE_CACHE_TTL seconds across requests. Signals in sabuzz/signals.py drop the
+cached entry whenever group membership, the profile or a journalist request
+changes. Entries are loaded from the primary database, never a replica.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from . import db_router
+from .models import Profile
+
+JOURNALISTS_GROUP = "Journalists"
+CACHE_KEY = "sabuzz:roles:{user_id}"
+
+_ATTR = "_sabuzz_roles"
+
+
+def _ttl():
+    return getattr(settings, "ROLE_CACHE_TTL", 300)
+
+
+def _load(user):
+    with db_router.primary():
+        return {
+            "groups": frozenset(user.groups.values_list("name", flat=True)),
+            "profile_role": Profile.objects.filter(user=user).values_list("role", flat=True).first(),
+        }
+
+
+def get_roles(user):
+    """{"groups": frozenset of group names, "profile_role": str or None} for a user."""
+    if not user or not user.is_authenticated:
+        return {"groups": frozenset(), "profile_role": None}
+    roles = getattr(user, _ATTR, None)
+    if roles is None:
+        key = CACHE_KEY.format(user_id=user.pk)
+        roles = cache.get(key)
+        if roles is None:
+            roles = _load(user)
+            cache.set(key, roles, timeout=_ttl())
+        setattr(user, _ATTR, roles)
+    return roles
+
+
+def is_journalist(user):
+    """True for superusers and members of the Journalists group."""
+    if not user or not user.is_authenticated:
+        return False
+    return user.is_superuser or JOURNALISTS_GROUP in get_roles(user)["groups"]
+
+
+def profile_role(user):
+    return get_roles(user)["profile_role"]
+
+
+def invalidate(user_id):
+    cache.delete(CACHE_KEY.format(user_id=user_id))
+
+
+def invalidate_many(user_ids):
+    cache.delete_many([CACHE_KEY.format(user_id=user_id) for user_id in user_ids])
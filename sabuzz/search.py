@@ -0,0 +1,220 @@
+# sabuzz/search.py
+"""
+Full-text search over published posts.
+
+On SQLite this is an FTS5 table (sabuzz_post_fts, rowid = post id) kept in
+sync by the Post signals in sabuzz/signals.py and rebuilt with
+`manage.py rebuild_search_index`. Results are BM25-ranked (title weighted
+above content) and come with a highlighted snippet. Other databases fall back
+to a plain LIKE query.
+
+merge_results() fuses local posts and newsdata.io articles into one
+ranked, de-duplicated list for the federated /search/ page.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.urls import reverse
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post
+
+FTS_TABLE = "sabuzz_post_fts"
+
+# bm25() column weights: title, content
+TITLE_WEIGHT = 10.0
+CONTENT_WEIGHT = 1.0
+
+_MARK_START = "\x02"
+_MARK_END = "\x03"
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# reciprocal rank fusion constant: higher values flatten the rank curve
+RRF_K = 60
+
+
+def fts_available():
+    return connection.vendor == "sqlite"
+
+
+def index_post(post):
+    """Add/refresh a post in the index, or drop it if it is no longer published."""
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [post.pk])
+        if post.status == "published":
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}(rowid, title, content) VALUES (%s, %s, %s)",
+                [post.pk, post.title, post.content],
+            )
+
+
+def remove_post(post_id):
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [post_id])
+
+
+def rebuild_index():
+    """Re-create the index contents from the published posts. Returns the number indexed."""
+    if not fts_available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}(rowid, title, content) "
+            f"SELECT id, title, content FROM {Post._meta.db_table} WHERE status = %s",
+            ["published"],
+        )
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+        cursor.execute(f"SELECT count(*) FROM {FTS_TABLE}")
+        return cursor.fetchone()[0]
+
+
+def to_match_query(query):
+    """
+    Turn free text into a safe FTS5 query: every word must match, the last
+    word also matches as a prefix ("cape tow" finds "Cape Town").
+    """
+    words = _WORD_RE.findall(query)
+    if not words:
+        return ""
+    terms = [f'"{w}"' for w in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def _highlight(snippet):
+    return mark_safe(
+        escape(snippet).replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>")
+    )
+
+
+def matching_post_ids(query, limit=1000):
+    """Ids of published posts matching query, best first."""
+    match = to_match_query(query)
+    if not match:
+        return []
+    if not fts_available():
+        return list(
+            Post.objects.filter(status="published")
+            .filter(Q(title__icontains=query) | Q(content__icontains=query))
+            .order_by("-created_at").values_list("id", flat=True)[:limit]
+        )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+            f"ORDER BY bm25({FTS_TABLE}, %s, %s) LIMIT %s",
+            [match, TITLE_WEIGHT, CONTENT_WEIGHT, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search_posts(query, limit=20):
+    """
+    Published posts matching query, best first. Each post gets `.rank` (lower
+    is better, as in bm25()) and `.snippet` (safe HTML with <mark> highlights).
+    """
+    match = to_match_query(query)
+    if not match:
+        return []
+
+    if not fts_available():
+        posts = list(
+            Post.objects.filter(status="published")
+            .filter(Q(title__icontains=query) | Q(content__icontains=query))
+            .select_related("author", "category").order_by("-created_at")[:limit]
+        )
+        for post in posts:
+            post.rank = 0.0
+            post.snippet = escape(post.content[:200])
+        return posts
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, bm25({FTS_TABLE}, %s, %s) AS rank, "
+            f"snippet({FTS_TABLE}, 1, %s, %s, '…', 16) "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rank LIMIT %s",
+            [TITLE_WEIGHT, CONTENT_WEIGHT, _MARK_START, _MARK_END, match, limit],
+        )
+        rows = cursor.fetchall()
+
+    posts = Post.objects.select_related("author", "category").in_bulk([row[0] for row in rows])
+    results = []
+    for post_id, rank, snippet in rows:
+        post = posts.get(post_id)
+        if post is None or post.status != "published":
+            continue  # index slightly behind the table; rebuild_search_index fixes it
+        post.rank = rank
+        post.snippet = _highlight(snippet)
+        results.append(post)
+    return results
+
+
+# -------------------------
+# Federated search
+# -------------------------
+def _dedupe_key(title):
+    return " ".join(_WORD_RE.findall((title or "").lower()))
+
+
+def _article_value(article, name):
+    # store rows are model instances, live upstream results are dicts
+    if isinstance(article, dict):
+        return article.get(name)
+    return getattr(article, name, None)
+
+
+def merge_results(posts, articles, limit=30):
+    """
+    Fuse local posts (already BM25-ordered) and external articles (in upstream
+    order) with reciprocal rank fusion. Items with the same link or the same
+    normalised title are merged and their scores added. Returns plain dicts.
+    """
+    merged = {}
+    order = []
+
+    def add(key_link, title, score, item):
+        keys = [k for k in (key_link, _dedupe_key(title)) if k]
+        existing = next((merged[k] for k in keys if k in merged), None)
+        if existing is not None:
+            existing["score"] += score
+            for k in keys:
+                merged.setdefault(k, existing)
+            return
+        item["score"] = score
+        for k in keys:
+            merged[k] = item
+        order.append(item)
+
+    for i, post in enumerate(posts or []):
+        url = reverse("post_detail", args=[post.pk])
+        add(url, post.title, 1.0 / (RRF_K + i + 1), {
+            "kind": "post",
+            "title": post.title,
+            "summary": getattr(post, "snippet", ""),
+            "url": url,
+            "image_url": post.image.url if post.image else None,
+            "source": "SA Buzz",
+        })
+
+    for i, article in enumerate(articles or []):
+        link = _article_value(article, "link")
+        title = _article_value(article, "title")
+        if not link or not title:
+            continue
+        add(link, title, 1.0 / (RRF_K + i + 1), {
+            "kind": "article",
+            "title": title,
+            "summary": _article_value(article, "description") or "",
+            "url": link,
+            "image_url": _article_value(article, "image_url"),
+            "source": _article_value(article, "source_id") or "newsdata.io",
+        })
+
+    order.sort(key=lambda item: item["score"], reverse=True)
+    return order[:limit]
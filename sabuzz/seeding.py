@@ -0,0 +1,373 @@
+# sabuzz/seeding.py
+"""
+Synthetic data at production scale, for benchmarks and local profiling.
+
+Rows are written with batched bulk_create() inside one transaction per table,
+so none of the per-row signals run (profile creation, counters, stats, search
+index, page cache). Everything those signals would have maintained is filled
+in directly: Profile rows are created alongside the users, Post counters are
+decided before the posts are written, and the dashboard stats and the search
+index are rebuilt once at the end.
+
+On SQLite, fsyncs are switched off for the duration of the load
+(PRAGMA synchronous = OFF); a crash mid-seed can only lose seed data.
+
+Output is deterministic for a given `seed` (timestamps are relative to the
+moment the run starts). Activity is skewed the way a news site's is: a few
+posts collect most comments, likes and saves, a few journalists write most
+posts, and recent posts are more likely to still be pending.
+"""
+import bisect
+import itertools
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import page_cache, roles, search, stats
+from .models import Category, Comment, Favorite, Like, Post, Profile, SavedPost, Subscriber
+
+BATCH_SIZE = 2000
+HISTORY_DAYS = 730
+PARAGRAPHS = 1024  # bodies are stitched from a pool; generating every word is the slowest part
+
+CATEGORY_NAMES = [
+    "Politics", "Business", "Sport", "Technology", "Entertainment", "Health",
+    "World", "Science", "Education", "Lifestyle", "Opinion", "Local",
+]
+
+WORDS = (
+    "government minister council budget report election court police city province "
+    "school hospital market price energy water power load shedding rain storm "
+    "community project water transport road rail airport team match coach league "
+    "season record final player fans music film festival artist award study "
+    "research scientists data climate farmers harvest trade exports jobs workers "
+    "union strike talks deal plan policy national local officials residents "
+    "announced confirmed warned said expected reported launched opened closed "
+    "new major first latest early late week month year today yesterday morning "
+    "crisis growth recovery support investment digital mobile network services "
+    "health care students teachers university results public private sector"
+).split()
+
+TABLES = ("users", "categories", "posts", "comments", "likes", "saved_posts", "favorites", "subscribers")
+
+# rows per table for the named scales; anything else can be passed explicitly
+SCALES = {
+    "1k": 1_000,
+    "10k": 10_000,
+    "100k": 100_000,
+    "1m": 1_000_000,
+}
+
+
+def scale_counts(scale):
+    """Default row counts for a scale name ("10k") or a plain number of posts."""
+    n = SCALES[scale] if scale in SCALES else int(scale)
+    return {
+        "users": max(50, n // 20),
+        "categories": len(CATEGORY_NAMES),
+        "posts": n,
+        "comments": n,
+        "likes": n,
+        "saved_posts": n // 2,
+        "favorites": n // 10,
+        "subscribers": max(10, n // 40),
+    }
+
+
+@contextmanager
+def explicit_timestamps(model, *field_names):
+    """Let bulk_create() keep the auto_now/auto_now_add values we set ourselves."""
+    fields = [model._meta.get_field(name) for name in field_names]
+    saved = [(f, f.auto_now, f.auto_now_add) for f in fields]
+    for f in fields:
+        f.auto_now = f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, auto_now, auto_now_add in saved:
+            f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+
+@contextmanager
+def bulk_load():
+    """Skip per-commit fsyncs on SQLite while seeding; other databases are left alone."""
+    if connection.vendor != "sqlite" or connection.in_atomic_block:  # can't change inside a transaction
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA synchronous")
+        previous = cursor.fetchone()[0]
+        cursor.execute("PRAGMA synchronous = OFF")
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA synchronous = {int(previous)}")
+
+
+def insert_batches(model, rows, batch_size=BATCH_SIZE):
+    """bulk_create an iterable of unsaved instances in batches; returns their pks in order."""
+    pks = []
+    with transaction.atomic():
+        while True:
+            batch = list(itertools.islice(rows, batch_size))
+            if not batch:
+                return pks
+            model.objects.bulk_create(batch, batch_size=batch_size)
+            pks.extend(obj.pk for obj in batch)
+
+
+class Seeder:
+
+    def __init__(self, seed=0, batch_size=BATCH_SIZE, log=None):
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        self.now = timezone.now()
+        self.paragraphs = [self._text(20, 60).capitalize() + "." for _ in range(PARAGRAPHS)]
+
+    # -------------------------
+    # Helpers
+    # -------------------------
+    def _text(self, low, high):
+        return " ".join(self.rng.choices(WORDS, k=self.rng.randint(low, high)))
+
+    def _title(self):
+        return self._text(5, 10).capitalize()
+
+    def _body(self, low, high):
+        return "\n\n".join(self.rng.choices(self.paragraphs, k=self.rng.randint(low, high)))
+
+    def _ago(self, max_days, bias=1.0):
+        """A moment in the last max_days; bias > 1 crowds values towards now."""
+        return self.now - timedelta(seconds=max_days * 86400 * self.rng.random() ** bias)
+
+    def _after(self, moment):
+        """A moment between `moment` and now, usually soon after it."""
+        span = (self.now - moment).total_seconds()
+        return moment + timedelta(seconds=span * self.rng.random() ** 3)
+
+    def _popularity(self, count):
+        """Cumulative Zipf-like weights over `count` items in a shuffled order."""
+        ranks = list(range(1, count + 1))
+        self.rng.shuffle(ranks)
+        return list(itertools.accumulate(1.0 / rank for rank in ranks))
+
+    def _spread(self, total, cum_weights):
+        """Split `total` rows over items by weight; returns a count per item."""
+        counts = [0] * len(cum_weights)
+        if not cum_weights:
+            return counts
+        top = cum_weights[-1]
+        last = len(cum_weights) - 1
+        for _ in range(total):
+            counts[min(bisect.bisect(cum_weights, self.rng.random() * top), last)] += 1
+        return counts
+
+    def _insert(self, model, rows):
+        start = time.monotonic()
+        pks = insert_batches(model, iter(rows), self.batch_size)
+        self.log(f"{model.__name__}: {len(pks)} rows in {time.monotonic() - start:.1f}s")
+        return pks
+
+    # -------------------------
+    # Tables
+    # -------------------------
+    def users(self, count, journalist_share=0.05):
+        """Users with their Profile rows; returns (user_ids, journalist_ids)."""
+        password = make_password(None)  # unusable; log in with force_login or set one
+        joined = sorted(self._ago(HISTORY_DAYS) for _ in range(count))
+        offset = User.objects.count()
+        user_ids = self._insert(User, (
+            User(
+                username=f"seed_user{offset + i}",
+                email=f"seed_user{offset + i}@example.com",
+                first_name=self.rng.choice(WORDS).capitalize(),
+                password=password,
+                date_joined=moment,
+            )
+            for i, moment in enumerate(joined)
+        ))
+
+        journalists = set(self.rng.sample(user_ids, max(1, int(len(user_ids) * journalist_share))))
+        self._insert(Profile, (
+            Profile(
+                user_id=user_id,
+                role="journalist" if user_id in journalists else "user",
+                full_name=f"Seed Journalist {user_id}" if user_id in journalists else None,
+                is_verified=user_id in journalists,
+            )
+            for user_id in user_ids
+        ))
+        group, _ = Group.objects.get_or_create(name=roles.JOURNALISTS_GROUP)
+        self._insert(User.groups.through, (
+            User.groups.through(user_id=user_id, group_id=group.pk) for user_id in sorted(journalists)
+        ))
+        return user_ids, sorted(journalists)
+
+    def categories(self, count):
+        names = CATEGORY_NAMES[:count] + [f"Section {i}" for i in range(count - len(CATEGORY_NAMES))]
+        return self._insert(Category, (
+            Category(name=name, description=f"{name} news") for name in names
+        ))
+
+    def posts(self, count, author_ids, category_ids, user_count, comments, likes, saves):
+        """
+        Posts, oldest first, with counters already matching the comment, like and
+        save rows that comments()/likes()/saved_posts() will write for the returned plan.
+        """
+        created = sorted(self._ago(HISTORY_DAYS, bias=1.5) for _ in range(count))
+        statuses = []
+        for moment in created:
+            recent = (self.now - moment).days < 3
+            roll = self.rng.random()
+            if roll < (0.25 if recent else 0.02):
+                statuses.append("pending")
+            elif roll < (0.30 if recent else 0.05):
+                statuses.append("draft")
+            else:
+                statuses.append("published")
+
+        published = [i for i, status in enumerate(statuses) if status == "published"]
+        weights = self._popularity(len(published))
+        # a user likes / saves a post at most once
+        like_counts = [min(n, user_count) for n in self._spread(likes, weights)]
+        save_counts = [min(n, user_count) for n in self._spread(saves, weights)]
+        comment_counts = self._spread(comments, weights)
+        approved_counts = [sum(self.rng.random() < 0.85 for _ in range(n)) for n in comment_counts]
+
+        per_post = {
+            index: (comment_counts[k], approved_counts[k], like_counts[k], save_counts[k])
+            for k, index in enumerate(published)
+        }
+        author_weights = list(itertools.accumulate(1.0 / rank for rank in range(1, len(author_ids) + 1)))
+
+        def rows():
+            for i, moment in enumerate(created):
+                n_comments, n_approved, n_likes, _saves = per_post.get(i, (0, 0, 0, 0))
+                yield Post(
+                    title=self._title(),
+                    content=self._body(1, 4),
+                    category_id=self.rng.choice(category_ids) if category_ids else None,
+                    author_id=self.rng.choices(author_ids, cum_weights=author_weights)[0],
+                    status=statuses[i],
+                    created_at=moment,
+                    updated_at=moment,
+                    like_count=n_likes,
+                    comment_count=n_comments,
+                    approved_comment_count=n_approved,
+                )
+
+        with explicit_timestamps(Post, "created_at", "updated_at"):
+            post_ids = self._insert(Post, rows())
+        plan = [
+            (post_ids[i], created[i]) + per_post[i] for i in published
+        ]
+        return post_ids, plan
+
+    def comments(self, plan, user_ids):
+        def rows():
+            for post_id, created, n_comments, n_approved, _likes, _saves in plan:
+                for k in range(n_comments):
+                    yield Comment(
+                        post_id=post_id,
+                        user_id=self.rng.choice(user_ids),
+                        text=self._text(5, 40).capitalize() + ".",
+                        date_posted=self._after(created),
+                        approved=k < n_approved,
+                    )
+
+        with explicit_timestamps(Comment, "date_posted"):
+            return self._insert(Comment, rows())
+
+    def likes(self, plan, user_ids):
+        return self._insert(Like, (
+            Like(post_id=post_id, user_id=user_id)
+            for post_id, _created, _comments, _approved, n_likes, _saves in plan
+            for user_id in self.rng.sample(user_ids, n_likes)
+        ))
+
+    def saved_posts(self, plan, user_ids):
+        def rows():
+            for post_id, created, _comments, _approved, _likes, n_saves in plan:
+                for user_id in self.rng.sample(user_ids, n_saves):
+                    yield SavedPost(post_id=post_id, user_id=user_id, saved_at=self._after(created))
+
+        with explicit_timestamps(SavedPost, "saved_at"):
+            return self._insert(SavedPost, rows())
+
+    def favorites(self, count, user_ids):
+        weights = self._popularity(len(user_ids))
+
+        def rows():
+            for _ in range(count):
+                slug = self.rng.randrange(count * 2)
+                yield Favorite(
+                    user_id=self.rng.choices(user_ids, cum_weights=weights)[0],
+                    title=self._title(),
+                    link=f"https://news.example.com/articles/{slug}",
+                    image_url=f"https://news.example.com/images/{slug}.jpg",
+                    source=self.rng.choice(["example_news", "daily_example", "example_wire"]),
+                    saved_at=self._ago(365, bias=2),
+                )
+
+        with explicit_timestamps(Favorite, "saved_at"):
+            return self._insert(Favorite, rows())
+
+    def subscribers(self, count, user_ids, member_share=0.4):
+        """Newsletter sign-ups: some by registered users, the rest by email only."""
+        members = self.rng.sample(user_ids, min(len(user_ids), int(count * member_share)))
+        emails = dict(User.objects.filter(pk__gte=min(user_ids)).values_list("pk", "email"))
+        offset = Subscriber.objects.count()
+
+        def rows():
+            for user_id in members:
+                yield Subscriber(user_id=user_id, email=emails[user_id], subscribed_at=self._ago(HISTORY_DAYS))
+            for i in range(count - len(members)):
+                yield Subscriber(
+                    email=f"seed_reader{offset + i}@example.net",
+                    subscribed_at=self._ago(HISTORY_DAYS, bias=1.5),
+                )
+
+        with explicit_timestamps(Subscriber, "subscribed_at"):
+            return self._insert(Subscriber, rows())
+
+    def finish(self):
+        """Rebuild what the per-row signals would have maintained."""
+        stats.rebuild_all()
+        indexed = search.rebuild_index()
+        page_cache.invalidate(page_cache.FEED_TAG)
+        self.log(f"Rebuilt dashboard stats; indexed {indexed} posts for search")
+
+
+def seed(counts, seed=0, batch_size=BATCH_SIZE, log=None):
+    """
+    Write `counts` rows (see scale_counts() for the keys) and return the
+    number actually written per table.
+    """
+    seeder = Seeder(seed=seed, batch_size=batch_size, log=log)
+    with bulk_load():
+        user_ids, journalist_ids = seeder.users(counts["users"])
+        category_ids = seeder.categories(counts["categories"])
+        post_ids, plan = seeder.posts(
+            counts["posts"], journalist_ids, category_ids, len(user_ids),
+            comments=counts["comments"], likes=counts["likes"], saves=counts["saved_posts"],
+        )
+        written = {
+            "users": len(user_ids),
+            "categories": len(category_ids),
+            "posts": len(post_ids),
+            "comments": len(seeder.comments(plan, user_ids)),
+            "likes": len(seeder.likes(plan, user_ids)),
+            "saved_posts": len(seeder.saved_posts(plan, user_ids)),
+            "favorites": len(seeder.favorites(counts["favorites"], user_ids)),
+            "subscribers": len(seeder.subscribers(counts.get("subscribers", 0), user_ids)),
+        }
+        seeder.finish()
+    return written
@@ -0,0 +1,97 @@
+# sabuzz/services.py
+"""
+Internal post service shared by the REST API (sabuzz/api/views.py) and the
+server-rendered pages, so pages don't have to call our own API over HTTP.
+Cached results are computed from the primary database, never a replica.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import Count, Max
+
+from . import db_router
+from .api.serializers import PostSerializer
+from .models import Post
+
+POSTS_PER_PAGE = 20
+POSTS_PAGE_TTL = 60
+POSTS_VALIDATORS_TTL = 60
+POSTS_VERSION_KEY = "sabuzz:posts:version"
+
+
+def posts_queryset(status=None, fields=None):
+    """
+    The one Post queryset used by the API and the posts page. With `fields`
+    only those columns (plus the keyset columns) are selected.
+    """
+    qs = Post.objects.order_by("-created_at", "-id")
+    if status:
+        qs = qs.filter(status=status)
+    if fields:
+        concrete = {field.name for field in Post._meta.concrete_fields}
+        qs = qs.only("id", "created_at", *(concrete & set(fields)))
+    return qs
+
+
+def posts_version():
+    return cache.get_or_set(POSTS_VERSION_KEY, 1, timeout=None)
+
+
+def invalidate_posts():
+    """Called when any post changes; old cached pages simply stop being read."""
+    try:
+        cache.incr(POSTS_VERSION_KEY)
+    except ValueError:
+        cache.set(POSTS_VERSION_KEY, 1, timeout=None)
+
+
+def published_posts_page(page_number, per_page=POSTS_PER_PAGE):
+    """
+    One page of published posts, serialized once with PostSerializer and cached
+    until the next post change (or POSTS_PAGE_TTL seconds).
+    """
+    try:
+        page_number = max(int(page_number), 1)
+    except (TypeError, ValueError):
+        page_number = 1
+
+    key = f"sabuzz:posts:published:{per_page}:{page_number}"
+    version = posts_version()
+    data = cache.get(key, version=version)
+    if data is not None:
+        return data
+
+    with db_router.primary():
+        page = Paginator(posts_queryset(status="published"), per_page).get_page(page_number)
+        data = {
+            "posts": list(PostSerializer(page.object_list, many=True).data),
+            "number": page.number,
+            "num_pages": page.paginator.num_pages,
+            "has_previous": page.has_previous(),
+            "has_next": page.has_next(),
+        }
+    cache.set(key, data, timeout=POSTS_PAGE_TTL, version=version)
+    return data
+
+
+def posts_validators(qs, request_key, user):
+    """
+    (ETag, Last-Modified epoch seconds) for a post listing/detail request, cached until the next
+    post change so a polling client that gets a 304 costs no queries at all.
+    """
+    version = posts_version()
+    digest = hashlib.md5(f"{request_key}:{user.pk}".encode()).hexdigest()
+    key = f"sabuzz:posts:validators:{digest}"
+
+    validators = cache.get(key, version=version)
+    if validators is None:
+        with db_router.primary():
+            agg = qs.order_by().aggregate(last_modified=Max("updated_at"), count=Count("id"))
+        tag = hashlib.md5(
+            f"{version}:{agg['count']}:{agg['last_modified']}:{request_key}:{user.pk}".encode()
+        ).hexdigest()
+        last_modified = int(agg["last_modified"].timestamp()) if agg["last_modified"] else None
+        validators = (f'"{tag}"', last_modified)
+        cache.set(key, validators, timeout=POSTS_VALIDATORS_TTL, version=version)
+    return validators
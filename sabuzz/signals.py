@@ -1,8 +1,12 @@
 # sabuzz/signals.py
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete, m2m_changed
+from django.db import transaction
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
-from .models import Profile, JournalistRequest
+from django.contrib.auth.models import Group
+from .models import Profile, JournalistRequest, Post, Comment, Like, Subscriber, Category
+from .services import invalidate_posts
+from . import counters, images, page_cache, roles, search, stats, storage
 
 User = get_user_model()
 
@@ -35,3 +39,238 @@ def approve_journalist_request(sender, instance, **kwargs):
         profile.role = 'journalist'
         profile.full_name = instance.user.get_full_name() or instance.user.username
         profile.save()
+
+# ------------------------------------------------------------
+# Drop cached post pages whenever a post changes
+# ------------------------------------------------------------
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_changed(sender, instance, **kwargs):
+    invalidate_posts()
+
+
+# ------------------------------------------------------------
+# Keep the full-text search index in sync
+# ------------------------------------------------------------
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.remove_post(instance.pk)
+
+
+# ------------------------------------------------------------
+# Denormalized like/comment counters on Post
+# (fires for views, admin and cascades alike)
+# ------------------------------------------------------------
+@receiver(pre_save, sender=Comment)
+def remember_comment_approval(sender, instance, **kwargs):
+    instance._was_approved = None
+    if instance.pk:
+        instance._was_approved = (
+            Comment.objects.filter(pk=instance.pk).values_list("approved", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Comment)
+def count_comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.comment_added(instance)
+    elif instance._was_approved is not None:
+        counters.comment_approval_changed(instance, instance._was_approved)
+
+
+@receiver(post_delete, sender=Comment)
+def count_comment_deleted(sender, instance, **kwargs):
+    counters.comment_removed(instance)
+
+
+@receiver(post_save, sender=Like)
+def count_like_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.like_added(instance)
+
+
+@receiver(post_delete, sender=Like)
+def count_like_deleted(sender, instance, **kwargs):
+    counters.like_removed(instance)
+
+
+# ------------------------------------------------------------
+# Dashboard statistics snapshot (sabuzz/stats.py)
+# ------------------------------------------------------------
+@receiver(pre_save, sender=Post)
+def remember_post_status(sender, instance, **kwargs):
+    # previous state, for the stats deltas, page purging and image release below
+    instance._old_status = instance._old_author_id = instance._old_image = None
+    if instance.pk:
+        old = Post.objects.filter(pk=instance.pk).values_list("status", "author_id", "image").first()
+        if old:
+            instance._old_status, instance._old_author_id, instance._old_image = old
+
+
+@receiver(post_save, sender=Post)
+def stats_post_saved(sender, instance, created, **kwargs):
+    stats.post_saved(instance, created, instance._old_status, instance._old_author_id)
+
+
+@receiver(post_delete, sender=Post)
+def stats_post_deleted(sender, instance, **kwargs):
+    stats.post_deleted(instance)
+
+
+@receiver(post_save, sender=Comment)
+def stats_comment_saved(sender, instance, created, **kwargs):
+    if created:
+        stats.comment_changed(instance, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def stats_comment_deleted(sender, instance, **kwargs):
+    stats.comment_changed(instance, -1)
+
+
+@receiver(post_save, sender=Like)
+def stats_like_saved(sender, instance, created, **kwargs):
+    if created:
+        stats.like_changed(instance, 1)
+
+
+@receiver(post_delete, sender=Like)
+def stats_like_deleted(sender, instance, **kwargs):
+    stats.like_changed(instance, -1)
+
+
+@receiver(post_save, sender=Subscriber)
+def stats_subscriber_saved(sender, instance, created, **kwargs):
+    if created:
+        stats.subscriber_changed(1)
+
+
+@receiver(post_delete, sender=Subscriber)
+def stats_subscriber_deleted(sender, instance, **kwargs):
+    stats.subscriber_changed(-1)
+
+
+@receiver(post_save, sender=Category)
+def stats_category_saved(sender, instance, created, **kwargs):
+    if created:
+        stats.category_changed(1)
+
+
+@receiver(post_delete, sender=Category)
+def stats_category_deleted(sender, instance, **kwargs):
+    stats.category_changed(-1)
+
+
+# ------------------------------------------------------------
+# Drop cached roles (sabuzz/roles.py) when they may have changed
+# ------------------------------------------------------------
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        if action == "pre_clear" and reverse:
+            # group.user_set.clear(): pk_set is not provided, so collect the members now
+            roles.invalidate_many(instance.user_set.values_list("pk", flat=True))
+        return
+    if reverse:
+        roles.invalidate_many(pk_set or [])
+    else:
+        roles.invalidate(instance.pk)
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    roles.invalidate_many(instance.user_set.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+@receiver(post_save, sender=JournalistRequest)
+def profile_or_request_changed(sender, instance, **kwargs):
+    roles.invalidate(instance.user_id)
+
+
+# ------------------------------------------------------------
+# Purge cached public pages (sabuzz/page_cache.py)
+# ------------------------------------------------------------
+@receiver(post_save, sender=Post)
+def purge_post_pages(sender, instance, **kwargs):
+    tags = [page_cache.post_tag(instance.pk)]
+    # the feed only changes if the post is, or just stopped being, published
+    if "published" in (instance.status, getattr(instance, "_old_status", None)):
+        tags.append(page_cache.FEED_TAG)
+    page_cache.invalidate(*tags)
+
+
+@receiver(post_delete, sender=Post)
+def purge_deleted_post_pages(sender, instance, **kwargs):
+    tags = [page_cache.post_tag(instance.pk)]
+    if instance.status == "published":
+        tags.append(page_cache.FEED_TAG)
+    page_cache.invalidate(*tags)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Like)
+@receiver(post_delete, sender=Like)
+def purge_comment_pages(sender, instance, **kwargs):
+    page_cache.invalidate(page_cache.post_tag(instance.post_id))
+
+
+# ------------------------------------------------------------
+# Build resized WebP copies of new uploads (sabuzz/images.py)
+# ------------------------------------------------------------
+@receiver(post_save, sender=Post)
+def post_image_derivatives(sender, instance, **kwargs):
+    if instance.image:
+        name = instance.image.name
+        transaction.on_commit(lambda: images.ready(name, "card"))
+
+
+@receiver(post_save, sender=Profile)
+def profile_image_derivatives(sender, instance, **kwargs):
+    if instance.profile_image:
+        name = instance.profile_image.name
+        transaction.on_commit(lambda: images.ready(name, "avatar"))
+
+
+# ------------------------------------------------------------
+# Delete shared image files nothing points at any more (sabuzz/storage.py)
+# ------------------------------------------------------------
+def _release_later(name):
+    if name:
+        transaction.on_commit(lambda: storage.release(name))
+
+
+@receiver(pre_save, sender=Profile)
+def remember_profile_image(sender, instance, **kwargs):
+    instance._old_image = None
+    if instance.pk:
+        instance._old_image = Profile.objects.filter(pk=instance.pk).values_list("profile_image", flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def release_replaced_post_image(sender, instance, **kwargs):
+    if instance._old_image and instance._old_image != instance.image.name:
+        _release_later(instance._old_image)
+
+
+@receiver(post_save, sender=Profile)
+def release_replaced_profile_image(sender, instance, **kwargs):
+    if instance._old_image and instance._old_image != instance.profile_image.name:
+        _release_later(instance._old_image)
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_post_image(sender, instance, **kwargs):
+    _release_later(instance.image.name)
+
+
+@receiver(post_delete, sender=Profile)
+def release_deleted_profile_image(sender, instance, **kwargs):
+    _release_later(instance.profile_image.name)
@@ -0,0 +1,98 @@
+# sabuzz/sqlite_backend/base.py
+"""
+SQLite backend with a serialized write path (ENGINE "sabuzz.sqlite_backend",
+see DATABASES in settings.py).
+
+SQLite allows one writer at a time. When several threads of a worker write
+at once, the losers spin in SQLite's busy handler, sleeping in growing steps,
+and give up with "database is locked" when the busy timeout runs out. Here,
+writers in one process queue on a lock instead, and each gets the file as
+soon as the previous one commits:
+
+  - a transaction (atomic block, BEGIN IMMEDIATE under the production
+    profile) holds the lock from BEGIN until COMMIT / ROLLBACK,
+  - a single INSERT / UPDATE / DELETE in autocommit holds it for that
+    statement only.
+
+Reads never take the lock; in WAL mode they run alongside the writer.
+Writers in other processes are still arbitrated by SQLite's own locking and
+the busy timeout (OPTIONS "timeout").
+"""
+import re
+import threading
+
+from django.db.backends.sqlite3 import base
+from django.db.utils import OperationalError
+
+WRITE_RE = re.compile(r"^\s*(INSERT|UPDATE|DELETE|REPLACE|CREATE|DROP|ALTER)\b", re.IGNORECASE)
+DEFAULT_TIMEOUT = 5  # sqlite3's own default busy timeout
+
+_registry_lock = threading.Lock()
+_write_locks = {}
+
+
+def write_lock(name):
+    """The process-wide write lock of one database file."""
+    with _registry_lock:
+        return _write_locks.setdefault(str(name), threading.Lock())
+
+
+def is_write(sql):
+    return bool(WRITE_RE.match(sql))
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.holds_write_lock = False
+        self.execute_wrappers.insert(0, self._serialize_write)
+
+    def _lock(self):
+        return write_lock(self.settings_dict["NAME"])
+
+    def _acquire_write_lock(self):
+        timeout = self.settings_dict["OPTIONS"].get("timeout", DEFAULT_TIMEOUT)
+        if not self._lock().acquire(timeout=timeout):
+            raise OperationalError(f"database is locked (waited {timeout}s for the write lock)")
+        self.holds_write_lock = True
+
+    def _release_write_lock(self):
+        if self.holds_write_lock:
+            self.holds_write_lock = False
+            self._lock().release()
+
+    def _serialize_write(self, execute, sql, params, many, context):
+        if self.holds_write_lock or self.in_atomic_block or not is_write(sql):
+            return execute(sql, params, many, context)
+        self._acquire_write_lock()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self._release_write_lock()
+
+    def _start_transaction_under_autocommit(self):
+        self._acquire_write_lock()
+        try:
+            super()._start_transaction_under_autocommit()
+        except Exception:
+            self._release_write_lock()
+            raise
+
+    def _commit(self):
+        try:
+            return super()._commit()
+        finally:
+            self._release_write_lock()
+
+    def _rollback(self):
+        try:
+            return super()._rollback()
+        finally:
+            self._release_write_lock()
+
+    def _close(self):
+        try:
+            return super()._close()
+        finally:
+            self._release_write_lock()
@@ -0,0 +1,51 @@
+# sabuzz/staticfiles.py
+"""
+Static files storage for production (DEBUG = False, see settings.STORAGES).
+
+collectstatic writes content-hashed copies (style.3f2a9c1e.css) plus a
+manifest, so templates using {% static %} get URLs that can be cached
+forever, and next to every compressible file a .gz and, if the optional
+`brotli` package is installed, a .br variant. The front web server serves
+those directly (nginx gzip_static / brotli_static); nothing is compressed
+per request.
+"""
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # optional; gzip variants are always written
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".map", ".svg", ".json", ".txt", ".xml", ".html", ".ico"}
+MIN_SIZE = 256  # bytes; smaller files aren't worth a second request path
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for name in self.hashed_files.values():
+            yield from self._compress(name)
+
+    def _compress(self, name):
+        if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+            return
+        path = self.path(name)
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < MIN_SIZE:
+            return
+
+        variants = [(".gz", gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append((".br", brotli.compress(data)))
+        for suffix, compressed in variants:
+            if len(compressed) < len(data):
+                with open(path + suffix, "wb") as f:
+                    f.write(compressed)
+                yield name, name + suffix, True
@@ -0,0 +1,168 @@
+# sabuzz/stats.py
+"""
+Dashboard statistics snapshot.
+
+One DashboardStats row for the whole site and one per author. Signals in
+sabuzz/signals.py apply every post/comment/like/subscriber/category change as
+an atomic F() update, so the dashboard reads its numbers with a single
+indexed lookup instead of counting the tables. A missing row is built from
+the real tables by the first change that touches it (and by `manage.py seed`);
+until then get_stats() computes the numbers without storing them, so reads
+never write. `manage.py reconcile_counters` rebuilds all of them.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+
+from .models import Category, Comment, DashboardStats, Like, Post, Subscriber
+
+STATUS_FIELDS = {
+    "draft": "posts_draft",
+    "pending": "posts_pending",
+    "published": "posts_published",
+}
+
+
+def author_key(author_id):
+    return f"author:{author_id}"
+
+
+def _compute(author_id=None):
+    posts = Post.objects.all()
+    comments = Comment.objects.all()
+    likes = Like.objects.all()
+    if author_id is not None:
+        posts = posts.filter(author_id=author_id)
+        comments = comments.filter(post__author_id=author_id)
+        likes = likes.filter(post__author_id=author_id)
+
+    by_status = posts.aggregate(**{
+        field: Count("id", filter=Q(status=status)) for status, field in STATUS_FIELDS.items()
+    })
+    values = {
+        **by_status,
+        "comments": comments.count(),
+        "likes": likes.count(),
+    }
+    if author_id is None:
+        values["subscribers"] = Subscriber.objects.count()
+        values["categories"] = Category.objects.count()
+    return values
+
+
+def rebuild(author_id=None):
+    """Recompute one row from the real tables."""
+    key = author_key(author_id) if author_id is not None else DashboardStats.GLOBAL_KEY
+    row, _ = DashboardStats.objects.update_or_create(
+        key=key, defaults={"author_id": author_id, **_compute(author_id)}
+    )
+    return row
+
+
+def rebuild_all():
+    rebuild()
+    author_ids = Post.objects.order_by().values_list("author_id", flat=True).distinct()
+    for author_id in author_ids:
+        rebuild(author_id)
+    DashboardStats.objects.exclude(key=DashboardStats.GLOBAL_KEY).exclude(
+        author_id__in=author_ids
+    ).delete()
+
+
+def get_stats(author_id=None):
+    """The stored row, or an unsaved one computed from the tables if there is none yet."""
+    key = author_key(author_id) if author_id is not None else DashboardStats.GLOBAL_KEY
+    row = DashboardStats.objects.filter(key=key).first()
+    if row is None:
+        row = DashboardStats(key=key, author_id=author_id, **_compute(author_id))
+    return row
+
+
+def _bump(author_id, create=True, **deltas):
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    key = author_key(author_id) if author_id is not None else DashboardStats.GLOBAL_KEY
+    updated = DashboardStats.objects.filter(key=key).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+    if not updated and create:
+        # first change for this scope: the change is already in the tables,
+        # so building the row from them includes it
+        try:
+            with transaction.atomic():
+                rebuild(author_id)
+        except IntegrityError:
+            pass
+
+
+def bump(author_id, create=True, **deltas):
+    """
+    Apply deltas to the site-wide row and, if given, the author's row.
+
+    With create=False a missing row is left missing (get_stats() computes it
+    until a later change builds it). Deletions pass it: when a user is deleted, the cascade may already
+    have removed their row, and rebuilding it would insert a row pointing at
+    the user being deleted.
+    """
+    _bump(None, **deltas)
+    if author_id is not None:
+        _bump(author_id, create=create, **deltas)
+
+
+def _post_author(post_id):
+    return Post.objects.filter(pk=post_id).values_list("author_id", flat=True).first()
+
+
+# -------------------------
+# Change handlers (called from signals)
+# -------------------------
+def post_saved(post, created, old_status=None, old_author_id=None):
+    new_field = STATUS_FIELDS.get(post.status)
+    if created:
+        if new_field:
+            bump(post.author_id, **{new_field: 1})
+        return
+    if old_status is None:
+        return
+    old_field = STATUS_FIELDS.get(old_status)
+    if old_author_id == post.author_id:
+        if old_field != new_field:
+            deltas = {}
+            if old_field:
+                deltas[old_field] = -1
+            if new_field:
+                deltas[new_field] = deltas.get(new_field, 0) + 1
+            bump(post.author_id, **deltas)
+    else:
+        # rare: post moved to another author; rebuild both author rows
+        rebuild(old_author_id)
+        rebuild(post.author_id)
+        if old_field != new_field:
+            deltas = {}
+            if old_field:
+                deltas[old_field] = -1
+            if new_field:
+                deltas[new_field] = 1
+            _bump(None, **deltas)
+
+
+def post_deleted(post):
+    field = STATUS_FIELDS.get(post.status)
+    if field:
+        bump(post.author_id, create=False, **{field: -1})
+
+
+def comment_changed(comment, delta):
+    bump(_post_author(comment.post_id), create=delta > 0, comments=delta)
+
+
+def like_changed(like, delta):
+    bump(_post_author(like.post_id), create=delta > 0, likes=delta)
+
+
+def subscriber_changed(delta):
+    _bump(None, subscribers=delta)
+
+
+def category_changed(delta):
+    _bump(None, categories=delta)
@@ -0,0 +1,132 @@
+# sabuzz/storage.py
+"""
+Content-addressed storage for uploaded images.
+
+An upload is stored as <upload_to>/<sha256 of the bytes><ext>, so the same
+picture uploaded twice (or saved again by an edit) is one file on disk and
+its URL never changes meaning, which lets it be cached as immutable.
+
+Files are shared, so they are only deleted once nothing points at them any
+more: references() counts the Post/Profile rows using a name, and release()
+(called from the signals in sabuzz/signals.py when an image is replaced or
+its row deleted) removes the file and its derivatives when that reaches 0.
+
+save() and release() hold one lock (a thread lock plus an flock on a file in
+MEDIA_ROOT, for other processes), so the count and the delete can't interleave
+with an upload of the same bytes. An upload's row is only committed after
+save() returns, so release() also keeps files saved or re-used in the last
+RELEASE_GRACE seconds; `manage.py dedupe_media` sweeps any it leaves behind.
+"""
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: the thread lock alone (single process)
+    fcntl = None
+
+from django.apps import apps
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+# (model label, field name) of every field stored here
+IMAGE_FIELDS = (
+    ("sabuzz.Post", "image"),
+    ("sabuzz.Profile", "profile_image"),
+)
+
+RELEASE_GRACE = 300
+LOCK_FILE = ".storage.lock"
+
+_thread_lock = threading.Lock()
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    if hasattr(content, "seek"):
+        content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    if hasattr(content, "seek"):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files after a hash of their contents."""
+
+    def content_name(self, name, content):
+        directory = os.path.dirname(name)
+        ext = os.path.splitext(name)[1].lower()
+        return os.path.join(directory, content_hash(content) + ext).replace("\\", "/")
+
+    @contextmanager
+    def locked(self):
+        """Serialise save() and release() across threads and processes."""
+        with _thread_lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(self.location, exist_ok=True)
+            with open(os.path.join(self.location, LOCK_FILE), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def recently_saved(self, name):
+        try:
+            return time.time() - os.path.getmtime(self.path(name)) < RELEASE_GRACE
+        except FileNotFoundError:
+            return False
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = self.content_name(name, content)
+        with self.locked():
+            if self.exists(name):
+                # same bytes already stored: share the file, and mark it as
+                # claimed so a concurrent release() doesn't delete it
+                os.utime(self.path(name))
+                return name
+            return super().save(name, content, max_length=max_length)
+
+
+image_storage = ContentAddressedStorage()
+
+
+def get_image_storage():
+    # callable so migrations don't serialise the storage instance
+    return image_storage
+
+
+def references(name):
+    """How many rows point at a stored file."""
+    total = 0
+    for label, field in IMAGE_FIELDS:
+        total += apps.get_model(label).objects.filter(**{field: name}).count()
+    return total
+
+
+def release(name):
+    """Delete a file (and its resized copies) once no row references it. Returns True if deleted."""
+    from . import images
+
+    if not name:
+        return False
+    with image_storage.locked():
+        if references(name) or image_storage.recently_saved(name):
+            return False
+        if image_storage.exists(name):
+            image_storage.delete(name)
+    images.delete_derivatives(name)
+    return True
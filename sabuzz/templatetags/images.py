@@ -0,0 +1,31 @@
+# sabuzz/templatetags/images.py
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from sabuzz import images
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(field, spec, sizes="100vw", **attrs):
+    """
+    <img> for an ImageField using the spec's WebP derivatives as a srcset
+    (see sabuzz/images.py). Falls back to the original file, and queues a
+    build, while the derivatives don't exist yet.
+
+    {% responsive_image post.image "card" sizes="(min-width: 1024px) 33vw, 100vw" class="..." %}
+    """
+    if not field:
+        return ""
+    candidates = images.srcset(field.name, spec)
+    attrs.setdefault("loading", "lazy")
+    attrs.setdefault("decoding", "async")
+    extra = format_html_join("", ' {}="{}"', sorted(attrs.items()))
+    if not candidates:
+        return format_html('<img src="{}"{}>', field.url, extra)
+    src = candidates[len(candidates) // 2][0]
+    return format_html(
+        '<img src="{}" srcset="{}" sizes="{}"{}>',
+        src, ", ".join(f"{url} {width}w" for url, width in candidates), sizes, extra,
+    )
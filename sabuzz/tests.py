@@ -1,3 +1,1286 @@
-from django.test import TestCase
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.db.models import Q
+from django.http import Http404, HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+
+from . import cache as ttl_cache
+from . import (
+    benchmark, counters, db_router, http_client, images, metrics, news, page_cache, roles, search,
+    stats, storage, weather,
+)
+from .media import serve_media
+from .models import (
+    Activity, Comment, DashboardStats, ExternalArticle, Favorite, JournalistRequest, Like, Notification,
+    Post, Profile, SavedArticle, Subscriber,
+)
+from .pagination import decode_cursor, encode_cursor, keyset_paginate
+from .query_budget import QueryBudgetExceeded, query_budget
+from .seeding import scale_counts, seed
+from .services import posts_queryset, posts_validators, published_posts_page
+from .sqlite_backend.base import is_write, write_lock
+from .views import COMMENTS_PER_PAGE, post_detail
+
+
+@override_settings(ALLOWED_HOSTS=["*"], QUERY_BUDGET_STRICT=True)
+class PostDetailQueryBudgetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user("author", password="x")
+        cls.reader = User.objects.create_user("reader", password="x")
+        cls.post = Post.objects.create(title="Viral", content="Body", author=cls.author, status="published")
+
+    def setUp(self):
+        cache.clear()  # page cache, roles and fragments
+
+    def add_comments(self, count, approved=True):
+        users = [User.objects.create_user(f"commenter{Comment.objects.count() + i}") for i in range(count)]
+        Comment.objects.bulk_create(
+            Comment(post=self.post, user=user, text="Nice", approved=approved) for user in users
+        )
+
+    def count_for(self, user):
+        if user:
+            self.client.force_login(user)
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f"/post/{self.post.pk}/")
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_query_count_does_not_grow_with_comments(self):
+        for user in (None, self.reader):
+            self.client.logout()
+            self.add_comments(3)
+            few = self.count_for(user)
+            self.add_comments(COMMENTS_PER_PAGE + 20)
+            many = self.count_for(user)
+            self.assertEqual(few, many, f"queries grew with comments (user={user})")
+
+    def test_only_approved_and_own_comments_are_listed(self):
+        Comment.objects.create(post=self.post, user=self.author, text="approved", approved=True)
+        Comment.objects.create(post=self.post, user=self.author, text="someone's pending", approved=False)
+        Comment.objects.create(post=self.post, user=self.reader, text="my pending", approved=False)
+
+        self.client.force_login(self.reader)
+        texts = [c.text for c in self.client.get(f"/post/{self.post.pk}/").context["comments"]]
+        self.assertCountEqual(texts, ["approved", "my pending"])
+
+    def test_comments_are_paginated(self):
+        self.add_comments(COMMENTS_PER_PAGE + 5)
+        self.client.force_login(self.reader)
+        response = self.client.get(f"/post/{self.post.pk}/")
+        self.assertEqual(len(response.context["comments"]), COMMENTS_PER_PAGE)
+        next_url = response.context["comments_page"].next_url
+        self.assertTrue(next_url)
+
+        rest = self.client.get(f"/post/{self.post.pk}/{next_url}")
+        self.assertEqual(len(rest.context["comments"]), 5)
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class QueryBudgetTests(TestCase):
+
+    def test_over_budget_view_fails_in_strict_mode(self):
+        @query_budget(1)
+        def chatty(request):
+            list(User.objects.all())
+            list(User.objects.all())
+            return HttpResponse("ok")
+
+        with self.assertRaises(QueryBudgetExceeded):
+            chatty(RequestFactory().get("/"))
+
+    def test_budget_is_exposed_on_the_view(self):
+        self.assertEqual(post_detail.query_budget, 12)
+
+
+class QueryBudgetReplicaTests(TestCase):
+    """A second alias, added after class setup, standing in for a configured read replica."""
+
+    replica = "budget_replica"
+
+    def setUp(self):
+        config = {
+            "default": connections.settings["default"],
+            self.replica: {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"},
+        }
+        connections.settings[self.replica] = connections.configure_settings(config)[self.replica]
+        # the runner only sets up aliases that exist at startup, so allow this one here
+        patcher = mock.patch.object(type(self), "databases", {"default", self.replica})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(connections.settings.pop, self.replica)
+        self.addCleanup(connections.__delitem__, self.replica)
+        self.addCleanup(lambda: connections[self.replica].close())
+
+    def test_replica_queries_count_against_the_budget(self):
+        @query_budget(5)
+        def view(request):
+            list(User.objects.all())
+            with connections[self.replica].cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.execute("SELECT 2")
+            return HttpResponse("ok")
+
+        self.assertEqual(view(RequestFactory().get("/")).query_count, 3)
+
+
+@override_settings(ALLOWED_HOSTS=["*"])
+class SeedingAndBenchmarkTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_seeded_rows_are_consistent(self):
+        counts = scale_counts("200")
+        written = seed(counts, seed=1)
+        self.assertEqual(written["posts"], 200)
+        self.assertEqual(Profile.objects.count(), User.objects.count())
+        for post in Post.objects.all():
+            self.assertEqual(post.comment_count, post.comments.count())
+            self.assertEqual(post.approved_comment_count, post.comments.filter(approved=True).count())
+            self.assertEqual(post.like_count, post.likes.count())
+        self.assertFalse(Comment.objects.filter(post__status="draft").exists())
+        self.assertEqual(Subscriber.objects.count(), counts["subscribers"])
+
+    def test_seed_is_deterministic(self):
+        seed(scale_counts("50"), seed=7)
+        first = list(Post.objects.order_by("pk").values_list("title", "status", "like_count"))
+        Post.objects.all().delete()
+        User.objects.all().delete()
+        seed(scale_counts("50"), seed=7)
+        self.assertEqual(first, list(Post.objects.order_by("pk").values_list("title", "status", "like_count")))
+
+    def test_seed_command_overrides_single_tables(self):
+        call_command("seed", "--scale", "100", "--comments", "7", "--seed", "3", stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 100)
+        self.assertEqual(Comment.objects.count(), 7)
+
+    def test_benchmark_reports_every_scenario(self):
+        seed(scale_counts("100"), seed=2)
+        results = benchmark.run(rounds=3, warmup=1, memory_samples=1)
+        self.assertEqual(set(results), {name for name, _, _ in benchmark.SCENARIOS})
+        for name, result in results.items():
+            self.assertEqual(result["status"], [200], name)
+            self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+
+    def test_existing_databases_are_not_written_to(self):
+        seed(scale_counts("20"), seed=2)
+        User.objects.filter(is_superuser=True).delete()
+        ExternalArticle.objects.all().delete()
+        context = benchmark.prepare(existing=True)
+        self.assertIsNone(context["users"]["admin"])
+        self.assertFalse(User.objects.filter(is_superuser=True).exists())
+        self.assertFalse(ExternalArticle.objects.exists())
+
+    def test_fake_upstreams_never_reach_the_network(self):
+        with benchmark.fake_upstreams() as session:
+            response = http_client.get("https://newsdata.io/api/1/news", params={"country": "za"})
+        self.assertEqual(session.calls, 1)
+        self.assertEqual(len(response.json()["results"]), benchmark.FAKE_ARTICLES)
+
+
+@skipUnless(connection.vendor == "sqlite", "plans are checked against SQLite's EXPLAIN QUERY PLAN")
+class QueryPlanTests(TestCase):
+    """
+    The hot queries of views.py / the API must be answered from an index:
+    no full table scan and no temporary B-tree to sort the rows.
+    """
+    FULL_SCAN = re.compile(r"\bSCAN (\S+)$", re.MULTILINE)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("planner")
+        cls.post = Post.objects.create(title="t", content="c", author=cls.user, status="published")
+        cls.cursor = (timezone.now() - timedelta(days=1), 10**6)  # a keyset ?after= position
+
+    def assertPlanUses(self, plan, index):
+        self.assertIn(index, plan, f"expected {index}:\n{plan}")
+        self.assertIsNone(self.FULL_SCAN.search(plan), f"full table scan:\n{plan}")
+        self.assertNotIn("TEMP B-TREE", plan, f"sorts in a temporary B-tree:\n{plan}")
+
+    def seek(self, qs, field):
+        """The queryset shape of sabuzz/pagination.py for a page after self.cursor."""
+        value, pk = self.cursor
+        return (
+            qs.order_by(f"-{field}", "-pk")
+            .filter(**{f"{field}__lte": value})
+            .filter(Q(**{f"{field}__lt": value}) | Q(pk__lt=pk))[:26]
+        )
+
+    def test_post_listings(self):
+        published = Post.objects.filter(status="published").order_by("-created_at", "-id")[:10]
+        self.assertPlanUses(published.explain(), "post_status_created_idx")  # home feed
+        self.assertPlanUses(posts_queryset("published")[:20].explain(), "post_status_created_idx")  # API
+        self.assertPlanUses(
+            self.seek(Post.objects.filter(status="pending"), "created_at").explain(), "post_status_created_idx"
+        )
+        self.assertPlanUses(self.seek(Post.objects.all(), "created_at").explain(), "post_created_idx")
+        self.assertPlanUses(
+            self.seek(Post.objects.filter(author=self.user), "created_at").explain(), "post_author_created_idx"
+        )
+        for status in ("draft", "pending", "published"):  # journalist dashboard
+            own = Post.objects.filter(author=self.user, status=status).order_by("-created_at", "-id")[:10]
+            self.assertPlanUses(own.explain(), "post_author_status_idx")
+
+    def test_api_validators_read_only_the_index(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            posts_validators(posts_queryset("published"), "/api/posts/", self.user)
+        (query,) = ctx.captured_queries
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + query["sql"])
+            plan = "\n".join(row[-1] for row in cursor.fetchall())
+        self.assertPlanUses(plan, "COVERING INDEX post_status_updated_idx")
+
+    def test_comment_listings(self):
+        visible = Comment.objects.filter(post=self.post).filter(Q(approved=True) | Q(user=self.user))
+        first_page = visible.order_by("-date_posted", "-pk")[:51]
+        self.assertPlanUses(first_page.explain(), "comment_post_posted_idx")  # post_detail
+        self.assertPlanUses(self.seek(visible, "date_posted").explain(), "comment_post_posted_idx")
+        self.assertPlanUses(self.seek(Comment.objects.all(), "date_posted").explain(), "comment_posted_idx")
+
+    def test_per_user_lists(self):
+        cases = [
+            (Favorite.objects.filter(user=self.user).order_by("-saved_at"), "favorite_user_saved_idx"),
+            (SavedArticle.objects.filter(user=self.user).order_by("-saved_at"), "savedarticle_user_saved_idx"),
+            (Notification.objects.filter(user=self.user), "notification_user_idx"),
+            (Notification.objects.filter(user=self.user, read=False), "notification_unread_idx"),
+            (Activity.objects.filter(user=self.user).order_by("-timestamp")[:10], "activity_user_time_idx"),
+            (Activity.objects.order_by("-timestamp")[:10], "activity_timestamp_idx"),
+        ]
+        for qs, index in cases:
+            with self.subTest(index=index):
+                self.assertPlanUses(qs.explain(), index)
+
+    def test_admin_queues(self):
+        requests = JournalistRequest.objects.filter(status="pending")
+        self.assertPlanUses(self.seek(requests, "created_at").explain(), "jreq_status_created_idx")
+        self.assertPlanUses(self.seek(Subscriber.objects.all(), "subscribed_at").explain(), "subscriber_subscribed_idx")
+
+
+@skipUnless(connection.settings_dict["ENGINE"] == "sabuzz.sqlite_backend", "SQLITE_PROFILE=production only")
+class SerializedWriteTests(TransactionTestCase):
+
+    def other_thread_can_write(self):
+        lock = write_lock(connection.settings_dict["NAME"])
+        if lock.acquire(timeout=0.01):
+            lock.release()
+            return True
+        return False
+
+    def test_transactions_hold_the_write_lock_until_they_end(self):
+        with transaction.atomic():
+            User.objects.create_user("w1")
+            self.assertTrue(connection.holds_write_lock)
+            self.assertFalse(self.other_thread_can_write())
+        self.assertFalse(connection.holds_write_lock)
+        self.assertTrue(self.other_thread_can_write())
+
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                User.objects.create_user("w2")
+                raise ValueError
+        self.assertFalse(connection.holds_write_lock)
+        self.assertTrue(self.other_thread_can_write())
+
+    def test_autocommit_writes_take_the_lock_per_statement(self):
+        User.objects.create_user("w3")
+        self.assertFalse(connection.holds_write_lock)
+        self.assertTrue(is_write("  insert into t values (1)"))
+        self.assertFalse(is_write("SELECT * FROM t"))
+
+
+@override_settings(DATABASE_REPLICAS=["replica1"], REPLICA_PIN_SECONDS=5)
+class ReplicaRouterTests(SimpleTestCase):
+
+    def route(self, method="get", cookies=None, write=False):
+        """Run a request through ReplicaMiddleware; returns (db used for a Post read, response)."""
+        seen = {}
+        router = db_router.ReplicaRouter()
+
+        def view(request):
+            if write:
+                router.db_for_write(Post)
+            seen["post"] = router.db_for_read(Post)
+            seen["user"] = router.db_for_read(User)
+            return HttpResponse("ok")
+
+        request = getattr(RequestFactory(), method)("/")
+        request.COOKIES.update(cookies or {})
+        response = db_router.ReplicaMiddleware(view)(request)
+        return seen, response
+
+    def test_safe_requests_read_from_a_replica(self):
+        seen, response = self.route()
+        self.assertEqual(seen["post"], "replica1")
+        self.assertEqual(seen["user"], "default")  # sessions/auth stay on the primary
+        self.assertNotIn(db_router.PIN_COOKIE, response.cookies)
+
+    def test_writes_pin_the_client_to_the_primary(self):
+        seen, response = self.route(method="post")
+        self.assertEqual(seen["post"], "default")
+        pin = response.cookies[db_router.PIN_COOKIE].value
+
+        seen, _ = self.route(cookies={db_router.PIN_COOKIE: pin})
+        self.assertEqual(seen["post"], "default")
+        seen, _ = self.route(cookies={db_router.PIN_COOKIE: "0"})  # pin expired
+        self.assertEqual(seen["post"], "replica1")
+
+    def test_a_get_that_writes_reads_its_own_write_and_pins(self):
+        seen, response = self.route(write=True)
+        self.assertEqual(seen["post"], "default")
+        self.assertIn(db_router.PIN_COOKIE, response.cookies)
+
+    def test_shared_caches_are_filled_from_the_primary(self):
+        router = db_router.ReplicaRouter()
+        seen = {}
+
+        @page_cache.anonymous_page()
+        def view(request):
+            seen["page_miss"] = router.db_for_read(Post)
+            seen["fragment_ttl"] = db_router.cache_ttl(300)
+            return HttpResponse("ok")
+
+        def outer(request):
+            seen["before"] = router.db_for_read(Post)
+            seen["before_ttl"] = db_router.cache_ttl(300)
+            return view(request)
+
+        cache.clear()
+        db_router.ReplicaMiddleware(outer)(RequestFactory().get("/"))
+        self.assertEqual(seen["before"], "replica1")
+        self.assertEqual(seen["before_ttl"], 0)  # logged-in fragments aren't stored from a replica
+        self.assertEqual(seen["page_miss"], "default")
+        self.assertEqual(seen["fragment_ttl"], 300)
+
+    def test_outside_requests_use_the_primary(self):
+        self.assertEqual(db_router.ReplicaRouter().db_for_read(Post), "default")
+        self.assertFalse(db_router.ReplicaRouter().allow_migrate("replica1", "sabuzz"))
+
+    def test_copy_database_makes_a_readable_snapshot(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = sqlite3.connect(os.path.join(tmp, "primary.sqlite3"))
+            source.execute("CREATE TABLE t (x)")
+            source.execute("INSERT INTO t VALUES (1)")
+            source.commit()
+            db_router.copy_database(source, os.path.join(tmp, "replica.sqlite3"))
+            source.close()
+            replica = sqlite3.connect(os.path.join(tmp, "replica.sqlite3"))
+            self.assertEqual(replica.execute("SELECT x FROM t").fetchall(), [(1,)])
+            replica.close()
+
+
+class DashboardStatsTests(TransactionTestCase):
+    """Committed for real, so SQLite checks the foreign keys at the end."""
+
+    def setUp(self):
+        self.author = User.objects.create_user("author")
+        self.reader = User.objects.create_user("reader")
+        self.post = Post.objects.create(title="t", content="c", author=self.author, status="published")
+        Comment.objects.create(post=self.post, user=self.reader, text="hi")
+        Like.objects.create(post=self.post, user=self.reader)
+
+    def test_deleting_an_author_with_comments_and_likes_commits(self):
+        author_id = self.author.pk
+        self.assertEqual(stats.get_stats(author_id).comments, 1)
+        with transaction.atomic():
+            self.author.delete()
+        self.assertFalse(DashboardStats.objects.filter(key=stats.author_key(author_id)).exists())
+        site = stats.get_stats()
+        self.assertEqual((site.posts_published, site.comments, site.likes), (0, 0, 0))
+
+    def test_deleting_before_the_row_exists_does_not_create_it(self):
+        DashboardStats.objects.all().delete()
+        self.reader.delete()  # their comment and like go with them
+        self.assertFalse(DashboardStats.objects.filter(key=stats.author_key(self.author.pk)).exists())
+        row = stats.get_stats(self.author.pk)
+        self.assertEqual((row.posts_published, row.comments, row.likes), (1, 0, 0))
+
+    def test_reading_a_missing_row_does_not_write_it(self):
+        DashboardStats.objects.all().delete()
+        with CaptureQueriesContext(connection) as ctx:
+            row = stats.get_stats(self.author.pk)
+        self.assertEqual((row.posts_published, row.comments, row.likes), (1, 1, 1))
+        self.assertFalse([q for q in ctx.captured_queries if is_write(q["sql"])])
+        self.assertFalse(DashboardStats.objects.exists())
+
+        Like.objects.create(post=self.post, user=self.author)  # the next change builds it
+        self.assertEqual(DashboardStats.objects.get(key=stats.author_key(self.author.pk)).likes, 2)
+
+    def test_signals_keep_the_rows_in_step(self):
+        Comment.objects.create(post=self.post, user=self.author, text="again")
+        self.post.status = "draft"
+        self.post.save()
+        row = stats.get_stats(self.author.pk)
+        self.assertEqual((row.posts_published, row.posts_draft, row.comments, row.likes), (0, 1, 2, 1))
+        real = stats._compute(self.author.pk)
+        self.assertEqual(real, {field: getattr(row, field) for field in real})
+
+
+class PostCounterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user("author")
+        cls.reader = User.objects.create_user("reader")
+
+    def test_signals_count_likes_and_comments(self):
+        post = Post.objects.create(title="t", content="c", author=self.author, status="published")
+        Like.objects.create(post=post, user=self.reader)
+        comment = Comment.objects.create(post=post, user=self.reader, text="hi")
+        Comment.objects.create(post=post, user=self.author, text="approved", approved=True)
+        comment.approved = True
+        comment.save()
+        post.refresh_from_db()
+        self.assertEqual((post.like_count, post.comment_count, post.approved_comment_count), (1, 2, 2))
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual((post.comment_count, post.approved_comment_count), (1, 1))
+
+    def test_saving_a_stale_instance_keeps_concurrent_increments(self):
+        post = Post.objects.create(title="t", content="c", author=self.author, status="pending")
+        stale = Post.objects.get(pk=post.pk)
+        Like.objects.create(post=post, user=self.reader)
+        Comment.objects.create(post=post, user=self.reader, text="hi")
+
+        stale.status = "published"  # approve_post / edit_post / the admin: a full save
+        stale.save()
+        post.refresh_from_db()
+        self.assertEqual(post.status, "published")
+        self.assertEqual((post.like_count, post.comment_count), (1, 1))
+
+    def test_reconcile_repairs_drift(self):
+        post = Post.objects.create(title="t", content="c", author=self.author, status="published")
+        Like.objects.create(post=post, user=self.reader)
+        Post.objects.filter(pk=post.pk).update(like_count=7)
+        self.assertEqual(counters.reconcile(), 1)
+        post.refresh_from_db()
+        self.assertEqual(post.like_count, 1)
+
+
+@override_settings(NEWSDATA_CATEGORIES=["sports"], NEWSDATA_CACHE_STALE=0)
+class NewsFallbackTests(TestCase):
+
+    def setUp(self):
+        news.response_cache.clear()
+        self.addCleanup(news.response_cache.clear)
+
+    def wait_for_refresh(self):
+        for thread in threading.enumerate():
+            if thread is not threading.current_thread() and thread.daemon:
+                thread.join(timeout=2)
+
+    def test_views_never_wait_on_the_upstream(self):
+        with benchmark.fake_upstreams(latency=0.2) as session:
+            start = time.monotonic()
+            self.assertEqual(news.category_articles("sports"), [])  # miss: fetched in the background
+            self.assertLess(time.monotonic() - start, 0.1)
+            self.wait_for_refresh()
+            self.assertEqual(len(news.category_articles("sports")), benchmark.FAKE_ARTICLES)
+        self.assertEqual(session.calls, 1)
+
+    def test_unknown_categories_and_searches_stay_local(self):
+        with benchmark.fake_upstreams() as session:
+            self.assertEqual(news.category_articles("anything-a-visitor-types"), [])
+            self.assertEqual(news.search_articles("rare term"), [])
+            self.wait_for_refresh()
+        self.assertEqual(session.calls, 0)
+
+    def test_cache_counters_are_exported(self):
+        before = news.response_cache.stats()
+        with benchmark.fake_upstreams():
+            news.live_articles("sports")
+            self.wait_for_refresh()
+            news.live_articles("sports")
+        after = news.response_cache.stats()
+        self.assertEqual((after["hits"] - before["hits"], after["misses"] - before["misses"]), (1, 1))
+        text = metrics.render_prometheus()
+        self.assertIn(f'sabuzz_cache_lookups_total{{cache="newsdata",result="hit"}} {after["hits"]}', text)
+        self.assertIn(f'sabuzz_cache_lookups_total{{cache="newsdata",result="miss"}} {after["misses"]}', text)
+
+
+class ImageDerivativeTests(SimpleTestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        cache.clear()
+
+    def upload(self, size):
+        buffer = BytesIO()
+        Image.new("RGB", size, "orange").save(buffer, "PNG")
+        return default_storage.save("posts/photo.png", ContentFile(buffer.getvalue()))
+
+    def test_only_the_requested_spec_is_built(self):
+        name = self.upload((1200, 900))
+        self.assertEqual(images.generate(name, "card"), [320, 640, 960])
+        self.assertEqual(images.built_widths(name, "avatar"), [])
+        with Image.open(default_storage.open(images.derivative_name(name, "card", 640))) as built:
+            self.assertEqual((built.format, built.size), ("WEBP", (640, 384)))
+
+    def test_srcset_lists_real_widths_of_a_small_original(self):
+        name = self.upload((500, 400))
+        self.assertEqual(images.generate(name, "card"), [320, 500])  # 640 and 960 would upscale
+        self.assertEqual([w for _, w in images.srcset(name, "card")], [320, 500])
+        cache.clear()  # found again from the files alone
+        self.assertEqual(images.ready(name, "card"), [320, 500])
+
+        images.delete_derivatives(name)
+        self.assertEqual(images.built_widths(name, "card"), [])
+
+    def test_removed_derivatives_are_rebuilt(self):
+        name = self.upload((500, 400))
+        images.generate(name, "card")
+        default_storage.delete(images.derivative_name(name, "card", 500))  # pruned behind the cache's back
+        with mock.patch.object(images, "schedule") as schedule:
+            self.assertEqual(images.ready(name, "card"), [320])
+        schedule.assert_called_once_with(name, "card")
+        images.generate(name, "card")
+        self.assertEqual(images.ready(name, "card"), [320, 500])
+
+    def test_failed_builds_are_not_retried_on_every_render(self):
+        with mock.patch.object(images, "_pool") as pool, self.assertLogs("sabuzz.images", "ERROR"):
+            pool.submit.side_effect = lambda fn, *args: fn(*args)
+            self.assertEqual(images.ready("posts/missing.png", "card"), [])
+            self.assertEqual(images.ready("posts/missing.png", "card"), [])
+        self.assertEqual(pool.submit.call_count, 1)
+
+
+@override_settings(ALLOWED_HOSTS=["*"])
+class ContentAddressedStorageTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        cache.clear()
+
+    def png(self, color="orange"):
+        buffer = BytesIO()
+        Image.new("RGB", (20, 20), color).save(buffer, "PNG")
+        return buffer.getvalue()
+
+    def age(self, name):
+        old = time.time() - storage.RELEASE_GRACE - 1
+        os.utime(storage.image_storage.path(name), (old, old))
+
+    def test_identical_uploads_share_one_file(self):
+        first = storage.image_storage.save("posts/a.png", ContentFile(self.png()))
+        second = storage.image_storage.save("posts/b.png", ContentFile(self.png()))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, storage.image_storage.save("posts/c.png", ContentFile(self.png("blue"))))
+
+    def test_release_keeps_referenced_and_just_claimed_files(self):
+        name = storage.image_storage.save("posts/a.png", ContentFile(self.png()))
+        author = User.objects.create_user("author")
+        post = Post.objects.create(title="t", content="c", author=author, image=name)
+        self.age(name)
+        self.assertFalse(storage.release(name))  # still referenced
+
+        Post.objects.filter(pk=post.pk).update(image="")
+        storage.image_storage.save("posts/again.png", ContentFile(self.png()))  # an upload not committed yet
+        self.assertFalse(storage.release(name))
+        self.assertTrue(storage.image_storage.exists(name))
+
+        self.age(name)
+        self.assertTrue(storage.release(name))
+        self.assertFalse(storage.image_storage.exists(name))
+
+    def test_dedupe_media_purges_cached_pages(self):
+        for name in ("posts/old.png", "profiles/me.png"):
+            os.makedirs(os.path.dirname(storage.image_storage.path(name)), exist_ok=True)
+            with open(storage.image_storage.path(name), "wb") as f:
+                f.write(self.png())
+        author, other = User.objects.create_user("author"), User.objects.create_user("other")
+        with_image = Post.objects.create(title="t", content="c", author=other, image="posts/old.png")
+        by_author = Post.objects.create(title="t", content="c", author=author)
+        untouched = Post.objects.create(title="t", content="c", author=other)
+        Profile.objects.update_or_create(user=author, defaults={"profile_image": "profiles/me.png"})
+
+        def versions():
+            return [page_cache.fragment_version(page_cache.post_tag(p.pk)) for p in (with_image, by_author, untouched)]
+
+        before = versions()
+        call_command("dedupe_media", stdout=StringIO())
+        after = versions()
+        self.assertNotEqual(after[0], before[0])
+        self.assertNotEqual(after[1], before[1])
+        self.assertEqual(after[2], before[2])
+        with_image.refresh_from_db()
+        self.assertNotEqual(with_image.image.name, "posts/old.png")
+
+    def test_add_post_writes_the_post_once(self):
+        admin = User.objects.create_superuser("admin", "admin@example.com", "x")
+        self.client.force_login(admin)
+        upload = SimpleUploadedFile("photo.png", self.png(), content_type="image/png")
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post("/add-post/", {
+                "title": "With image", "content": "Body", "action": "submit", "image": upload,
+            })
+        self.assertEqual(response.status_code, 302)
+        writes = [q["sql"] for q in ctx.captured_queries if re.match(r'(INSERT INTO|UPDATE) "sabuzz_post"', q["sql"])]
+        self.assertEqual(len(writes), 1, writes)
+        post = Post.objects.get(title="With image")
+        self.assertTrue(storage.image_storage.exists(post.image.name))
+
+
+@override_settings(ALLOWED_HOSTS=["*"], METRICS_TOKEN="s3cret")
+class MetricsTests(TestCase):
+
+    def setUp(self):
+        metrics.registry.clear()
+        cache.clear()
+
+    def test_requests_are_recorded_per_view(self):
+        self.client.get("/about/")
+        self.client.get("/about/")
+        text = self.client.get("/metrics/", HTTP_AUTHORIZATION="Bearer s3cret").content.decode()
+        self.assertIn('sabuzz_requests_total{view="about",method="GET",status="200"} 2', text)
+        self.assertIn('sabuzz_request_duration_seconds_count{view="about"} 2', text)
+
+    def test_sql_is_attributed_to_the_view(self):
+        author = User.objects.create_user("author")
+        post = Post.objects.create(title="t", content="c", author=author, status="published")
+        self.client.get(f"/post/{post.pk}/")
+        queries, _seconds = metrics.registry.sql["post_detail"]
+        self.assertGreater(queries, 0)
+
+    def test_endpoint_needs_staff_or_the_token(self):
+        self.assertEqual(self.client.get("/metrics/").status_code, 403)
+        self.assertEqual(self.client.get("/metrics/", HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+        self.assertEqual(self.client.get("/metrics/", HTTP_AUTHORIZATION="Bearer s3crét").status_code, 403)
+        self.assertEqual(self.client.get("/metrics/", HTTP_AUTHORIZATION="Bearer s3cret").status_code, 200)
+
+        self.client.force_login(User.objects.create_user("reader"))
+        self.assertEqual(self.client.get("/metrics/").status_code, 403)
+        self.client.force_login(User.objects.create_user("staff", is_staff=True))
+        self.assertEqual(self.client.get("/metrics/").status_code, 200)
+
+
+class _FlakyHandler(BaseHTTPRequestHandler):
+    statuses = []
+
+    def do_GET(self):
+        status = self.statuses.pop(0) if self.statuses else 200
+        self.send_response(status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(EXTERNAL_API_CLIENT={"backoff_factor": 0, "backoff_jitter": 0, "failure_threshold": 2})
+class HttpClientTests(SimpleTestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _FlakyHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/"
+        for registry in (http_client._sessions, http_client._breakers):
+            registry.pop("127.0.0.1", None)
+            self.addCleanup(registry.pop, "127.0.0.1", None)
+
+    def test_gets_are_retried_on_gateway_errors(self):
+        _FlakyHandler.statuses = [503, 502]
+        response = http_client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(_FlakyHandler.statuses, [])
+        self.assertEqual(http_client.get_breaker("127.0.0.1").state, "closed")
+
+    def test_the_circuit_opens_after_repeated_failures_and_fails_fast(self):
+        _FlakyHandler.statuses = [500, 500]
+        http_client.get(self.url)
+        http_client.get(self.url)
+        self.assertEqual(http_client.get_breaker("127.0.0.1").state, "open")
+        _FlakyHandler.statuses = [200]
+        with self.assertRaises(http_client.CircuitOpenError):
+            http_client.get(self.url)
+        self.assertEqual(_FlakyHandler.statuses, [200])  # the server was not called
+
+
+class CircuitBreakerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch.object(http_client.time, "monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = http_client.CircuitBreaker(failure_threshold=3, reset_timeout=30)
+
+    def test_half_open_lets_one_trial_through(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.assertFalse(self.breaker.allow())
+        self.now += 30
+        self.assertEqual(self.breaker.state, "half-open")
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())  # one trial at a time
+
+        self.breaker.record_failure()  # the trial failed: open again for a full timeout
+        self.assertEqual(self.breaker.state, "open")
+        self.now += 30
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, "closed")
+
+    def test_a_success_resets_the_failure_count(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, "closed")
+
+
+class TTLCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch.object(ttl_cache.time, "monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.calls = 0
+
+    def fetch(self):
+        self.calls += 1
+        return f"value {self.calls}"
+
+    def wait_for_refresh(self, cache_):
+        for _ in range(200):
+            if not cache_._refreshing:
+                return
+            time.sleep(0.01)
+
+    def test_fresh_stale_and_expired_entries(self):
+        cache_ = ttl_cache.TTLCache(stale_ttl=60)
+        self.assertEqual(cache_.get_or_fetch("k", self.fetch, ttl=10), "value 1")  # miss
+        self.assertEqual(cache_.get_or_fetch("k", self.fetch, ttl=10), "value 1")  # fresh hit
+
+        self.now += 30  # stale: served at once, refreshed in the background
+        self.assertEqual(cache_.get_or_fetch("k", self.fetch, ttl=10), "value 1")
+        self.wait_for_refresh(cache_)
+        self.assertEqual(cache_.get_or_fetch("k", self.fetch, ttl=10), "value 2")
+
+        self.now += 100  # past the stale window: fetched in the caller's thread
+        self.assertEqual(cache_.get_or_fetch("k", self.fetch, ttl=10), "value 3")
+        stats = cache_.stats()
+        self.assertEqual((stats["hits"], stats["stale_hits"], stats["misses"]), (2, 1, 2))
+
+    def test_a_failed_refresh_keeps_serving_the_stale_value(self):
+        cache_ = ttl_cache.TTLCache(stale_ttl=60)
+        cache_.get_or_fetch("k", self.fetch, ttl=10)
+        self.now += 30
+
+        def broken():
+            raise ConnectionError("upstream down")
+
+        self.assertEqual(cache_.get_or_fetch("k", broken, ttl=10), "value 1")
+        self.wait_for_refresh(cache_)
+        self.assertEqual(cache_.get_or_fetch("k", broken, ttl=10), "value 1")
+        self.wait_for_refresh(cache_)
+        self.assertEqual(cache_.stats()["errors"], 2)
+
+    def test_lru_eviction(self):
+        cache_ = ttl_cache.TTLCache(maxsize=2)
+        for key in ("a", "b", "a", "c"):  # "b" is the least recently used when "c" arrives
+            cache_.get_or_fetch(key, self.fetch, ttl=10)
+        self.assertEqual(set(cache_._data), {"a", "c"})
+
+
+class SingleFlightTests(SimpleTestCase):
+
+    def test_concurrent_callers_share_one_call(self):
+        flight, release, calls, results = ttl_cache.SingleFlight(), threading.Event(), [], []
+
+        def slow():
+            calls.append(1)
+            release.wait(2)
+            return "shared"
+
+        threads = [threading.Thread(target=lambda: results.append(flight.do("k", slow))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for _ in range(200):
+            if flight.in_flight("k"):
+                break
+            time.sleep(0.005)
+        time.sleep(0.05)  # let the others queue up behind the leader
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ["shared"] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertFalse(flight.in_flight("k"))
+
+    def test_errors_are_raised_and_not_remembered(self):
+        flight = ttl_cache.SingleFlight()
+        with self.assertRaises(ValueError):
+            flight.do("k", lambda: (_ for _ in ()).throw(ValueError("boom")))
+        self.assertEqual(flight.do("k", lambda: "next call runs again"), "next call runs again")
+
+
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Subscriber.objects.bulk_create(Subscriber(email=f"s{i}@example.com") for i in range(23))
+        # ties on the timestamp: only the id tells these rows apart
+        moment = timezone.now()
+        for i, pk in enumerate(Subscriber.objects.order_by("pk").values_list("pk", flat=True)):
+            Subscriber.objects.filter(pk=pk).update(subscribed_at=moment - timedelta(minutes=i // 4))
+        cls.expected = list(Subscriber.objects.order_by("-subscribed_at", "-pk").values_list("pk", flat=True))
+
+    def page(self, query=""):
+        return keyset_paginate(RequestFactory().get("/subscribers/" + query), Subscriber.objects.all(),
+                               "subscribed_at", per_page=5)
+
+    def test_walking_forward_and_back_visits_every_row_once(self):
+        seen, pages, page = [], [], self.page()
+        while True:
+            pages.append([s.pk for s in page])
+            seen += pages[-1]
+            if not page.has_next():
+                break
+            page = self.page(page.next_url)
+        self.assertEqual(seen, self.expected)
+        self.assertFalse(self.page().has_previous())
+
+        back = []
+        while page.has_previous():
+            page = self.page(page.previous_url)
+            back.append([s.pk for s in page])
+        self.assertEqual(back, pages[-2::-1])
+
+    def test_filters_survive_and_bad_cursors_start_over(self):
+        page = self.page("?q=news&after=bogus")
+        self.assertEqual([s.pk for s in page], self.expected[:5])
+        self.assertIn("q=news", page.next_url)
+        self.assertNotIn("bogus", page.next_url)
+
+    def test_cursor_round_trip(self):
+        moment = timezone.now()
+        self.assertEqual(decode_cursor(encode_cursor(moment, 42)), (moment, 42))
+        self.assertIsNone(decode_cursor("not-a-cursor"))
+
+
+@skipUnless(search.fts_available(), "FTS5 index is SQLite only")
+class SearchIndexTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user("author")
+
+    def found(self, query):
+        return [post.pk for post in search.search_posts(query)]
+
+    def test_signals_keep_the_index_in_sync(self):
+        post = Post.objects.create(title="Cape Town floods", content="Heavy rain", author=self.author,
+                                   status="pending")
+        self.assertEqual(self.found("floods"), [])  # not published yet
+
+        post.status = "published"
+        post.save()
+        self.assertEqual(self.found("floods"), [post.pk])
+        self.assertEqual(self.found("cape tow"), [post.pk])  # last word as a prefix
+
+        post.title = "Johannesburg storms"
+        post.save()
+        self.assertEqual(self.found("floods"), [])
+        self.assertEqual(self.found("storms"), [post.pk])
+
+        post_id = post.pk
+        post.delete()
+        self.assertEqual(self.found("storms"), [])
+        self.assertEqual(search.matching_post_ids("storms"), [])
+        self.assertNotIn(post_id, search.matching_post_ids("rain"))
+
+    def test_title_matches_rank_first_and_snippets_are_escaped(self):
+        body = Post.objects.create(title="Weekend", content="<b>budget</b> talks", author=self.author,
+                                   status="published")
+        title = Post.objects.create(title="Budget speech", content="Parliament", author=self.author,
+                                    status="published")
+        results = search.search_posts("budget")
+        self.assertEqual([p.pk for p in results], [title.pk, body.pk])
+        self.assertIn("&lt;b&gt;<mark>budget</mark>&lt;/b&gt;", results[1].snippet)
+
+    def test_rebuild_restores_a_drifted_index(self):
+        post = Post.objects.create(title="Elections", content="Votes", author=self.author, status="published")
+        search.remove_post(post.pk)
+        self.assertEqual(self.found("elections"), [])
+        self.assertEqual(search.rebuild_index(), 1)
+        self.assertEqual(self.found("elections"), [post.pk])
+
+
+class MatchQueryTests(SimpleTestCase):
+
+    def test_free_text_becomes_quoted_terms(self):
+        self.assertEqual(search.to_match_query("Cape tow"), '"Cape" "tow"*')
+        self.assertEqual(search.to_match_query('NOT "x" OR y* -z'), '"NOT" "x" "OR" "y" "z"*')
+        self.assertEqual(search.to_match_query("  ?!  "), "")
+
+
+@override_settings(ALLOWED_HOSTS=["*"])
+class PageCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user("author")
+        cls.post = Post.objects.create(title="First title", content="Body", author=cls.author, status="published")
+        news.store_articles(benchmark.fake_articles(3))  # the feed reads the local store
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, path, client=None):
+        response = (client or self.client).get(path)
+        self.assertEqual(response.status_code, 200)
+        return response, response.get("X-Page-Cache") == "hit"
+
+    def test_anonymous_pages_are_cached_until_their_post_changes(self):
+        path = f"/post/{self.post.pk}/"
+        self.assertFalse(self.get(path)[1])
+        self.assertTrue(self.get(path)[1])
+
+        self.post.title = "Second title"
+        self.post.save()
+        response, hit = self.get(path)
+        self.assertFalse(hit)
+        self.assertContains(response, "Second title")
+
+    def test_publishing_purges_the_feed(self):
+        self.get("/")
+        self.assertTrue(self.get("/")[1])
+        Post.objects.create(title="Breaking story", content="Body", author=self.author, status="draft")
+        self.assertTrue(self.get("/")[1])  # a draft doesn't change the feed
+        Post.objects.create(title="Published story", content="Body", author=self.author, status="published")
+        response, hit = self.get("/")
+        self.assertFalse(hit)
+        self.assertContains(response, "Published story")
+
+    def test_logged_in_visitors_bypass_the_cache(self):
+        self.get("/about/")
+        self.client.force_login(self.author)
+        self.assertFalse(self.get("/about/")[1])
+
+    def test_cached_forms_carry_each_visitors_own_csrf_token(self):
+        self.get("/contact/")  # stored with a placeholder
+        visitor = self.client_class(enforce_csrf_checks=True)
+        response, hit = self.get("/contact/", visitor)
+        self.assertTrue(hit)
+        self.assertNotContains(response, page_cache.CSRF_PLACEHOLDER)
+        token = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', response.content.decode())[1]
+        posted = visitor.post("/contact/", {"csrfmiddlewaretoken": token, "name": "a", "email": "a@example.com",
+                                            "message": "hi"})
+        self.assertNotEqual(posted.status_code, 403)
+
+
+class ServeMediaTests(SimpleTestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name, MEDIA_ACCEL=""))
+        self.name = "posts/" + "a" * 64 + ".txt"
+        os.makedirs(os.path.join(media.name, "posts"))
+        with open(os.path.join(media.name, self.name), "wb") as f:
+            f.write(b"0123456789")
+
+    def serve(self, path=None, **headers):
+        request = RequestFactory().get("/media/x", headers=headers)
+        response = serve_media(request, path or self.name)
+        body = b"".join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response, body
+
+    def test_whole_file_with_validators(self):
+        response, body = self.serve()
+        self.assertEqual((response.status_code, body), (200, b"0123456789"))
+        self.assertIn("immutable", response["Cache-Control"])
+
+        response, _ = self.serve(If_None_Match=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_ranges(self):
+        response, body = self.serve(Range="bytes=2-5")
+        self.assertEqual((response.status_code, body, response["Content-Range"]), (206, b"2345", "bytes 2-5/10"))
+        self.assertEqual(self.serve(Range="bytes=-3")[1], b"789")
+        self.assertEqual(self.serve(Range="bytes=7-")[1], b"789")
+
+        response, _ = self.serve(Range="bytes=10-")
+        self.assertEqual((response.status_code, response["Content-Range"]), (416, "bytes */10"))
+
+        # a stale If-Range or a multi-range request gets the whole file
+        self.assertEqual(self.serve(Range="bytes=2-5", If_Range='"old"')[0].status_code, 200)
+        self.assertEqual(self.serve(Range="bytes=0-1,4-5")[0].status_code, 200)
+
+    def test_offload_and_path_safety(self):
+        with override_settings(MEDIA_ACCEL="x-accel-redirect", MEDIA_ACCEL_PREFIX="/protected-media/"):
+            response, body = self.serve()
+        self.assertEqual((response["X-Accel-Redirect"], body), (f"/protected-media/{self.name}", b""))
+        with self.assertRaises(Http404):
+            self.serve("../../etc/passwd")
+
+
+@override_settings(ALLOWED_HOSTS=["*"])
+class PostsApiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user("author")
+        for i in range(5):
+            Post.objects.create(title=f"Post {i}", content="Body", author=cls.author, status="published")
+        Post.objects.create(title="Draft", content="Body", author=cls.author, status="draft")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cursor_pages_cover_every_published_post(self):
+        titles, url = [], "/api/posts/?page_size=2"
+        while url:
+            data = self.client.get(url).json()
+            titles += [post["title"] for post in data["results"]]
+            url = data["next"]
+        self.assertEqual(titles, [f"Post {i}" for i in range(4, -1, -1)])
+
+    def test_sparse_fields(self):
+        with CaptureQueriesContext(connection) as ctx:
+            post = self.client.get("/api/posts/?fields=id,title").json()["results"][0]
+        self.assertEqual(set(post), {"id", "title"})
+        listing = [q["sql"] for q in ctx.captured_queries if "LIMIT" in q["sql"]]
+        self.assertTrue(listing)
+        self.assertNotIn('"content"', listing[0])
+
+    def test_unchanged_listing_answers_304_without_queries(self):
+        response = self.client.get("/api/posts/")
+        etag = response["ETag"]
+        self.assertEqual(response["Cache-Control"], "private, no-cache")
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get("/api/posts/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Post.objects.create(title="Post 5", content="Body", author=self.author, status="published")
+        response = self.client.get("/api/posts/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_detail_validators_and_unpublished_access(self):
+        post = Post.objects.filter(status="published").first()
+        etag = self.client.get(f"/api/posts/{post.pk}/")["ETag"]
+        self.assertEqual(self.client.get(f"/api/posts/{post.pk}/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.assertEqual(self.client.get("/api/posts/?status=draft").status_code, 403)
+        self.client.force_login(self.author)
+        drafts = self.client.get("/api/posts/?status=draft").json()["results"]
+        self.assertEqual([p["title"] for p in drafts], ["Draft"])
+
+
+class WeatherSnapshotTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def wait_for_background(self):
+        for _ in range(200):
+            if not weather._background_running:
+                return
+            time.sleep(0.01)
+
+    def test_renders_never_fetch_and_stale_snapshots_refresh_in_the_background(self):
+        with benchmark.fake_upstreams() as session:
+            self.assertIsNone(weather.get_snapshot())  # nothing yet: a refresh starts
+            self.wait_for_background()
+            snapshot = weather.get_snapshot()
+            self.assertEqual(snapshot["temperature"], 21.5)
+            self.assertEqual(session.calls, 1)
+
+            weather.get_snapshot()  # fresh: no call
+            self.assertEqual(session.calls, 1)
+
+            cache.set(weather.SNAPSHOT_KEY, {**snapshot, "fetched_at": 0}, timeout=None)
+            self.assertEqual(weather.get_snapshot()["fetched_at"], 0)  # stale, served at once
+            self.wait_for_background()
+            self.assertEqual(session.calls, 2)
+            self.assertGreater(weather.get_snapshot()["fetched_at"], 0)
+
+
+@override_settings(ALLOWED_HOSTS=["*"], OPENWEATHER_API_KEY="key", WEATHER_GRID_DEGREES=0.1)
+class WeatherCellTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_nearby_readers_share_one_cell(self):
+        self.assertEqual(weather.grid_cell(-26.2041, 28.0473), (-26.25, 28.05))
+        with benchmark.fake_upstreams() as session:
+            weather.cell_weather(-26.2041, 28.0473)
+            weather.cell_weather(-26.2199, 28.0001)  # same cell
+            self.assertEqual(session.calls, 1)
+            weather.cell_weather(-33.9249, 18.4241)  # Cape Town
+            self.assertEqual(session.calls, 2)
+
+    def test_widget_endpoint(self):
+        with benchmark.fake_upstreams():
+            response = self.client.get("/weather/", {"lat": "-26.2", "lon": "28.0"})
+        self.assertEqual(response.json()["temperature"], 21.5)
+        self.assertIn("public", response["Cache-Control"])
+        self.assertEqual(self.client.get("/weather/", {"lat": "north", "lon": "1"}).status_code, 400)
+        self.assertEqual(self.client.get("/weather/", {"lat": "91", "lon": "1"}).status_code, 400)
+
+
+class NewsStoreTests(TestCase):
+
+    def setUp(self):
+        news.response_cache.clear()
+        self.addCleanup(news.response_cache.clear)
+
+    def test_store_upserts_by_link(self):
+        item = {"link": "https://example.com/a", "title": "First", "pubDate": "2024-05-01 10:00:00"}
+        written = news.store_articles([item, {**item, "title": "Duplicate in batch"}, {"title": "No link"}])
+        self.assertEqual(written, 1)
+        news.store_articles([{**item, "title": "Updated"}], category="sports")
+        article = ExternalArticle.objects.get()
+        self.assertEqual((article.title, article.category), ("Updated", "sports"))
+
+    def test_prune_drops_old_articles(self):
+        news.store_articles([
+            {"link": "https://example.com/old", "title": "Old", "pubDate": "2000-01-01 00:00:00"},
+            {"link": "https://example.com/new", "title": "New"},
+        ])
+        self.assertEqual(news.prune_articles(keep_days=30), 1)
+        self.assertEqual(list(ExternalArticle.objects.values_list("title", flat=True)), ["New"])
+
+    def test_reads_come_from_the_store(self):
+        news.store_articles([{"link": "https://example.com/a", "title": "Stored"}], category="sports")
+        with benchmark.fake_upstreams() as session:
+            self.assertEqual([a.title for a in news.latest_articles()], ["Stored"])
+            self.assertEqual([a.title for a in news.category_articles("sports")], ["Stored"])
+        self.assertEqual(session.calls, 0)
+
+
+class PublishedPostsPageTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user("writer", password="pw")
+        Post.objects.create(title="First", content="Body", author=self.author, status="published")
+
+    def test_page_is_cached_until_a_post_changes(self):
+        self.assertEqual([p["title"] for p in published_posts_page(1)["posts"]], ["First"])
+        with self.assertNumQueries(0):
+            published_posts_page(1)
+
+        Post.objects.create(title="Second", content="Body", author=self.author, status="published")
+        self.assertEqual([p["title"] for p in published_posts_page(1)["posts"]], ["Second", "First"])
+
+    def test_bad_page_numbers_fall_back_to_the_first_page(self):
+        self.assertEqual(published_posts_page("abc")["number"], 1)
+        self.assertEqual(published_posts_page(99)["number"], 1)
+
+
+class MergeResultsTests(SimpleTestCase):
+
+    def test_rank_fusion_merges_duplicates(self):
+        posts = [Post(pk=1, title="Load shedding returns"), Post(pk=2, title="Local derby")]
+        articles = [
+            {"link": "https://example.com/a", "title": "Load-shedding returns!"},
+            ExternalArticle(link="https://example.com/b", title="Rand rallies", source_id="news24"),
+            {"link": None, "title": "No link"},
+        ]
+        results = search.merge_results(posts, articles)
+
+        self.assertEqual([r["title"] for r in results], ["Load shedding returns", "Local derby", "Rand rallies"])
+        self.assertAlmostEqual(results[0]["score"], 2.0 / (search.RRF_K + 1))
+        self.assertEqual(results[2]["source"], "news24")
+        self.assertEqual(len(search.merge_results(posts, articles, limit=1)), 1)
+
+
+class RoleCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("reader", password="pw")
+        self.group = Group.objects.create(name=roles.JOURNALISTS_GROUP)
+
+    def fresh_user(self):
+        return User.objects.get(pk=self.user.pk)
+
+    def test_roles_are_cached_across_requests(self):
+        self.assertFalse(roles.is_journalist(self.fresh_user()))
+        with self.assertNumQueries(1):  # just the user row
+            self.assertFalse(roles.is_journalist(self.fresh_user()))
+
+    def test_group_changes_invalidate(self):
+        roles.is_journalist(self.fresh_user())
+        self.user.groups.add(self.group)
+        self.assertTrue(roles.is_journalist(self.fresh_user()))
+        self.group.user_set.clear()
+        self.assertFalse(roles.is_journalist(self.fresh_user()))
+        self.group.user_set.add(self.user)
+        self.assertTrue(roles.is_journalist(self.fresh_user()))
+        self.group.delete()
+        self.assertFalse(roles.is_journalist(self.fresh_user()))
+
+    def test_profile_changes_invalidate(self):
+        profile, _ = Profile.objects.get_or_create(user=self.user)
+        roles.profile_role(self.fresh_user())
+        profile.role = "journalist"
+        profile.save()
+        self.assertEqual(roles.profile_role(self.fresh_user()), "journalist")
+
+
+@override_settings(ALLOWED_HOSTS=["*"])
+class DashboardQueryTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.journalist = User.objects.create_user("journalist", password="pw")
+        self.client.force_login(self.journalist)
+
+    def add_posts(self, count):
+        for status in ("draft", "pending", "published"):
+            for i in range(count):
+                Post.objects.create(title=f"{status} {i}", content="c", author=self.journalist, status=status)
+
+    def queries_for(self, url):
+        self.client.get(url)  # warm the stats rows and caches
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_journalist_dashboard_is_flat(self):
+        self.add_posts(1)
+        few = self.queries_for("/dashboard/")
+        self.add_posts(4)
+        self.assertEqual(self.queries_for("/dashboard/"), few)
+
+    def test_my_posts_pages_are_flat(self):
+        self.add_posts(1)
+        few = self.queries_for("/dashboard/my-posts/")
+        self.add_posts(4)
+        self.assertEqual(self.queries_for("/dashboard/my-posts/"), few)
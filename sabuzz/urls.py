@@ -25,6 +25,7 @@ urlpatterns = [
     # Journalist Dashboard
     # -------------------------
     path("dashboard/", views.dashboard, name="dashboard"),
+    path("dashboard/my-posts/", views.my_posts, name="my_posts"),
     path("add-post/", views.add_post, name="add_post"),
     path("post/<int:post_id>/edit/", views.edit_post, name="add_post"),
     path("post/<int:post_id>/delete/", views.delete_post, name="confirm_delete"),
@@ -38,6 +39,7 @@ urlpatterns = [
     path("dashboard/users/", views.dashboard_users, name="dashboard_users"),
     path("dashboard/posts/", views.dashboard_posts, name="dashboard_posts"),
     path("dashboard/comments/", views.dashboard_comments, name="dashboard_comments"),
+    path("dashboard/subscribers/", views.subscribers_list, name="subscribers_list"),
     path("dashboard/users/edit/<int:user_id>/", views.edit_user, name="edit_user"),
     path("dashboard/users/delete/<int:user_id>/", views.delete_user, name="delete_user"),
 
@@ -93,6 +95,11 @@ path("favorites/remove/<int:fav_id>/", views.remove_favorite, name="remove_favor
     # -------------------------
     path("posts/", views.posts_page, name="posts_page"),
 
+    # -------------------------
+    # Metrics (Prometheus scrape)
+    # -------------------------
+    path("metrics/", views.metrics_endpoint, name="metrics"),
+
     # -------------------------------------
 # User CRUD – Comments (Edit/Delete)
 # -------------------------------------
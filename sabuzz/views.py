@@ -1,21 +1,31 @@
 # sabuzz/views.py
+import asyncio
+import hmac
+
 import requests
+from asgiref.sync import sync_to_async
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.models import Group, User
-from django.http import HttpResponseRedirect, HttpResponseForbidden, Http404
+from django.http import HttpResponse, HttpResponseRedirect, HttpResponseForbidden, Http404
 from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.db.models import Q
 from django.views.decorators.http import require_POST
 from .forms import UserProfileForm, JournalistProfileForm, AdminProfileForm, ProfileForm
 from .models import Profile
 from django.http import JsonResponse
 from django.conf import settings
 from .forms import CustomRegisterForm, LoginForm
+from . import db_router, metrics, news, page_cache, roles, search, services, stats, weather
+from .page_cache import anonymous_page
+from .pagination import keyset_paginate
+from .query_budget import query_budget
 from .models import (
     Post, Category, Comment, Subscriber,
-    Favorite, SavedArticle, SavedPost, JournalistRequest, Like, Activity
+    Favorite, SavedArticle, SavedPost, JournalistRequest, Activity
 )
 
 # Optional serializer (API)
@@ -24,77 +34,83 @@ try:
 except Exception:
     PostSerializer = None
 
-API_KEY = "pub_5741e9332f0f408186a23f2be286c5f5"
+# comments shown per post_detail page (older ones are on the next pages)
+COMMENTS_PER_PAGE = 50
+
+# posts per status shown on the journalist dashboard; the rest are on my_posts
+DASHBOARD_RECENT_POSTS = 10
 
 
 # -------------------------
 # Helpers
 # -------------------------
 def is_journalist(user):
-    """Return True if user is superuser or in 'Journalists' group."""
-    return bool(
-        user and user.is_authenticated and
-        (user.is_superuser or user.groups.filter(name="Journalists").exists())
-    )
+    """Return True if user is superuser or in 'Journalists' group (see sabuzz/roles.py)."""
+    return roles.is_journalist(user)
 
 
 # -------------------------
 # Static / home
+# (public pages are served from the anonymous page cache, sabuzz/page_cache.py)
 # -------------------------
+@anonymous_page()
 def about(request):
     return render(request, "sabuzz/about.html")
 
 
+@anonymous_page()
 def contact(request):
     return render(request, "sabuzz/contact.html")
 
 
-def home(request):
+@anonymous_page(tags=[page_cache.FEED_TAG])
+async def home(request):
     """
-    Show API articles (newsdata.io) + local published posts.
+    Show API articles (newsdata.io, served from the local ExternalArticle store) + local published posts.
+    The posts query is left lazy so a cached feed fragment skips it.
     """
-    url = f"https://newsdata.io/api/1/news?country=za&apikey={API_KEY}"
-    articles = []
-    try:
-        r = requests.get(url, timeout=5)
-        if r.status_code == 200:
-            articles = r.json().get("results", [])
-    except Exception:
-        articles = []
-
-    local_posts = Post.objects.filter(status="published").order_by("-created_at")[:10]
-
+    user = await request.auser()
+    articles = await news.alatest_articles()
     profile = None
-    if request.user.is_authenticated:
-        try:
-            profile = Profile.objects.get(user=request.user)
-        except Profile.DoesNotExist:
-            profile = None
-
-    return render(request, "sabuzz/index.html", {"articles": articles, "local_posts": local_posts, "profile": profile, })
+    if user.is_authenticated:
+        profile = await Profile.objects.select_related("user").filter(user=user).afirst()
+
+    # rendering runs context processors that use the sync ORM
+    return await sync_to_async(render)(request, "sabuzz/index.html", {
+        "articles": articles,
+        "local_posts": Post.objects.filter(status="published").order_by("-created_at", "-id")[:10],
+        "profile": profile,
+        "feed_version": await sync_to_async(page_cache.fragment_version)(page_cache.FEED_TAG),
+        "fragment_ttl": db_router.cache_ttl(settings.PAGE_CACHE_TTL),
+    })
 
 
 # -------------------------
 # Weather widget (small)
 # -------------------------
 def weather_widget(request):
-    lat = request.GET.get("lat")
-    lon = request.GET.get("lon")
-
+    """
+    Server-side weather proxy for the navbar. Coordinates are snapped to a grid
+    cell and each cell is cached, so the browser never sees the API key and
+    readers in the same area share one upstream call.
+    """
     api_key= settings.OPENWEATHER_API_KEY
 
     if not api_key:
         return JsonResponse ({"error": "Missing API key"}, status = 400)
 
-    url = f"https://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&units=metric&appid={api_key}"
-    
-    r = requests.get(url).json()
-
-    return JsonResponse({
-        "city": r.get("name"),
-        "temperature": r["main"]["temp"] if "main" in r else None,
-    })
+    try:
+        lat = float(request.GET.get("lat", ""))
+        lon = float(request.GET.get("lon", ""))
+        data = weather.cell_weather(lat, lon)
+    except requests.RequestException:
+        return JsonResponse({"error": "Weather unavailable"}, status=502)
+    except ValueError:
+        return JsonResponse({"error": "Invalid coordinates"}, status=400)
 
+    response = JsonResponse(data)
+    patch_cache_control(response, public=True, max_age=settings.WEATHER_CELL_TTL)
+    return response
 
 
 # -------------------------
@@ -244,10 +260,8 @@ def edit_post(request, post_id):
         if PostSerializer:
             serializer = PostSerializer(post, data=data, partial=True)
             if serializer.is_valid():
-                saved_post = serializer.save()
-                if image:
-                    saved_post.image = image
-                    saved_post.save()
+                # image goes into the same save, so the post is written once
+                serializer.save(**({"image": image} if image else {}))
                 messages.success(
                     request,
                     "Post updated and sent for approval." if status == "pending" else "Post saved as draft."
@@ -314,10 +328,8 @@ def add_post(request):
             # Use serializer if available
             serializer = PostSerializer(data=data)
             if serializer.is_valid():
-                post = serializer.save()
-                if image:
-                    post.image = image
-                    post.save()
+                # image goes into the same save, so the post is written once
+                serializer.save(**({"image": image} if image else {}))
                 messages.success(
                     request,
                     "Post saved as draft." if status == "draft" else "Post submitted for approval."
@@ -385,75 +397,61 @@ def dashboard(request):
 
 @login_required
 def dashboard(request):
+    """
+    Numbers come from the incrementally maintained DashboardStats rows
+    (sabuzz/stats.py); the full tables live on the paginated sub-pages.
+    """
     user = request.user
 
     if user.is_superuser:
-        # Admin dashboard
-        posts_count = Post.objects.count()
-        categories_count = Category.objects.count()
-        subscribers_count = Subscriber.objects.count()
-        comments_count = Comment.objects.count()
-        likes_count = Like.objects.count()
-        recent_activities = Activity.objects.select_related('user', 'object').order_by('-timestamp')[:10]
-
-        users = User.objects.all().order_by('-date_joined')
-        posts = Post.objects.select_related('author', 'category').all().order_by('-created_at')
-        comments = Comment.objects.select_related('user', 'post').all().order_by('-date_posted')
-
         return render(request, "sabuzz/dashboard.html", {
-            "posts_count": posts_count,
-            "categories_count": categories_count,
-            "subscribers_count": subscribers_count,
-            "comments_count": comments_count,
-            "likes_count": likes_count,
-            "recent_activities": recent_activities,
-            "users": users,
-            "posts": posts,
-            "comments": comments,
+            "stats": stats.get_stats(),
+            "recent_activities": Activity.objects.select_related('user', 'object').order_by('-timestamp')[:10],
         })
 
-    # Journalist dashboard
-    posts_count = Post.objects.filter(author=user).count()
-    categories_count = Category.objects.count()
-    comments_count = Comment.objects.filter(post__author=user).count()
-    likes_count = Like.objects.filter(post__author=user).count()
-    recent_activities = Activity.objects.filter(user=user).order_by('-timestamp')[:10]
-
-    drafts = Post.objects.filter(author=user, status="draft").order_by('-created_at')
-    pending = Post.objects.filter(author=user, status="pending").order_by('-created_at')
-    published = Post.objects.filter(author=user, status="published").order_by('-created_at')
-
+    # Journalist dashboard: own numbers plus the latest few posts per status
+    own_posts = Post.objects.filter(author=user).order_by('-created_at', '-id')
+    recent = DASHBOARD_RECENT_POSTS
     return render(request, "sabuzz/dashboard.html", {
-        "posts_count": posts_count,
-        "categories_count": categories_count,
-        "comments_count": comments_count,
-        "likes_count": likes_count,
-        "recent_activities": recent_activities,
-        "drafts": drafts,
-        "pending": pending,
-        "published": published,
+        "stats": stats.get_stats(user.id),
+        "categories_count": stats.get_stats().categories,
+        "recent_activities": Activity.objects.filter(user=user).select_related('user', 'object').order_by('-timestamp')[:10],
+        "drafts": own_posts.filter(status="draft")[:recent],
+        "pending": own_posts.filter(status="pending")[:recent],
+        "published": own_posts.filter(status="published")[:recent],
     })
 
 
+# Journalist's own posts, paginated (full list behind the dashboard tabs)
+@login_required
+def my_posts(request):
+    posts = Post.objects.filter(author=request.user)
+    status = request.GET.get("status")
+    if status in dict(Post.STATUS_CHOICES):
+        posts = posts.filter(status=status)
+    page = keyset_paginate(request, posts, "created_at")
+    return render(request, "sabuzz/my_posts.html", {"page": page, "posts": page.object_list, "status": status})
+
+
 # Admin user table
 @user_passes_test(lambda u: u.is_superuser)
 def dashboard_users(request):
-    users = User.objects.all().order_by('-date_joined')
-    return render(request, "sabuzz/dashboard_users.html", {"users": users})
+    page = keyset_paginate(request, User.objects.all(), "date_joined")
+    return render(request, "sabuzz/dashboard_users.html", {"users": page.object_list, "page": page})
 
 
 # Admin post table
 @user_passes_test(lambda u: u.is_superuser)
 def dashboard_posts(request):
-    posts = Post.objects.select_related('author', 'category').all().order_by('-created_at')
-    return render(request, "sabuzz/dashboard_posts.html", {"posts": posts})
+    page = keyset_paginate(request, Post.objects.select_related('author', 'category'), "created_at")
+    return render(request, "sabuzz/dashboard_posts.html", {"posts": page.object_list, "page": page})
 
 
 # Admin comment table
 @user_passes_test(lambda u: u.is_superuser)
 def dashboard_comments(request):
-    comments = Comment.objects.select_related('user', 'post').all().order_by('-date_posted')
-    return render(request, "sabuzz/dashboard_comments.html", {"comments": comments})
+    page = keyset_paginate(request, Comment.objects.select_related('user', 'post'), "date_posted")
+    return render(request, "sabuzz/dashboard_comments.html", {"comments": page.object_list, "page": page})
 
 
 @user_passes_test(lambda u: u.is_superuser)
@@ -482,8 +480,8 @@ def delete_user(request, user_id):
 
 @user_passes_test(is_journalist)
 def subscribers_list(request):
-    subscribers = Subscriber.objects.all().order_by("-subscribed_at")
-    return render(request, "sabuzz/subscribers_list.html", {"subscribers": subscribers})
+    page = keyset_paginate(request, Subscriber.objects.select_related("user"), "subscribed_at")
+    return render(request, "sabuzz/subscribers_list.html", {"subscribers": page.object_list, "page": page})
 
 
 def subscribe(request):
@@ -505,8 +503,8 @@ def subscribe(request):
 # -------------------------
 @user_passes_test(lambda u: u.is_superuser)
 def comments_list(request):
-    comments = Comment.objects.select_related("post", "user").order_by("-date_posted")
-    return render(request, "sabuzz/comments_list.html", {"comments": comments})
+    page = keyset_paginate(request, Comment.objects.select_related("post", "user"), "date_posted")
+    return render(request, "sabuzz/comments_list.html", {"comments": page.object_list, "page": page})
 
 
 @user_passes_test(lambda u: u.is_superuser)
@@ -534,8 +532,10 @@ def delete_comment_admin(request, comment_id):
 @login_required
 @user_passes_test(lambda u: u.is_superuser)
 def pending_posts(request):
-    posts = Post.objects.filter(status="pending").order_by("-created_at")
-    return render(request, "sabuzz/pending_posts.html", {"posts": posts})
+    page = keyset_paginate(
+        request, Post.objects.filter(status="pending").select_related("author", "category"), "created_at"
+    )
+    return render(request, "sabuzz/pending_posts.html", {"posts": page.object_list, "page": page})
 
 
 @login_required
@@ -565,8 +565,10 @@ def reject_post(request, post_id):
 # -------------------------
 @user_passes_test(lambda u: u.is_superuser)
 def journalist_requests(request):
-    reqs = JournalistRequest.objects.filter(status="pending")
-    return render(request, "sabuzz/journalist_requests.html", {"requests": reqs})
+    page = keyset_paginate(
+        request, JournalistRequest.objects.filter(status="pending").select_related("user"), "created_at"
+    )
+    return render(request, "sabuzz/journalist_requests.html", {"requests": page.object_list, "page": page})
 
 
 @user_passes_test(lambda u: u.is_superuser)
@@ -574,8 +576,8 @@ def approve_journalist(request, req_id):
     req = get_object_or_404(JournalistRequest, id=req_id)
     req.status = "approved"
     req.save()
-    group, _ = Group.objects.get_or_create(name="Journalists")
-    req.user.groups.add(group)
+    group, _ = Group.objects.get_or_create(name=roles.JOURNALISTS_GROUP)
+    req.user.groups.add(group)  # m2m_changed drops the user's cached roles
     messages.success(request, f"{req.user.username} is now approved.")
     return redirect("journalist_requests")
 
@@ -592,19 +594,22 @@ def reject_journalist(request, req_id):
 # -------------------------
 # Post detail + comment create
 # -------------------------
+@anonymous_page(tags=lambda request, post_id: [page_cache.post_tag(post_id)])
+@query_budget(12)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    """
+    One post and a page of its comments. Authors, comment users and their
+    profiles are joined in, so the query count doesn't grow with the comments.
+    """
+    post = get_object_or_404(Post.objects.select_related("author__profile", "category"), id=post_id)
 
     # Access control for unpublished posts
     if post.status != "published":
-        user_is_author = request.user.is_authenticated and (request.user == post.author)
-        user_is_super = request.user.is_authenticated and request.user.is_superuser
-        user_is_journalist = request.user.is_authenticated and request.user.groups.filter(name="Journalists").exists()
-        if not (user_is_author or user_is_super or user_is_journalist):
+        user_is_author = request.user.is_authenticated and (request.user.pk == post.author_id)
+        # is_journalist covers superusers too
+        if not (user_is_author or roles.is_journalist(request.user)):
             raise Http404("Post not found")
 
-    comments = Comment.objects.filter(post=post).order_by("-date_posted")
-
     if request.method == "POST":
         if not request.user.is_authenticated:
             messages.error(request, "Login required to post comments.")
@@ -619,7 +624,22 @@ def post_detail(request, post_id):
         messages.success(request, "Comment added (pending approval).")
         return redirect("post_detail", post_id=post.id)
 
-    return render(request, "sabuzz/post_detail.html", {"post": post, "comments": comments})
+    # everyone sees approved comments; users also see their own pending ones
+    comments = Comment.objects.filter(post=post).select_related("user__profile")
+    if not request.user.is_superuser:
+        visible = Q(approved=True)
+        if request.user.is_authenticated:
+            visible |= Q(user=request.user)
+        comments = comments.filter(visible)
+    comments_page = keyset_paginate(request, comments, "date_posted", per_page=COMMENTS_PER_PAGE)
+
+    return render(request, "sabuzz/post_detail.html", {
+        "post": post,
+        "comments": comments_page.object_list,
+        "comments_page": comments_page,
+        "post_version": page_cache.fragment_version(page_cache.post_tag(post.id)),
+        "fragment_ttl": db_router.cache_ttl(settings.PAGE_CACHE_TTL),
+    })
 
 
 # -------------------------
@@ -723,46 +743,43 @@ def remove_saved_article(request, article_id):
 
 
 # -------------------------
-# Posts page (API)
+# Posts page (same data as the API, no HTTP hop)
 # -------------------------
 def posts_page(request):
-    api_url = "http://127.0.0.1:8000/api/posts/"
-    try:
-        response = requests.get(api_url, timeout=5)
-        posts = response.json() if response.status_code == 200 else []
-    except Exception:
-        posts = []
-    return render(request, "sabuzz/posts_page.html", {"posts": posts})
+    page = services.published_posts_page(request.GET.get("page", 1))
+    return render(request, "sabuzz/post_page.html", {"posts": page["posts"], "page": page})
 
 
 # -------------------------
 # category and search
-#only for API
+# (newsdata.io articles from the local store, local posts from the full-text index)
 # -------------------------
-def category_news(request, category):
-    url = f"https://newsdata.io/api/1/news?country=za&category={category}&apikey={API_KEY}"
-    articles = []
-    try:
-        r = requests.get(url, timeout=5)
-        if r.status_code == 200:
-            articles = r.json().get("results", [])
-    except Exception:
-        pass
-    return render(request, "sabuzz/category.html", {"category": category.capitalize(), "articles": articles})
+@anonymous_page()
+async def category_news(request, category):
+    articles = await news.acategory_articles(category.lower())
+    return await sync_to_async(render)(request, "sabuzz/category.html", {
+        "category": category.capitalize(),
+        "articles": articles,
+    })
+
 
+async def search_news(request):
+    """
+    Federated search: local posts (full-text index) and stored newsdata.io
+    articles, merged into one ranked list.
+    """
+    query = request.GET.get("q", "").strip()
+    results = []
 
-def search_news(request):
-    query = request.GET.get("q", "")
-    articles = []
     if query:
-        url = f"https://newsdata.io/api/1/news?q={query}&country=za&apikey={API_KEY}"
-        try:
-            r = requests.get(url, timeout=5)
-            if r.status_code == 200:
-                articles = r.json().get("results", [])
-        except Exception:
-            pass
-    return render(request, "sabuzz/search.html", {"query": query, "articles": articles})
+        posts = await sync_to_async(search.search_posts)(query)
+        articles = await news.asearch_articles(query)
+        results = search.merge_results(posts, articles)
+
+    return await sync_to_async(render)(request, "sabuzz/search.html", {
+        "query": query,
+        "results": results,
+    })
 
 @login_required
 def update_profile(request):
@@ -791,4 +808,20 @@ def update_profile(request):
 @login_required
 def profile_detail(request):
     profile, created = Profile.objects.get_or_create(user=request.user)
-    return render(request, "sabuzz/profile_detail.html", {"profile": profile})
\ No newline at end of file
+    return render(request, "sabuzz/profile_detail.html", {"profile": profile})
+
+
+# -------------------------
+# Metrics (Prometheus scrape)
+# -------------------------
+def metrics_endpoint(request):
+    """Staff session, or `Authorization: Bearer <METRICS_TOKEN>` for the scraper."""
+    token = getattr(settings, "METRICS_TOKEN", "")
+    authorized = request.user.is_authenticated and request.user.is_staff
+    if token and hmac.compare_digest(
+        request.headers.get("Authorization", "").encode(), f"Bearer {token}".encode()
+    ):
+        authorized = True
+    if not authorized:
+        return HttpResponseForbidden("Forbidden")
+    return HttpResponse(metrics.render_prometheus(), content_type="text/plain; version=0.0.4")
@@ -0,0 +1,171 @@
+# sabuzz/weather.py
+"""
+Weather for the navbar.
+
+1. Snapshot (Johannesburg, open-meteo): template renders only ever read it from
+   the cache. It is refreshed on a fixed interval by `manage.py refresh_weather`
+   (cron or --loop), and as a fallback by a single background thread when a
+   render finds it stale.
+
+2. Geo-bucketed proxy (openweathermap) behind the weather_widget endpoint:
+   browser coordinates are snapped to a grid cell, each cell is cached with a
+   TTL, and concurrent requests for the same cell share one upstream fetch.
+"""
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import http_client
+from .cache import SingleFlight
+
+OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
+OPENWEATHER_URL = "https://api.openweathermap.org/data/2.5/weather"
+
+SNAPSHOT_KEY = "sabuzz:weather:snapshot"
+REFRESH_LOCK_KEY = "sabuzz:weather:refresh-lock"
+CELL_KEY = "sabuzz:weather:cell:{lat}:{lon}"
+
+DEFAULT_LOCATION = {
+    "name": "Johannesburg",
+    "lat": -26.2041,
+    "lon": 28.0473,
+    "timezone": "Africa/Johannesburg",
+}
+
+_flight = SingleFlight()
+_background_lock = threading.Lock()
+_background_running = False
+
+
+def refresh_interval():
+    return getattr(settings, "WEATHER_SNAPSHOT_INTERVAL", 600)
+
+
+def fetch_current_weather(location=DEFAULT_LOCATION):
+    """Call open-meteo and return {"temperature", "windspeed"}; raises on failure."""
+    response = http_client.get(OPEN_METEO_URL, params={
+        "latitude": location["lat"],
+        "longitude": location["lon"],
+        "current_weather": "true",
+        "timezone": location["timezone"],
+    })
+    response.raise_for_status()
+    current = response.json().get("current_weather") or {}
+    if not current:
+        raise ValueError("open-meteo returned no current_weather")
+    return {
+        "temperature": current.get("temperature"),
+        "windspeed": current.get("windspeed"),
+    }
+
+
+def _refresh():
+    # cache.add is atomic, so only one process at a time gets to call upstream
+    if not cache.add(REFRESH_LOCK_KEY, 1, timeout=30):
+        return cache.get(SNAPSHOT_KEY)
+    try:
+        snapshot = {
+            **fetch_current_weather(),
+            "city": DEFAULT_LOCATION["name"],
+            "fetched_at": time.time(),
+        }
+        cache.set(SNAPSHOT_KEY, snapshot, timeout=None)
+        return snapshot
+    finally:
+        cache.delete(REFRESH_LOCK_KEY)
+
+
+def refresh_snapshot():
+    """Fetch a new reading and store it. Concurrent callers share one fetch."""
+    return _flight.do(SNAPSHOT_KEY, _refresh)
+
+
+def _refresh_in_background():
+    global _background_running
+    with _background_lock:
+        if _background_running:
+            return
+        _background_running = True
+
+    def run():
+        global _background_running
+        try:
+            refresh_snapshot()
+        except Exception:
+            pass  # keep the old snapshot; the next stale read tries again
+        finally:
+            with _background_lock:
+                _background_running = False
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def get_snapshot():
+    """
+    Return the cached reading (or None if there is none yet). Never blocks on the network.
+    """
+    snapshot = cache.get(SNAPSHOT_KEY)
+    if snapshot is None or time.time() - snapshot.get("fetched_at", 0) > refresh_interval():
+        _refresh_in_background()
+    return snapshot
+
+
+# -------------------------
+# Geo-bucketed proxy (weather_widget)
+# -------------------------
+def grid_cell(lat, lon):
+    """
+    Snap coordinates to the centre of their WEATHER_GRID_DEGREES cell
+    (0.1 degrees is roughly 11 km, i.e. one reading per suburb / small town).
+    """
+    size = getattr(settings, "WEATHER_GRID_DEGREES", 0.1)
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError("Coordinates out of range")
+    cell_lat = math.floor(lat / size) * size + size / 2
+    cell_lon = math.floor(lon / size) * size + size / 2
+    return round(cell_lat, 4), round(cell_lon, 4)
+
+
+def fetch_cell_weather(lat, lon):
+    """Call openweathermap for one cell centre; raises on failure."""
+    response = http_client.get(OPENWEATHER_URL, params={
+        "lat": lat,
+        "lon": lon,
+        "units": "metric",
+        "appid": settings.OPENWEATHER_API_KEY,
+    })
+    response.raise_for_status()
+    data = response.json()
+    weather = data.get("weather") or [{}]
+    return {
+        "city": data.get("name"),
+        "temperature": (data.get("main") or {}).get("temp"),
+        "description": weather[0].get("description", ""),
+    }
+
+
+def cell_weather(lat, lon):
+    """
+    Weather for the grid cell containing (lat, lon), cached for WEATHER_CELL_TTL seconds.
+    Raises ValueError for bad coordinates and requests errors if the upstream call fails.
+    """
+    cell_lat, cell_lon = grid_cell(lat, lon)
+    key = CELL_KEY.format(lat=cell_lat, lon=cell_lon)
+
+    reading = cache.get(key)
+    if reading is not None:
+        return reading
+
+    def load():
+        # another request may have filled the cell while we were waiting
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+        fresh = fetch_cell_weather(cell_lat, cell_lon)
+        cache.set(key, fresh, timeout=getattr(settings, "WEATHER_CELL_TTL", 600))
+        return fresh
+
+    return _flight.do(key, load)